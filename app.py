@@ -1,38 +1,195 @@
-from flask import Flask, render_template_string
+from flask import (Flask, Response, abort, g, has_app_context, jsonify, make_response, request,
+                   send_from_directory, stream_with_context, url_for)
+from werkzeug.http import is_resource_modified
 import sqlite3
+import contextlib
+import functools
+import hashlib
 import json
-from typing import List, Dict
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List, Dict, Mapping, Optional, Tuple
 
-app = Flask(__name__)
+import assets
+import blobs
+import metrics
+import snapshot
+from cache import LRUCache
+from compression import COMPRESSIBLE_MIMETYPES, available_encodings, choose_encoding, compress, compress_stream
+from db import ConnectionPool
+from previews import PREVIEW_VARIANTS, build_preview_document, preview_hash
+from search import build_match_query, search_presets
+
+# Static files are fingerprinted bundles served by the `static` view below
+app = Flask(__name__, static_folder=None)
 DATABASE_PATH = 'presets.db'
+# Presets per `IN (...)` query when loading files in bulk
+FILES_BATCH_SIZE = 500
+# Category/preset rows rendered per index page
+PRESETS_PER_PAGE = 30
+# Idle connections kept open between requests
+DB_POOL_SIZE = 8
+# Template events buffered into each streamed chunk of the index page
+TEMPLATE_STREAM_BUFFER = 32
+# Characters of rendered preview documents kept in memory
+PREVIEW_CACHE_SIZE = 32 * 1024 * 1024
+# Characters of file bodies kept in memory; presets that share a file share its entry
+BLOB_CACHE_SIZE = 64 * 1024 * 1024
+# Presets whose file hashes are kept in memory
+FILE_HASHES_CACHE_SIZE = 100000
+# Search results per page, by default and at most
+SEARCH_PER_PAGE = 20
+SEARCH_MAX_PER_PAGE = 100
+# Result pages of recent searches kept in memory
+SEARCH_CACHE_SIZE = 1024
+# Smallest response body worth compressing, in bytes (streamed bodies are always compressed)
+COMPRESS_MIN_SIZE = 1024
+# Bytes of compressed response bodies kept in memory
+COMPRESSED_CACHE_SIZE = 32 * 1024 * 1024
+# Bytes of thumbnail images kept in memory
+THUMBNAIL_CACHE_SIZE = 16 * 1024 * 1024
+# Seconds browsers may cache fingerprinted static files
+STATIC_MAX_AGE = 365 * 24 * 3600
+# Requests slower than this many seconds are logged with their queries; None disables the log
+SLOW_REQUEST_THRESHOLD: Optional[float] = None
 
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+class Catalog:
+    """The category/preset listing of one catalog generation.
 
-def get_preset_files(preset_id: int) -> Dict[str, str]:
-    """Get HTML, CSS, and JS content for a preset."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT file_type, content 
-        FROM files 
-        WHERE preset_id = ?
-    ''', (preset_id,))
+    Only metadata lives here, so it stays resident; file bodies go through
+    the size-bounded `blob_cache`. The generation is the database's
+    `PRAGMA user_version`, which import_presets bumps after every import.
+    `last_modified` is the newest timestamp among its rows, if any, and
+    `thumbnails` maps the card preview hashes that have a rendered
+    thumbnail to its image format. A catalog loaded from a snapshot (see
+    snapshot.py) keeps it, and reads its rows, file hashes, bodies and
+    thumbnails from the mapping instead of the database and the caches.
+    """
+
+    def __init__(self, database: str, generation: int, rows: List[sqlite3.Row],
+                 last_modified: Optional[datetime] = None, thumbnails: Optional[Mapping[str, str]] = None,
+                 snapshot: Optional[snapshot.Snapshot] = None):
+        self.database = database
+        self.generation = generation
+        self.last_modified = last_modified
+        self.thumbnails = thumbnails or {}
+        self.snapshot = snapshot
+        if snapshot is not None:
+            # Decoded from the mapping as they are read
+            self.rows, self.preset_ids = snapshot.rows, snapshot.preset_ids
+        else:
+            self.rows = [dict(row) for row in rows]
+            self.preset_ids = {row['preset_id'] for row in self.rows if row['preset_id']}
+
+catalog_lock = threading.Lock()
+# Rendered preview documents keyed by content hash
+preview_cache: LRUCache[str] = LRUCache(PREVIEW_CACHE_SIZE)
+# File bodies keyed by content hash, so they never go stale
+blob_cache: LRUCache[str] = LRUCache(BLOB_CACHE_SIZE)
+# Blob hash of each file of a preset, keyed by (catalog generation, preset id)
+file_hashes_cache: LRUCache[Dict[str, str]] = LRUCache(FILE_HASHES_CACHE_SIZE, sizeof=lambda hashes: 1)
+# Search result pages keyed by (catalog generation, query, page, page size)
+search_cache: LRUCache[Tuple[int, List[Dict]]] = LRUCache(SEARCH_CACHE_SIZE, sizeof=lambda page: 1)
+# Compressed response bodies keyed by (path, ETag, content coding)
+compressed_cache: LRUCache[bytes] = LRUCache(COMPRESSED_CACHE_SIZE)
+# Thumbnail images keyed by card preview hash
+thumbnail_cache: LRUCache[Tuple[str, bytes]] = LRUCache(THUMBNAIL_CACHE_SIZE, sizeof=lambda entry: len(entry[1]))
+# Bundle name -> fingerprinted file in assets.STATIC_DIR
+asset_manifest: Dict[str, str] = assets.load_manifest()
+
+request_duration = metrics.Histogram(
+    'presets_request_duration_seconds', 'Time from routing to the last byte of the response.',
+    ('endpoint', 'method', 'status')
+)
+request_phase_duration = metrics.Histogram(
+    'presets_request_phase_seconds', 'Time each request spent in a phase (db, assembly, render).',
+    ('endpoint', 'phase')
+)
+request_queries = metrics.Histogram(
+    'presets_request_queries', 'SQL statements run per request.', ('endpoint',), metrics.COUNT_BUCKETS
+)
+request_connections = metrics.Histogram(
+    'presets_request_db_connections', 'Pooled database connections taken per request.', ('endpoint',),
+    metrics.COUNT_BUCKETS
+)
+
+def request_stats() -> Optional[metrics.RequestStats]:
+    """The instrumentation of the current request, or None outside of one."""
+    return g.get('request_stats') if has_app_context() else None
+
+def timed(phase: str):
+    """Count the time spent in a block towards one of metrics.PHASES of the current request."""
+    stats = request_stats()
+    return stats.phase(phase) if stats is not None else contextlib.nullcontext()
+
+def timed_view(view):
+    """Count a view's own time, outside queries and rendering, as assembly."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with timed('assembly'):
+            return view(*args, **kwargs)
+    return wrapper
+
+def get_db_pool() -> ConnectionPool:
+    pool = app.extensions.get('db_pool')
+    if pool is None or pool.database != DATABASE_PATH:
+        if pool is not None:
+            pool.close()
+        pool = ConnectionPool(DATABASE_PATH, max_idle=DB_POOL_SIZE)
+        app.extensions['db_pool'] = pool
+    return pool
+
+def get_db_connection() -> sqlite3.Connection:
+    """Get the connection bound to the current app context."""
+    if 'db' not in g:
+        stats = request_stats()
+        with timed('db'):
+            g.db = get_db_pool().acquire()
+        if stats is not None:
+            stats.connections += 1
+            g.db.set_trace_callback(stats.on_query)
+    return g.db
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.set_trace_callback(None)
+        get_db_pool().release(conn)
+
+def get_catalog() -> Catalog:
+    """Get the cached catalog, reloading it when the importer has bumped the generation.
+
+    The generation is read once per app context, so a request sees one
+    consistent catalog even if an import finishes halfway through it.
+    """
+    if 'catalog' in g:
+        return g.catalog
     
-    files = {}
-    for row in cursor.fetchall():
-        files[row['file_type']] = row['content']
+    conn = get_db_connection()
+    with timed('db'):
+        generation = conn.execute('PRAGMA user_version').fetchone()[0]
+    catalog = app.extensions.get('catalog')
+    if catalog is None or catalog.generation != generation or catalog.database != DATABASE_PATH:
+        with catalog_lock, timed('db'):
+            catalog = app.extensions.get('catalog')
+            if catalog is None or catalog.generation != generation or catalog.database != DATABASE_PATH:
+                catalog = (load_catalog_snapshot(generation, snapshot.read_token(conn))
+                           or load_catalog(conn, generation))
+                app.extensions['catalog'] = catalog
+                file_hashes_cache.clear()
     
-    conn.close()
-    return files
+    g.catalog = catalog
+    return catalog
 
-def get_categories_with_presets() -> List[Dict]:
-    conn = get_db_connection()
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """A SQLite CURRENT_TIMESTAMP value as an aware UTC datetime."""
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc) if value else None
+
+def load_catalog(conn: sqlite3.Connection, generation: int) -> Catalog:
+    """Query the catalog of `generation` from the database."""
     cursor = conn.cursor()
-    
     cursor.execute('''
         SELECT 
             c.id as category_id, 
@@ -44,9 +201,170 @@ def get_categories_with_presets() -> List[Dict]:
         LEFT JOIN presets p ON c.id = p.category_id
         ORDER BY c.name, p.name
     ''')
-    
     rows = cursor.fetchall()
-    conn.close()
+    cursor.execute(snapshot.LAST_MODIFIED_QUERY)
+    last_modified = parse_timestamp(cursor.fetchone()[0])
+    try:
+        cursor.execute('SELECT hash, format FROM thumbnails')
+        thumbnails = dict(cursor.fetchall())
+    except sqlite3.OperationalError:
+        # Databases the current importer has not touched yet have no thumbnails table
+        thumbnails = {}
+    return Catalog(DATABASE_PATH, generation, rows, last_modified, thumbnails)
+
+def load_catalog_snapshot(generation: int, token: Optional[str]) -> Optional[Catalog]:
+    """Map the catalog snapshot of DATABASE_PATH, if it was compiled for `generation` and `token`.
+
+    Both come from the database (see snapshot.read_token). A missing or
+    stale snapshot is skipped silently and a corrupt one with a warning;
+    either way the caller falls back to the database.
+    """
+    if token is None:
+        return None
+    path = snapshot.snapshot_path(DATABASE_PATH)
+    try:
+        if snapshot.read_identity(path) != (generation, token):
+            return None
+        mapped = snapshot.Snapshot(path)
+    except FileNotFoundError:
+        return None
+    except snapshot.SnapshotError as e:
+        app.logger.warning('Ignoring catalog snapshot %s: %s', path, e)
+        return None
+    # An import may have swapped in a newer one since its header was read
+    if (mapped.generation, mapped.token) != (generation, token):
+        return None
+    return Catalog(DATABASE_PATH, mapped.generation, mapped.rows, parse_timestamp(mapped.last_modified),
+                   mapped.thumbnails, mapped)
+
+def preload_catalog() -> Optional[int]:
+    """Load the catalog from its snapshot, if it matches the database; returns its generation.
+
+    serve.py calls this in the master, so forked workers inherit the
+    parsed index along with the shared mapping. The database is opened
+    read-only and closed again here, so no connection crosses the fork;
+    a worker still checks the generation on its first request.
+    """
+    try:
+        conn = sqlite3.connect(Path(DATABASE_PATH).resolve().as_uri() + '?mode=ro', uri=True)
+        try:
+            generation = conn.execute('PRAGMA user_version').fetchone()[0]
+            token = snapshot.read_token(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    catalog = load_catalog_snapshot(generation, token)
+    if catalog is None:
+        return None
+    app.extensions['catalog'] = catalog
+    return catalog.generation
+
+def get_preset_files(preset_id: int) -> Dict[str, str]:
+    """Get HTML, CSS, and JS content for a preset."""
+    return get_files_for_presets([preset_id])[preset_id]
+
+def get_files_for_presets(preset_ids: List[int]) -> Dict[int, Dict[str, str]]:
+    """Get HTML, CSS, and JS content for many presets.
+
+    Files are looked up by blob hash, so presets that share a stylesheet
+    or script share one cached copy of it.
+    """
+    hashes_by_preset = get_file_hashes(preset_ids)
+    contents = get_blobs(digest for hashes in hashes_by_preset.values() for digest in hashes.values())
+    return {
+        preset_id: {file_type: contents.get(digest, '') for file_type, digest in hashes.items()}
+        for preset_id, hashes in hashes_by_preset.items()
+    }
+
+def get_file_hashes(preset_ids: List[int]) -> Dict[int, Dict[str, str]]:
+    """Get the blob hash of each HTML, CSS, and JS file of many presets.
+
+    Cached presets are served from `file_hashes_cache`; the rest are loaded
+    with batched queries and added to it. A snapshot has them all.
+    """
+    catalog = get_catalog()
+    if catalog.snapshot is not None:
+        return {preset_id: catalog.snapshot.file_hashes(preset_id) for preset_id in preset_ids}
+    generation = catalog.generation
+    hashes_by_preset: Dict[int, Dict[str, str]] = {}
+    missing = []
+    for preset_id in preset_ids:
+        hashes = file_hashes_cache.get((generation, preset_id))
+        if hashes is None:
+            missing.append(preset_id)
+            hashes = {}
+        hashes_by_preset[preset_id] = hashes
+    
+    if missing:
+        cursor = get_db_connection().cursor()
+        with timed('db'):
+            # Chunk the IN list to stay below SQLite's bound-parameter limit
+            for start in range(0, len(missing), FILES_BATCH_SIZE):
+                chunk = missing[start:start + FILES_BATCH_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT preset_id, file_type, content_hash 
+                    FROM files 
+                    WHERE preset_id IN ({placeholders})
+                ''', chunk)
+                for row in cursor.fetchall():
+                    hashes_by_preset[row['preset_id']][row['file_type']] = row['content_hash']
+    
+    for preset_id in missing:
+        file_hashes_cache.set((generation, preset_id), hashes_by_preset[preset_id])
+    
+    return hashes_by_preset
+
+def get_blobs(hashes: Iterable[str]) -> Dict[str, str]:
+    """Get file bodies by content hash, loading the ones missing from `blob_cache`.
+
+    With a snapshot, bodies are decoded straight from its mapping, which
+    the OS page cache already holds for every worker.
+    """
+    mapped = get_catalog().snapshot
+    if mapped is not None:
+        contents = {}
+        for digest in set(hashes):
+            body = mapped.blob(digest)
+            if body is not None:
+                contents[digest] = str(body, 'utf-8')
+        return contents
+    
+    contents = {}
+    missing = []
+    for digest in set(hashes):
+        content = blob_cache.get(digest)
+        if content is None:
+            missing.append(digest)
+        else:
+            contents[digest] = content
+    
+    if missing:
+        conn = get_db_connection()
+        with timed('db'):
+            loaded = blobs.load_blobs(conn, missing)
+        for digest, content in loaded.items():
+            blob_cache.set(digest, content)
+        contents.update(loaded)
+    return contents
+
+def get_preview_document(file_hashes: Dict[str, str], variant: str = 'full') -> Tuple[str, str]:
+    """Get a preview document and its hash, reading the files only on a cache miss."""
+    digest = preview_hash(file_hashes, variant)
+    document = preview_cache.get(digest)
+    if document is None:
+        contents = get_blobs(file_hashes.values())
+        files = {file_type: contents.get(file_hash, '') for file_type, file_hash in file_hashes.items()}
+        document = build_preview_document(files, variant)
+        preview_cache.set(digest, document)
+    return digest, document
+
+def get_categories_with_presets() -> List[Dict]:
+    rows = get_catalog().rows
+    preset_ids = [row['preset_id'] for row in rows if row['preset_id']]
+    hashes_by_preset = get_file_hashes(preset_ids)
+    files_by_preset = get_files_for_presets(preset_ids)
     
     categories = {}
     for row in rows:
@@ -60,25 +378,13 @@ def get_categories_with_presets() -> List[Dict]:
         
         if row['preset_id']:
             preset_id = row['preset_id']
-            files = get_preset_files(preset_id)
+            files = files_by_preset[preset_id]
             
             preview_html = files.get('html', '')
             preview_css = files.get('css', '')
             preview_js = files.get('js', '')
             
-            # Create preview content
-            preview_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <style>{preview_css}</style>
-            </head>
-            <body>
-                {preview_html}
-                <script>{preview_js}</script>
-            </body>
-            </html>
-            """
+            _, preview_content = get_preview_document(hashes_by_preset[preset_id])
             
             categories[category_id]['presets'].append({
                 'id': preset_id,
@@ -94,572 +400,353 @@ def get_categories_with_presets() -> List[Dict]:
     
     return list(categories.values())
 
-@app.route('/')
-def index():
-    categories = get_categories_with_presets()
+def get_catalog_page(page: int, per_page: int = PRESETS_PER_PAGE) -> Tuple[List[Dict], int]:
+    """Get one page of category/preset metadata and the total page count.
+
+    Pages are slices of the same category/preset listing that
+    get_categories_with_presets walks, so an empty category still takes one
+    row and a category may continue on the next page. File contents are
+    not loaded; the index fetches them from /api/presets/<id>/files. Each
+    preset carries the hash of its card preview, which versions the card
+    iframe URL, and the file name of its card thumbnail, or None when it
+    has not been rendered.
+    """
+    catalog = get_catalog()
+    rows = catalog.rows
+    total_pages = max(1, -(-len(rows) // per_page))
     
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>BBS Presets</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-        <style>
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                background-color: #f8f9fa;
-                padding: 20px 0;
-            }
-            .container {
-                max-width: 1200px;
-                margin: 0 auto;
-            }
-            .category-card {
-                background: white;
-                border-radius: 8px;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                margin-bottom: 2rem;
-                overflow: hidden;
-            }
-            .category-header {
-                background-color: #f1f8ff;
-                padding: 1rem 1.5rem;
-                border-bottom: 1px solid #dee2e6;
-            }
-            .category-header h2 {
-                margin: 0;
-                font-size: 1.5rem;
-                color: #0d6efd;
-            }
-            .presets-container {
-                padding: 1.5rem;
-            }
-            .preset-card {
-                height: 100%;
-                border: 1px solid #e9ecef;
-                border-radius: 6px;
-                transition: all 0.3s ease;
-                display: flex;
-                flex-direction: column;
-            }
-            .preset-card:hover {
-                transform: translateY(-5px);
-                box-shadow: 0 10px 20px rgba(0,0,0,0.1);
-                border-color: #86b7fe;
-            }
-            .preset-body {
-                padding: 1.25rem;
-                flex: 1;
-                display: flex;
-                flex-direction: column;
-            }
-            .preset-title {
-                font-size: 1.1rem;
-                margin-bottom: 0.75rem;
-                color: #212529;
-            }
-            .preset-description {
-                color: #6c757d;
-                font-size: 0.9rem;
-                margin-bottom: 1rem;
-                flex-grow: 1;
-            }
-            .btn-view {
-                align-self: flex-start;
-                background-color: #0d6efd;
-                border: none;
-                padding: 0.375rem 0.75rem;
-                font-size: 0.875rem;
-                border-radius: 4px;
-                color: white;
-                text-decoration: none;
-                transition: background-color 0.2s;
-            }
-            .btn-view:hover {
-                background-color: #0b5ed7;
-                color: white;
-            }
-            .no-presets {
-                color: #6c757d;
-                font-style: italic;
-                padding: 1rem 0;
-            }
-            .page-header {
-                margin-bottom: 2rem;
-                padding-bottom: 1rem;
-                border-bottom: 1px solid #e9ecef;
-            }
-            .page-title {
-                color: #0d6efd;
-                margin-bottom: 0.5rem;
-            }
-            .page-subtitle {
-                color: #6c757d;
-                font-size: 1.1rem;
-            }
-            @media (max-width: 768px) {
-                .preset-card {
-                    margin-bottom: 1rem;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <header class="page-header">
-                <h1 class="page-title">BBS Presets</h1>
-                <p class="page-subtitle">Browse and manage your presets collection</p>
-            </header>
-            
-            <div id="app">
-                {% if categories %}
-                    {% for category in categories %}
-                    <div class="category-card">
-                        <div class="category-header">
-                            <h2>{{ category.name }}</h2>
-                        </div>
-                        <div class="presets-container">
-                            <div class="row row-cols-1 row-cols-md-2 row-cols-lg-3 g-4">
-                                {% if category.presets %}
-                                    {% for preset in category.presets %}
-                                    <div class="col">
-                                        <div class="preset-card" data-preset-id="{{ preset.id }}" style="cursor: pointer;">
-                                            <div class="preset-body">
-                                                <div class="card-preview">
-                                                    <div class="preview-header">
-                                                        <h3 class="preset-title">{{ preset.name }}</h3>
-                                                        <p class="preset-description">{{ preset.description }}</p>
-                                                    </div>
-                                                    <div class="preview-iframe-container">
-                                                        <iframe class="preview-iframe" sandbox="allow-scripts" data-preset-id="{{ preset.id }}"></iframe>
-                                                        <div class="preview-overlay">
-                                                            <button class="btn btn-sm btn-outline-light preview-btn" data-preset-id="{{ preset.id }}" title="Expandir">
-                                                                <i class="bi bi-arrows-fullscreen"></i>
-                                                            </button>
-                                                        </div>
-                                                    </div>
-                                                </div>
-                                                <div class="preview-container" id="preview-{{ preset.id }}" style="display: none;">
-                                                    <div class="preview-content">
-                                                        <div class="preview-tabs">
-                                                            <button class="preview-tab active" data-tab="preview">Preview</button>
-                                                            <button class="preview-tab" data-tab="html">HTML</button>
-                                                            <button class="preview-tab" data-tab="css">CSS</button>
-                                                            <button class="preview-tab" data-tab="js">JS</button>
-                                                        </div>
-                                                        <div class="preview-frame-container">
-                                                            <iframe class="preview-frame" id="preview-frame-{{ preset.id }}" sandbox="allow-scripts"></iframe>
-                                                            <pre class="code-preview" id="html-{{ preset.id }}" style="display: none;"><code>{{ preset.files.html|e }}</code></pre>
-                                                            <pre class="code-preview" id="css-{{ preset.id }}" style="display: none;"><code>{{ preset.files.css|e }}</code></pre>
-                                                            <pre class="code-preview" id="js-{{ preset.id }}" style="display: none;"><code>{{ preset.files.js|e }}</code></pre>
-                                                        </div>
-                                                    </div>
-                                                </div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                    {% endfor %}
-                                {% else %}
-                                    <div class="col-12">
-                                        <p class="no-presets">No presets available in this category.</p>
-                                    </div>
-                                {% endif %}
-                            </div>
-                        </div>
-                    </div>
-                    {% endfor %}
-                    
-                    <!-- Preview Modal -->
-                    <div class="modal fade" id="previewModal" tabindex="-1" aria-hidden="true">
-                        <div class="modal-dialog modal-xl">
-                            <div class="modal-content">
-                                <div class="modal-header">
-                                    <h5 class="modal-title" id="previewModalLabel">Preview</h5>
-                                    <button type="button" class="btn-close" data-bs-dismiss="modal" aria-label="Close"></button>
-                                </div>
-                                <div class="modal-body">
-                                    <div class="preview-tabs">
-                                        <button class="preview-tab active" data-tab="preview">Preview</button>
-                                        <button class="preview-tab" data-tab="html">HTML</button>
-                                        <button class="preview-tab" data-tab="css">CSS</button>
-                                        <button class="preview-tab" data-tab="js">JS</button>
-                                    </div>
-                                    <div class="preview-content">
-                                        <iframe id="previewFrame" class="preview-frame" sandbox="allow-scripts"></iframe>
-                                        <pre id="htmlContent" class="code-preview" style="display: none;"><code></code></pre>
-                                        <pre id="cssContent" class="code-preview" style="display: none;"><code></code></pre>
-                                        <pre id="jsContent" class="code-preview" style="display: none;"><code></code></pre>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                {% else %}
-                    <div class="alert alert-info">
-                        No categories found. Please import some presets first.
-                    </div>
-                {% endif %}
-            </div>
-        </div>
-    </div>
-
-    <script>
-        document.addEventListener('DOMContentLoaded', function() {
-            console.log('BBS Presets app initialized');
-            
-            // Initialize tooltips if any
-            var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
-            tooltipTriggerList.map(function (tooltipTriggerEl) {
-                return new bootstrap.Tooltip(tooltipTriggerEl);
-            });
-            
-            // Initialize modals
-            const previewModal = new bootstrap.Modal(document.getElementById('previewModal'));
-            
-            // Handle tab switching in the preview modal
-            function setupTabs(container, presetId = null) {
-                const tabs = container.querySelectorAll('.preview-tab');
-                tabs.forEach(tab => {
-                    tab.addEventListener('click', function(e) {
-                        e.stopPropagation();
-                        const tabName = this.getAttribute('data-tab');
-                        
-                        // Update active tab
-                        tabs.forEach(t => t.classList.remove('active'));
-                        this.classList.add('active');
-                        
-                        // Hide all content
-                        container.querySelectorAll('.preview-frame, .code-preview').forEach(el => {
-                            el.style.display = 'none';
-                        });
-                        
-                        // Show selected content
-                        if (tabName === 'preview') {
-                            container.querySelector('.preview-frame').style.display = 'block';
-                        } else if (presetId) {
-                            const content = container.querySelector(`#${tabName}-${presetId}`);
-                            if (content) content.style.display = 'block';
-                        } else {
-                            const content = container.querySelector(`#${tabName}Content`);
-                            if (content) content.style.display = 'block';
-                        }
-                    });
-                });
-            }
-            
-            // Set up click handlers for preset cards
-            document.querySelectorAll('.preset-card').forEach(card => {
-                card.addEventListener('click', function(e) {
-                    if (e.target.closest('.preview-tab')) return;
-                    
-                    const presetId = this.querySelector('[id^="preview-"]')?.id.replace('preview-', '');
-                    if (!presetId) return;
-                    
-                    const previewContent = document.getElementById(`preview-${presetId}`).innerHTML;
-                    const modalBody = document.querySelector('#previewModal .modal-body');
-                    const htmlCode = document.querySelector(`#html-${presetId} code`).textContent;
-                    const cssCode = document.querySelector(`#css-${presetId} code`).textContent;
-                    const jsCode = document.querySelector(`#js-${presetId} code`).textContent;
-                    
-                    modalBody.innerHTML = `
-                        <div class="preview-content">
-                            <div class="preview-tabs">
-                                <button class="preview-tab active" data-tab="preview">Preview</button>
-                                <button class="preview-tab" data-tab="html">HTML</button>
-                                <button class="preview-tab" data-tab="css">CSS</button>
-                                <button class="preview-tab" data-tab="js">JS</button>
-                            </div>
-                            <div class="preview-frame-container">
-                                <iframe class="preview-frame" id="preview-frame-${presetId}" sandbox="allow-scripts"></iframe>
-                                <pre class="code-preview" id="html-${presetId}" style="display: none;"><code>${htmlCode.replace(/</g, '&lt;').replace(/>/g, '&gt;')}</code></pre>
-                                <pre class="code-preview" id="css-${presetId}" style="display: none;"><code>${cssCode.replace(/</g, '&lt;').replace(/>/g, '&gt;')}</code></pre>
-                                <pre class="code-preview" id="js-${presetId}" style="display: none;"><code>${jsCode.replace(/</g, '&lt;').replace(/>/g, '&gt;')}</code></pre>
-                            </div>
-                        </div>
-                    `;
-                    
-                    // Set up the preview iframe
-                    const previewFrame = modalBody.querySelector('.preview-frame');
-                    if (previewFrame) {
-                        const htmlContent = document.querySelector(`#html-${presetId} code`).textContent;
-                        const cssContent = document.querySelector(`#css-${presetId} code`).textContent;
-                        const jsContent = document.querySelector(`#js-${presetId} code`).textContent;
-                        
-                        // Create a data URL with the content
-                        const previewHtml = `
-                            <!DOCTYPE html>
-                            <html>
-                            <head>
-                                <base target="_parent">
-                                <style>
-                                    ${cssContent.replace(/`/g, '\`')}
-                                    body { margin: 0; padding: 10px; }
-                                </style>
-                            </head>
-                            <body>
-                                ${htmlContent.replace(/`/g, '\`')}
-                                <script>
-                                    try {
-                                        ${jsContent.replace(/`/g, '\`')}
-                                    } catch (e) {
-                                        console.error('Error in preview script:', e);
-                                    }
-                                <\/script>
-                            </body>
-                            </html>
-                        `;
-                        
-                        // Set the iframe's src to a data URL
-                        const dataUrl = 'data:text/html;charset=utf-8,' + encodeURIComponent(previewHtml);
-                        previewFrame.src = dataUrl;
-                    }
-                    
-                    // Set up tabs in the modal
-                    setupTabs(modalBody, presetId);
-                    
-                    // Show the modal
-                    previewModal.show();
-                });
-            });
-            
-            // Set up any initial tabs (if any)
-            document.querySelectorAll('.preview-content').forEach(container => {
-                setupTabs(container);
-            });
-            
-            // Initialize card previews
-            document.querySelectorAll('.preview-iframe').forEach(iframe => {
-                const presetId = iframe.getAttribute('data-preset-id');
-                if (presetId) {
-                    const htmlContent = document.querySelector(`#html-${presetId} code`).textContent;
-                    const cssContent = document.querySelector(`#css-${presetId} code`).textContent;
-                    const previewHtml = `
-                        <!DOCTYPE html>
-                        <html>
-                        <head>
-                            <base target="_parent">
-                            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                            <style>
-                                ${cssContent.replace(/`/g, '\`')}
-                                body { 
-                                    margin: 0;
-                                    padding: 0;
-                                    width: 100%;
-                                    height: 100%;
-                                    display: flex;
-                                    justify-content: center;
-                                    align-items: center;
-                                    overflow: hidden;
-                                }
-                                .preview-content {
-                                    transform: scale(0.7);
-                                    transform-origin: center;
-                                    width: 143%;
-                                    max-width: 100%;
-                                    text-align: center;
-                                }
-                                * {
-                                    max-width: 100% !important;
-                                }
-                            </style>
-                        </head>
-                        <body>
-                            ${htmlContent.replace(/`/g, '\`')}
-                        </body>
-                        </html>
-                    `;
-                    iframe.srcdoc = previewHtml;
-                }
-            });
-            
-            // Make preview buttons open the modal
-            document.querySelectorAll('.preview-btn').forEach(btn => {
-                btn.addEventListener('click', function(e) {
-                    e.stopPropagation();
-                    const presetId = this.getAttribute('data-preset-id');
-                    if (presetId) {
-                        const card = this.closest('.preset-card');
-                        if (card) card.click();
-                    }
-                });
-            });
-            
-            // Close modal when clicking outside or pressing Escape
-            document.addEventListener('click', function(e) {
-                const modal = document.getElementById('previewModal');
-                if (e.target === modal) {
-                    previewModal.hide();
-                }
-            });
-            
-            // Close modal with Escape key
-            document.addEventListener('keydown', function(e) {
-                if (e.key === 'Escape') {
-                    previewModal.hide();
-                }
-            });
-            
-            // Remove any inline onclick handlers that might be causing issues
-            document.querySelectorAll('.preset-card[onclick]').forEach(card => {
-                const presetId = card.getAttribute('data-preset-id');
-                card.removeAttribute('onclick');
-                if (presetId) {
-                    card.setAttribute('data-preset-id', presetId);
-                }
-            });
-        });
-        </script>
-        <style>
-            .preview-tabs {
-                display: flex;
-                border-bottom: 1px solid #dee2e6;
-                margin-bottom: 1rem;
-            }
-            .preview-tab {
-                padding: 0.5rem 1rem;
-                background: none;
-                border: none;
-                border-bottom: 2px solid transparent;
-                cursor: pointer;
-                margin-right: 0.5rem;
-            }
-            .preview-tab.active {
-                border-bottom-color: #0d6efd;
-                color: #0d6efd;
-                font-weight: 500;
-            }
-            .preview-frame {
-                width: 100%;
-                height: 500px;
-                border: 1px solid #dee2e6;
-                border-radius: 4px;
-                background: white;
-            }
-            .code-preview {
-                height: 500px;
-                margin: 0;
-                border: 1px solid #dee2e6;
-                border-radius: 4px;
-                background: #f8f9fa;
-                overflow: auto;
-                padding: 1rem;
-                white-space: pre-wrap;
-                font-family: 'Courier New', monospace;
-                font-size: 14px;
-                line-height: 1.5;
-            }
-            .modal-xl {
-                max-width: 90%;
-            }
-            .modal-body {
-                padding: 0;
-            }
-            .preview-content {
-                padding: 1rem;
-            }
-            
-            /* Card Preview Styles */
-            .preset-card {
-                display: flex;
-                flex-direction: column;
-                height: 100%;
-                padding: 0;
-                overflow: hidden;
-            }
-            
-            .preset-body {
-                padding: 0;
-                display: flex;
-                flex-direction: column;
-                height: 100%;
-            }
-            
-            .card-preview {
-                flex-grow: 1;
-                display: flex;
-                flex-direction: column;
-                height: 100%;
-                background: #f8f9fa;
-            }
-            
-            .preview-header {
-                padding: 1rem 1rem 0.5rem;
-                background: white;
-                border-bottom: 1px solid rgba(0,0,0,0.1);
-            }
-            
-            .preset-title {
-                font-size: 1.1rem;
-                margin: 0 0 0.25rem 0;
-                white-space: nowrap;
-                overflow: hidden;
-                text-overflow: ellipsis;
-            }
-            
-            .preset-description {
-                font-size: 0.8rem;
-                color: #6c757d;
-                margin: 0;
-                white-space: nowrap;
-                overflow: hidden;
-                text-overflow: ellipsis;
-            }
-            
-            .preview-iframe-container {
-                position: relative;
-                flex-grow: 1;
-                min-height: 200px;
-                background: white;
-                overflow: hidden;
-            }
-            
-            .preview-iframe {
-                position: absolute;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                border: none;
-                pointer-events: none;
-                background: white;
-            }
-            
-            .preview-overlay {
-                position: absolute;
-                top: 0.5rem;
-                right: 0.5rem;
-                z-index: 10;
-                opacity: 0;
-                transition: opacity 0.2s;
-            }
-            
-            .preview-iframe-container:hover .preview-overlay {
-                opacity: 1;
-            }
-            
-            .preview-btn {
-                width: 32px;
-                height: 32px;
-                padding: 0;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                border-radius: 50%;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.2);
+    page_rows = rows[(page - 1) * per_page:page * per_page]
+    hashes_by_preset = get_file_hashes([row['preset_id'] for row in page_rows if row['preset_id']])
+    categories = {}
+    for row in page_rows:
+        category_id = row['category_id']
+        if category_id not in categories:
+            categories[category_id] = {
+                'id': category_id,
+                'name': row['category_name'],
+                'presets': []
             }
-        </style>
         
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
+        if row['preset_id']:
+            card_hash = preview_hash(hashes_by_preset[row['preset_id']], 'card')
+            image_format = catalog.thumbnails.get(card_hash)
+            categories[category_id]['presets'].append({
+                'id': row['preset_id'],
+                'name': row['preset_name'],
+                'description': row['preset_description'] or 'No description available',
+                'card_hash': card_hash,
+                'thumbnail': f'{card_hash}.{image_format}' if image_format else None
+            })
+    
+    return list(categories.values()), total_pages
+
+@app.route('/api/presets/<int:preset_id>/files')
+@timed_view
+def preset_files(preset_id: int):
+    if preset_id not in get_catalog().preset_ids:
+        abort(404)
+    
+    files = get_preset_files(preset_id)
+    file_hashes = get_file_hashes([preset_id])[preset_id]
+    return jsonify({
+        'id': preset_id,
+        'html': files.get('html', ''),
+        'css': files.get('css', ''),
+        'js': files.get('js', ''),
+        'preview_url': url_for('preview', preset_id=preset_id, v=preview_hash(file_hashes, 'full'))
+    })
+
+@app.route('/api/catalog')
+@timed_view
+def catalog_page():
+    """One page of the category/preset listing, as the index renders it."""
+    page = max(1, request.args.get('page', 1, type=int))
+    categories, total_pages = get_catalog_page(page)
+    if page > total_pages:
+        abort(404)
+    return jsonify({'page': page, 'total_pages': total_pages, 'categories': categories})
+
+@app.route('/api/search')
+@timed_view
+def search():
+    """Search preset names, descriptions and file contents.
+
+    `q` is required; `page` and `per_page` page through the results, which
+    are ranked by relevance and carry an HTML snippet with <mark>ed matches.
+    """
+    query = request.args.get('q', '')
+    match = build_match_query(query)
+    if match is None:
+        abort(400)
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(max(1, request.args.get('per_page', SEARCH_PER_PAGE, type=int)), SEARCH_MAX_PER_PAGE)
+    
+    key = (get_catalog().generation, match, page, per_page)
+    cached = search_cache.get(key)
+    if cached is None:
+        try:
+            conn = get_db_connection()
+            with timed('db'):
+                total, results = search_presets(conn, match, page, per_page)
+        except sqlite3.OperationalError:
+            # No search index yet: the database predates it and hasn't been re-imported
+            abort(503)
+        for result in results:
+            result['files_url'] = url_for('preset_files', preset_id=result['id'])
+            result['preview_url'] = url_for('preview', preset_id=result['id'])
+        search_cache.set(key, (total, results))
+    else:
+        total, results = cached
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'total_pages': -(-total // per_page),
+        'results': results
+    })
+
+@app.route('/preview/<int:preset_id>')
+@timed_view
+def preview(preset_id: int):
+    """Serve a preset's combined preview document.
+
+    The strong ETag is the preview hash, derived from the blob hashes of
+    the files. URLs that carry the current hash as `?v=` are cached as
+    immutable; unversioned URLs must revalidate, which costs a 304 as long
+    as the files are unchanged.
+    """
+    variant = request.args.get('variant', 'full')
+    if variant not in PREVIEW_VARIANTS:
+        abort(400)
+    
+    if preset_id not in get_catalog().preset_ids:
+        abort(404)
+    
+    digest, document = get_preview_document(get_file_hashes([preset_id])[preset_id], variant)
+    response = make_response(document)
+    response.set_etag(digest)
+    if request.args.get('v') == digest:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    # Keep the document sandboxed even when opened outside the index iframes
+    response.headers['Content-Security-Policy'] = 'sandbox allow-scripts'
+    return response.make_conditional(request)
+
+@app.route('/thumbnails/<filename>')
+@timed_view
+def thumbnail(filename: str):
+    """Serve a rendered card thumbnail. It is named by its preview hash, so it never needs revalidating."""
+    digest, _, image_format = filename.partition('.')
+    mapped = get_catalog().snapshot
+    if mapped is not None:
+        entry = mapped.thumbnail(digest)
+        if entry is None:
+            abort(404)
+    else:
+        entry = thumbnail_cache.get(digest)
+    if entry is None:
+        conn = get_db_connection()
+        with timed('db'):
+            row = conn.execute('SELECT format, data FROM thumbnails WHERE hash = ?', (digest,)).fetchone()
+        if row is None:
+            abort(404)
+        entry = (row['format'], bytes(row['data']))
+        thumbnail_cache.set(digest, entry)
+    stored_format, data = entry
+    if image_format != stored_format:
+        abort(404)
+    # WSGI servers want bytes, so a snapshot's image is copied out of its mapping here
+    response = make_response(bytes(data))
+    response.mimetype = f'image/{stored_format}'
+    response.set_etag(digest)
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+@app.route('/static/<path:filename>')
+def static(filename: str):
+    """Serve a built bundle. Its name changes with its content, so it never needs revalidating."""
+    response = send_from_directory(assets.STATIC_DIR, filename, max_age=STATIC_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.template_global()
+def asset_url(name: str) -> str:
+    """URL of the current build of a bundle from assets.BUNDLES."""
+    return url_for('static', filename=asset_manifest[name])
+
+@app.route('/')
+@timed_view
+def index():
+    page = max(1, request.args.get('page', 1, type=int))
+    categories, total_pages = get_catalog_page(page)
+    if page > total_pages:
+        abort(404)
+    
+    context = {'categories': categories, 'page': page, 'total_pages': total_pages}
+    response = stream_page('index.html', **context)
+    # The page only shows catalog metadata, so it is unchanged while its rows are
+    response.set_etag(page_etag('index.html', **context))
+    response.last_modified = get_catalog().last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def stream_page(template_name: str, **context) -> Response:
+    """Render a template as a streamed response.
+
+    The head and first cards reach the browser while the rest of the page
+    is still rendering. Events are buffered so each chunk carries a useful
+    amount of markup instead of one tiny write per template node.
     """
+    template = app.jinja_env.get_template(template_name)
+    app.update_template_context(context)
+    stream = template.stream(context)
+    stream.enable_buffering(TEMPLATE_STREAM_BUFFER)
+    return Response(stream_with_context(timed_stream(stream)), mimetype='text/html')
+
+def timed_stream(chunks: Iterable[str]) -> Iterable[str]:
+    """Count the time taken to produce each chunk of a streamed page as render."""
+    chunks = iter(chunks)
+    while True:
+        with timed('render'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+@functools.lru_cache(maxsize=None)
+def template_hash(template_name: str) -> str:
+    source, _, _ = app.jinja_loader.get_source(app.jinja_env, template_name)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+def page_etag(template_name: str, **context) -> str:
+    """ETag of a rendered page: a hash of its template, the asset bundles and the context it is rendered with."""
+    digest = hashlib.sha256(template_hash(template_name).encode())
+    digest.update(request.script_root.encode())
+    digest.update(json.dumps(asset_manifest, sort_keys=True).encode())
+    digest.update(json.dumps(context, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Request latency, phase and query histograms of this process, for Prometheus."""
+    body = metrics.exposition((request_duration, request_phase_duration, request_queries, request_connections))
+    return Response(body, content_type=metrics.CONTENT_TYPE)
+
+@app.before_request
+def start_request_stats():
+    g.request_stats = metrics.RequestStats(record_queries=SLOW_REQUEST_THRESHOLD is not None)
+
+# Registered before compress_response, so it runs after it and sees the final status
+@app.after_request
+def record_request_stats(response: Response) -> Response:
+    stats = request_stats()
+    if stats is not None:
+        # Streamed bodies are rendered after this returns; observe once the last chunk is out
+        response.call_on_close(functools.partial(
+            observe_request, stats, request.endpoint or 'none', request.method, request.full_path.rstrip('?'),
+            response.status_code
+        ))
+    return response
+
+def observe_request(stats: metrics.RequestStats, endpoint: str, method: str, path: str, status: int) -> None:
+    elapsed = stats.elapsed()
+    request_duration.observe(elapsed, endpoint, method, str(status))
+    for phase, seconds in stats.phases.items():
+        request_phase_duration.observe(seconds, endpoint, phase)
+    request_queries.observe(stats.queries, endpoint)
+    request_connections.observe(stats.connections, endpoint)
     
-    return render_template_string(html, categories=categories)
+    if SLOW_REQUEST_THRESHOLD is not None and elapsed >= SLOW_REQUEST_THRESHOLD:
+        phases = ' '.join(f'{phase}={stats.phases.get(phase, 0.0) * 1000:.1f}ms' for phase in metrics.PHASES)
+        other = elapsed - sum(stats.phases.values())
+        lines = [f'Slow request: {method} {path} {status} in {elapsed * 1000:.1f}ms '
+                 f'({phases} other={other * 1000:.1f}ms), {stats.queries} queries, '
+                 f'{stats.connections} connections']
+        lines.extend(f'  {statement}' for statement in stats.statements or ())
+        app.logger.warning('\n'.join(lines))
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    """Answer conditional GETs and compress text responses.
+
+    Successful responses without an ETag from their view get one from their
+    body, then If-None-Match/If-Modified-Since are checked, so an unchanged
+    resource costs a 304. Streamed bodies, and others of COMPRESS_MIN_SIZE
+    bytes or more, are compressed in the best coding the client accepts.
+    Compressed bodies are kept in `compressed_cache` under their ETag, so a
+    representation is compressed once; a compressed response carries the
+    weak form of the ETag, which conditional requests still match.
+    """
+    if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    
+    if not response.is_streamed and not response.get_etag()[0]:
+        response.add_etag()
+    etag, _ = response.get_etag()
+    # Not make_conditional: it would buffer a streamed body to measure it.
+    # A 304 is sent without its body, which is closed before it is rendered.
+    if not is_resource_modified(request.environ, etag, last_modified=response.last_modified):
+        response.status_code = 304
+        return response
+    
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    key = (request.path, etag, encoding) if etag else None
+    body = compressed_cache.get(key) if key else None
+    if body is None and response.is_streamed:
+        on_complete = functools.partial(compressed_cache.set, key) if key else None
+        response.response = compress_stream(response.response, encoding, on_complete)
+        response.headers.pop('Content-Length', None)
+    else:
+        if body is None:
+            data = response.get_data()
+            if len(data) < COMPRESS_MIN_SIZE:
+                return response
+            body = compress(data, encoding)
+            if key:
+                compressed_cache.set(key, body)
+        elif hasattr(response.response, 'close'):
+            # Drop the unrendered stream in favour of the cached body
+            response.response.close()
+        response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+def warm_caches(pages: int = 1) -> int:
+    """Load the current catalog and render its first `pages` index pages.
+
+    Each page is requested once per content coding, which fills the
+    compressed page cache, and its card previews are built. Server workers
+    call this at startup and when the catalog changes, so the reload is
+    paid before requests need it. Returns the generation loaded.
+    """
+    client = app.test_client()
+    for page in range(1, pages + 1):
+        for encoding in available_encodings():
+            client.get('/', query_string={'page': page}, headers={'Accept-Encoding': encoding}, buffered=True)
+    
+    with app.app_context():
+        catalog = get_catalog()
+        preset_ids = [row['preset_id'] for row in catalog.rows[:pages * PRESETS_PER_PAGE] if row['preset_id']]
+        for file_hashes in get_file_hashes(preset_ids).values():
+            get_preview_document(file_hashes, 'card')
+        return catalog.generation
+
+# Compile the index template once at startup instead of on the first request
+app.jinja_env.get_template('index.html')
 
 if __name__ == '__main__':
+    # Pick up edits to the asset sources; the reloader runs this in each new process
+    asset_manifest.update(assets.build())
     app.run(debug=True, port=5000)
 
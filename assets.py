@@ -0,0 +1,114 @@
+"""Build the app's CSS and JS bundles.
+
+Sources live in ASSETS_DIR: the app's own stylesheet and script, plus a
+vendored copy of Bootstrap (and the Popper build its tooltips need), so
+the page never reaches out to a CDN. Each bundle is minified,
+concatenated and written to STATIC_DIR under a name that carries its
+content hash, e.g. ``app.3f9c2e71b0d4.css``; ``manifest.json`` maps
+bundle names to those files. A changed source gets a new file name, so
+the files can be cached forever::
+
+    python assets.py
+
+The app builds on startup when the manifest is missing, and always when
+it is run directly in debug mode.
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Sequence
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(ROOT, 'assets')
+STATIC_DIR = os.path.join(ROOT, 'static')
+MANIFEST_NAME = 'manifest.json'
+# Bundle name -> its sources, relative to ASSETS_DIR, in load order
+BUNDLES: Dict[str, Sequence[str]] = {
+    'app.css': ('vendor/bootstrap-5.1.3/bootstrap.min.css', 'index.css'),
+    'app.js': ('vendor/bootstrap-5.1.3/popper.min.js', 'vendor/bootstrap-5.1.3/bootstrap.min.js', 'index.js'),
+}
+# Hex digits of the content hash in bundle file names
+FINGERPRINT_LENGTH = 12
+
+# Comments, except /*! ... */ license headers
+_CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+# Only around characters where whitespace never matters; before ':' it can (`a :hover`)
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_CSS_COLON = re.compile(r':\s+')
+_JS_LINE_COMMENT = re.compile(r'^\s*//.*$', re.M)
+_SOURCE_MAP = re.compile(r'^\s*(?://|/\*)# sourceMappingURL=.*$', re.M)
+
+def minify_css(source: str) -> str:
+    source = _CSS_COMMENT.sub('', source)
+    source = _CSS_SPACE.sub(' ', source)
+    source = _CSS_PUNCTUATION.sub(r'\1', source)
+    source = _CSS_COLON.sub(':', source)
+    return source.replace(';}', '}').strip()
+
+def minify_js(source: str) -> str:
+    """Drop indentation, blank lines and whole-line comments.
+
+    Deliberately conservative: without a parser, anything more (joining
+    lines, comments after code) could break strings and regexes.
+    """
+    source = _JS_LINE_COMMENT.sub('', source)
+    return '\n'.join(line.strip() for line in source.splitlines() if line.strip())
+
+def read_source(path: str) -> str:
+    with open(os.path.join(ASSETS_DIR, path), encoding='utf-8') as f:
+        source = _SOURCE_MAP.sub('', f.read())
+    if '.min.' in os.path.basename(path):
+        return source.strip()
+    return minify_css(source) if path.endswith('.css') else minify_js(source)
+
+def fingerprinted_name(name: str, content: str) -> str:
+    stem, ext = os.path.splitext(name)
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:FINGERPRINT_LENGTH]
+    return f'{stem}.{digest}{ext}'
+
+def _write_atomic(path: str, content: str) -> None:
+    # Several app workers may build at once; each file appears whole or not at all
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def build(output_dir: str = STATIC_DIR) -> Dict[str, str]:
+    """Write every bundle and the manifest to `output_dir`; returns the manifest.
+
+    Bundles of earlier builds are deleted.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        separator = '\n' if name.endswith('.css') else ';\n'
+        content = separator.join(read_source(source) for source in sources) + '\n'
+        file_name = fingerprinted_name(name, content)
+        path = os.path.join(output_dir, file_name)
+        if not os.path.exists(path):
+            _write_atomic(path, content)
+        manifest[name] = file_name
+    _write_atomic(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True) + '\n')
+
+    bundle_names = {re.compile(rf'{re.escape(stem)}\.[0-9a-f]{{{FINGERPRINT_LENGTH}}}{re.escape(ext)}$')
+                    for stem, ext in map(os.path.splitext, BUNDLES)}
+    current = set(manifest.values())
+    for file_name in os.listdir(output_dir):
+        if file_name not in current and any(pattern.match(file_name) for pattern in bundle_names):
+            os.remove(os.path.join(output_dir, file_name))
+    return manifest
+
+def load_manifest(output_dir: str = STATIC_DIR) -> Dict[str, str]:
+    """Read the manifest of the last build, building first if there is none."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return build(output_dir)
+
+if __name__ == '__main__':
+    for bundle, file_name in build().items():
+        size = os.path.getsize(os.path.join(STATIC_DIR, file_name))
+        print(f"{bundle:<8} -> static/{file_name} ({size / 1024:.1f} KB)")
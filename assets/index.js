@@ -0,0 +1,144 @@
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('BBS Presets app initialized');
+
+    // Initialize tooltips if any
+    var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
+    tooltipTriggerList.map(function (tooltipTriggerEl) {
+        return new bootstrap.Tooltip(tooltipTriggerEl);
+    });
+
+    // Initialize modals
+    const previewModal = new bootstrap.Modal(document.getElementById('previewModal'));
+
+    // Handle tab switching in the preview modal
+    function setupTabs(container, presetId = null) {
+        const tabs = container.querySelectorAll('.preview-tab');
+        tabs.forEach(tab => {
+            tab.addEventListener('click', function(e) {
+                e.stopPropagation();
+                const tabName = this.getAttribute('data-tab');
+
+                // Update active tab
+                tabs.forEach(t => t.classList.remove('active'));
+                this.classList.add('active');
+
+                // Hide all content
+                container.querySelectorAll('.preview-frame, .code-preview').forEach(el => {
+                    el.style.display = 'none';
+                });
+
+                // Show selected content
+                if (tabName === 'preview') {
+                    container.querySelector('.preview-frame').style.display = 'block';
+                } else if (presetId) {
+                    const content = container.querySelector(`#${tabName}-${presetId}`);
+                    if (content) content.style.display = 'block';
+                } else {
+                    const content = container.querySelector(`#${tabName}Content`);
+                    if (content) content.style.display = 'block';
+                }
+            });
+        });
+    }
+
+    // Preset files are loaded on demand when a card is opened
+    const presetFiles = new Map();
+    function fetchPresetFiles(presetId, url) {
+        if (!presetFiles.has(presetId)) {
+            presetFiles.set(presetId, fetch(url).then(response => {
+                if (!response.ok) throw new Error(`Failed to load preset ${presetId}: ${response.status}`);
+                return response.json();
+            }));
+        }
+        return presetFiles.get(presetId);
+    }
+
+    function escapeCode(code) {
+        return code.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    }
+
+    // Set up click handlers for preset cards
+    document.querySelectorAll('.preset-card').forEach(card => {
+        card.addEventListener('click', function(e) {
+            if (e.target.closest('.preview-tab')) return;
+
+            const presetId = this.getAttribute('data-preset-id');
+            if (!presetId) return;
+
+            // The page gives the URL, so it also works in a static export
+            fetchPresetFiles(presetId, this.getAttribute('data-files-url')).then(files => {
+                const modalBody = document.querySelector('#previewModal .modal-body');
+
+                modalBody.innerHTML = `
+                    <div class="preview-content">
+                        <div class="preview-tabs">
+                            <button class="preview-tab active" data-tab="preview">Preview</button>
+                            <button class="preview-tab" data-tab="html">HTML</button>
+                            <button class="preview-tab" data-tab="css">CSS</button>
+                            <button class="preview-tab" data-tab="js">JS</button>
+                        </div>
+                        <div class="preview-frame-container">
+                            <iframe class="preview-frame" id="preview-frame-${presetId}" sandbox="allow-scripts"></iframe>
+                            <pre class="code-preview" id="html-${presetId}" style="display: none;"><code>${escapeCode(files.html)}</code></pre>
+                            <pre class="code-preview" id="css-${presetId}" style="display: none;"><code>${escapeCode(files.css)}</code></pre>
+                            <pre class="code-preview" id="js-${presetId}" style="display: none;"><code>${escapeCode(files.js)}</code></pre>
+                        </div>
+                    </div>
+                `;
+
+                // Point the preview iframe at the server-rendered document
+                const previewFrame = modalBody.querySelector('.preview-frame');
+                if (previewFrame) {
+                    previewFrame.src = files.preview_url;
+                }
+
+                // Set up tabs in the modal
+                setupTabs(modalBody, presetId);
+
+                // Show the modal
+                previewModal.show();
+            }).catch(error => console.error(error));
+        });
+    });
+
+    // Set up any initial tabs (if any)
+    document.querySelectorAll('.preview-content').forEach(container => {
+        setupTabs(container);
+    });
+
+    // Make preview buttons open the modal
+    document.querySelectorAll('.preview-btn').forEach(btn => {
+        btn.addEventListener('click', function(e) {
+            e.stopPropagation();
+            const presetId = this.getAttribute('data-preset-id');
+            if (presetId) {
+                const card = this.closest('.preset-card');
+                if (card) card.click();
+            }
+        });
+    });
+
+    // Close modal when clicking outside or pressing Escape
+    document.addEventListener('click', function(e) {
+        const modal = document.getElementById('previewModal');
+        if (e.target === modal) {
+            previewModal.hide();
+        }
+    });
+
+    // Close modal with Escape key
+    document.addEventListener('keydown', function(e) {
+        if (e.key === 'Escape') {
+            previewModal.hide();
+        }
+    });
+
+    // Remove any inline onclick handlers that might be causing issues
+    document.querySelectorAll('.preset-card[onclick]').forEach(card => {
+        const presetId = card.getAttribute('data-preset-id');
+        card.removeAttribute('onclick');
+        if (presetId) {
+            card.setAttribute('data-preset-id', presetId);
+        }
+    });
+});
@@ -0,0 +1,163 @@
+"""Async variant of the preset API, on aiohttp.web.
+
+The Flask app holds a worker thread for the whole of each request, so a
+burst of preview fetches from many open tabs ties up every thread, each
+one blocked on SQLite, and the rest wait in the listen queue. Here the
+event loop holds any number of connections, and only the blocking work
+runs on a bounded pool of `--db-threads` threads. That work is the same
+cached loaders app.py uses, each with its own pooled SQLite connection,
+so both apps share caches and behaviour. The routes mirror the Flask
+API::
+
+    GET /api/catalog?page=N
+    GET /api/presets/<id>/files
+    GET /preview/<id>?variant=card|full&v=<hash>
+
+Run it on its own, or under gunicorn with one event loop per worker::
+
+    python async_app.py --port 8001 --db-threads 8
+    gunicorn 'async_app:create_app()' --worker-class aiohttp.GunicornWebWorker --workers 4
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from aiohttp import web
+from aiohttp.helpers import ETAG_ANY, ETag
+
+import app
+from previews import PREVIEW_VARIANTS, preview_hash
+
+# Threads (and so SQLite connections) doing blocking work, per process
+DB_THREADS = 8
+
+T = TypeVar('T')
+EXECUTOR = web.AppKey('executor', ThreadPoolExecutor)
+
+def _in_app_context(func: Callable[..., T], *args) -> T:
+    # app.py's loaders keep their connection and catalog in Flask's `g`
+    with app.app.app_context():
+        return func(*args)
+
+async def call(request: web.Request, func: Callable[..., T], *args) -> T:
+    """Run one of the blocking loaders on the DB thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app[EXECUTOR], functools.partial(_in_app_context, func, *args))
+
+def not_modified(request: web.Request, etag: str) -> bool:
+    return any(tag.value in (etag, ETAG_ANY) for tag in request.if_none_match or ())
+
+def finish(request: web.Request, response: web.Response, etag: str) -> web.StreamResponse:
+    """Answer If-None-Match with a 304, and compress a large enough body."""
+    compressed = len(response.body) >= app.COMPRESS_MIN_SIZE and 'gzip' in request.headers.get('Accept-Encoding', '')
+    # Weak for a compressed representation, as the Flask app sends it
+    tag = ETag(value=etag, is_weak=compressed)
+    if not_modified(request, etag):
+        not_modified_response = web.Response(status=304, headers={
+            'Cache-Control': response.headers.get('Cache-Control', 'no-cache')
+        })
+        not_modified_response.etag = tag
+        return not_modified_response
+    response.etag = tag
+    if compressed:
+        response.enable_compression()
+    return response
+
+def json_response(request: web.Request, data: Dict) -> web.StreamResponse:
+    body = json.dumps(data).encode('utf-8')
+    return finish(request, web.Response(body=body, content_type='application/json'), hashlib.sha1(body).hexdigest())
+
+def _catalog_page(page: int) -> Optional[Dict]:
+    categories, total_pages = app.get_catalog_page(page)
+    if page > total_pages:
+        return None
+    return {'page': page, 'total_pages': total_pages, 'categories': categories}
+
+def _preset_files(preset_id: int) -> Optional[Tuple[Dict[str, str], Dict[str, str]]]:
+    if preset_id not in app.get_catalog().preset_ids:
+        return None
+    return app.get_preset_files(preset_id), app.get_file_hashes([preset_id])[preset_id]
+
+def _preview(preset_id: int, variant: str) -> Optional[Tuple[str, str]]:
+    if preset_id not in app.get_catalog().preset_ids:
+        return None
+    return app.get_preview_document(app.get_file_hashes([preset_id])[preset_id], variant)
+
+async def catalog_page(request: web.Request) -> web.StreamResponse:
+    try:
+        page = max(1, int(request.query.get('page', 1)))
+    except ValueError:
+        page = 1
+    data = await call(request, _catalog_page, page)
+    if data is None:
+        raise web.HTTPNotFound()
+    return json_response(request, data)
+
+async def preset_files(request: web.Request) -> web.StreamResponse:
+    preset_id = int(request.match_info['preset_id'])
+    result = await call(request, _preset_files, preset_id)
+    if result is None:
+        raise web.HTTPNotFound()
+    files, file_hashes = result
+    preview_url = request.app.router['preview'].url_for(preset_id=str(preset_id)).with_query(
+        v=preview_hash(file_hashes, 'full')
+    )
+    return json_response(request, {
+        'id': preset_id,
+        'html': files.get('html', ''),
+        'css': files.get('css', ''),
+        'js': files.get('js', ''),
+        'preview_url': str(preview_url),
+    })
+
+async def preview(request: web.Request) -> web.StreamResponse:
+    """Serve a preset's preview document, with the same caching rules as the Flask view."""
+    variant = request.query.get('variant', 'full')
+    if variant not in PREVIEW_VARIANTS:
+        raise web.HTTPBadRequest()
+    result = await call(request, _preview, int(request.match_info['preset_id']), variant)
+    if result is None:
+        raise web.HTTPNotFound()
+    digest, document = result
+    response = web.Response(text=document, content_type='text/html', headers={
+        'Cache-Control': 'public, max-age=31536000, immutable' if request.query.get('v') == digest else 'no-cache',
+        'Content-Security-Policy': 'sandbox allow-scripts',
+    })
+    return finish(request, response, digest)
+
+async def warm_caches(web_app: web.Application) -> None:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(web_app[EXECUTOR], app.warm_caches)
+
+async def shutdown_executor(web_app: web.Application) -> None:
+    web_app[EXECUTOR].shutdown(wait=True)
+
+def create_app(database: Optional[str] = None, db_threads: int = DB_THREADS) -> web.Application:
+    if database:
+        app.DATABASE_PATH = database
+    # Keep an idle connection for every DB thread
+    app.DB_POOL_SIZE = max(app.DB_POOL_SIZE, db_threads)
+    web_app = web.Application()
+    web_app[EXECUTOR] = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix='db')
+    web_app.on_startup.append(warm_caches)
+    web_app.on_cleanup.append(shutdown_executor)
+    web_app.router.add_get('/api/catalog', catalog_page, name='catalog_page')
+    web_app.router.add_get(r'/api/presets/{preset_id:\d+}/files', preset_files, name='preset_files')
+    web_app.router.add_get(r'/preview/{preset_id:\d+}', preview, name='preview')
+    return web_app
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--database', default=app.DATABASE_PATH)
+    parser.add_argument('--db-threads', type=int, default=DB_THREADS, help='threads doing blocking database work')
+    args = parser.parse_args()
+    web.run_app(create_app(args.database, args.db_threads), host=args.host, port=args.port, access_log=None)
+
+if __name__ == '__main__':
+    main()
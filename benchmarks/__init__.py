@@ -0,0 +1,7 @@
+"""Performance benchmarks for the BBS presets app, importer and scraper.
+
+Run each benchmark as a module from the repository root, e.g.
+``python -m benchmarks.bench_index``. ``benchmarks.catalog`` generates
+the synthetic catalogs they run on, and ``benchmarks.suite`` runs the
+repeatable set and writes JSON results to compare runs for regressions.
+"""
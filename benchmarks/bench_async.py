@@ -0,0 +1,75 @@
+"""Compare the sync (serve.py) and async (async_app.py) API under many connections.
+
+Both get the same synthetic catalog and the same number of threads for
+blocking work: one gthread worker with `--threads` threads against one
+aiohttp process with `--threads` DB threads. Each is driven at every
+`--concurrency` level over the routes both serve, mostly card previews
+of random presets, so most requests miss the preview cache::
+
+    python -m benchmarks.bench_async --concurrency 64 256 1024 --threads 8
+
+With more connections than threads, gunicorn queues the rest until a
+thread frees up; the event loop accepts them all and only queues their
+database work.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+import app
+from benchmarks.catalog import build_catalog
+from benchmarks.bench_serve import ROOT, drive, free_port, start_server
+
+# (path template, weight); the routes both apps serve
+ROUTES = (
+    ('/api/catalog?page={page}', 2),
+    ('/api/presets/{id}/files', 3),
+    ('/preview/{id}?variant=card', 6),
+)
+
+def start_async_server(db_path: str, port: int, threads: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, 'async_app.py', '--port', str(port), '--db-threads', str(threads), '--database', db_path],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[64, 256, 1024])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--presets', type=int, default=20000)
+    parser.add_argument('--file-size', type=int, default=2000)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs; {args.presets} presets, {args.threads} threads, {args.duration:.0f}s per run\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'presets.db')
+        build_catalog(db_path, args.presets, args.file_size)
+        pages = max(1, -(-args.presets // app.PRESETS_PER_PAGE))
+        servers = {
+            'sync': lambda port: start_server(db_path, port, 1, args.threads),
+            'async': lambda port: start_async_server(db_path, port, args.threads),
+        }
+
+        print(f"{'server':>6} {'conns':>6} {'req/s':>9} {'p50':>9} {'p99':>9} {'errors':>7}")
+        for concurrency in args.concurrency:
+            for name, start in servers.items():
+                port = free_port()
+                server = start(port)
+                try:
+                    result = asyncio.run(drive(
+                        f'http://127.0.0.1:{port}', server, args.presets, pages, concurrency, args.duration,
+                        routes=ROUTES, ready_path='/api/catalog'
+                    ))
+                finally:
+                    server.terminate()
+                    server.wait()
+                print(f"{name:>6} {concurrency:>6} {result['rps']:>9.0f} {result['p50_ms']:>7.1f}ms "
+                      f"{result['p99_ms']:>7.1f}ms {result['errors']:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Measure how the catalog loader and `/` route scale with the number of presets.
+
+Builds throwaway catalogs of increasing size and times the current batched
+loader against the previous per-preset (N+1) loader, plus the paginated
+first page of `/`::
+
+    python -m benchmarks.bench_index --sizes 100 1000 3000
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+from unittest import mock
+
+import app
+import blobs
+from benchmarks.catalog import build_catalog
+
+def legacy_connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(app.DATABASE_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def legacy_preset_files(preset_id: int) -> Dict[str, str]:
+    conn = legacy_connect()
+    rows = conn.execute('''
+        SELECT f.file_type, b.codec, b.data FROM files f JOIN blobs b ON b.hash = f.content_hash
+        WHERE f.preset_id = ?
+    ''', (preset_id,)).fetchall()
+    conn.close()
+    return {row['file_type']: blobs.decode(row['codec'], row['data']) for row in rows}
+
+def legacy_categories_with_presets() -> List[Dict]:
+    """The pre-batching loader: one extra connection and query per preset."""
+    conn = legacy_connect()
+    rows = conn.execute('''
+        SELECT c.id as category_id, c.name as category_name,
+               p.id as preset_id, p.name as preset_name, p.description as preset_description
+        FROM categories c
+        LEFT JOIN presets p ON c.id = p.category_id
+        ORDER BY c.name, p.name
+    ''').fetchall()
+    conn.close()
+
+    categories = {}
+    for row in rows:
+        category = categories.setdefault(row['category_id'], {
+            'id': row['category_id'], 'name': row['category_name'], 'presets': []
+        })
+        if row['preset_id']:
+            files = legacy_preset_files(row['preset_id'])
+            category['presets'].append({
+                'id': row['preset_id'],
+                'name': row['preset_name'],
+                'description': row['preset_description'] or 'No description available',
+                'preview': files.get('css', '') + files.get('html', '') + files.get('js', ''),
+                'files': {key: files.get(key, '') for key in ('html', 'css', 'js')},
+            })
+    return list(categories.values())
+
+def current_categories_with_presets() -> List[Dict]:
+    with app.app.app_context():
+        return app.get_categories_with_presets()
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """Returns the median wall time of `func` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def run(sizes: List[int], repeat: int, file_size: int) -> None:
+    client = app.app.test_client()
+    print(f"{'presets':>8} {'loader N+1':>12} {'loader batch':>13} {'/':>10} {'/ size':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            db_path = os.path.join(tmp, f'presets-{size}.db')
+            build_catalog(db_path, size, file_size)
+            with mock.patch.object(app, 'DATABASE_PATH', db_path):
+                old_loader = time_call(legacy_categories_with_presets, repeat)
+                new_loader = time_call(current_categories_with_presets, repeat)
+                route = time_call(lambda: client.get('/').get_data(), repeat)
+                page_kb = len(client.get('/').data) / 1024
+            print(f"{size:>8} {old_loader:>10.1f}ms {new_loader:>11.1f}ms {route:>8.1f}ms {page_kb:>8.1f}KB")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 3000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--file-size', type=int, default=2000, help='median characters per html/css/js file')
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.file_size)
+
+if __name__ == '__main__':
+    main()
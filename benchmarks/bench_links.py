@@ -0,0 +1,109 @@
+"""Measure meu_scraper's listing link extraction on a large synthetic listing.
+
+The listing is ``botoes.html`` with its cards repeated (hrefs made unique)
+until it reaches ``--size-mb``. Each extractor runs in its own process so
+its peak RSS can be reported next to its throughput::
+
+    python -m benchmarks.bench_links --size-mb 300 --legacy-mb 20
+
+``legacy`` is the old full-read BeautifulSoup ``select``; its memory grows
+with the file, so it gets a smaller listing of ``--legacy-mb``.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import meu_scraper
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HREF = re.compile(r'href="(/[^"/]+/[^"/]+)"')
+
+def write_listing(path: str, megabytes: float, source: str = os.path.join(ROOT, 'botoes.html')) -> int:
+    """Write a listing of about `megabytes` MB; returns the number of cards."""
+    with open(source, encoding='utf-8') as f:
+        content = f.read()
+    start = content.index('<article')
+    end = content.rindex('</article>') + len('</article>')
+    head, body, tail = content[:start], content[start:end], content[end:]
+    cards = [card + '</article>' for card in body.split('</article>') if card.strip()]
+
+    target = int(megabytes * 1024 * 1024)
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        written = f.write(head)
+        while written < target:
+            card = cards[count % len(cards)]
+            written += f.write(HREF.sub(lambda m: f'href="{m.group(1)}-{count}"', card))
+            count += 1
+        f.write(tail)
+    return count
+
+def legacy_extract(path: str):
+    from bs4 import BeautifulSoup
+    with open(path, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+    return sorted({elem.get('href') for elem in soup.select('article a.fake-link') if elem.get('href')})
+
+def run(method: str, path: str) -> None:
+    """Run one extractor in this process and print its result as JSON."""
+    if method == 'htmlparser':
+        meu_scraper.lxml_etree = None
+    started = time.perf_counter()
+    if method == 'legacy':
+        hrefs = legacy_extract(path)
+    else:
+        hrefs = set(meu_scraper.iter_listing_hrefs(path))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'seconds': elapsed,
+        'links': len(hrefs),
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+def measure(method: str, path: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_links', '--run', method, path],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=300, help='size of the listing for the streaming extractors')
+    parser.add_argument('--legacy-mb', type=float, default=20, help='size of the listing for the legacy extractor (0 = skip)')
+    parser.add_argument('--methods', default='lxml,htmlparser,legacy')
+    parser.add_argument('--run', nargs=2, metavar=('METHOD', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        listings = {}
+        for name, megabytes in (('large', args.size_mb), ('legacy', args.legacy_mb)):
+            if megabytes:
+                path = os.path.join(tmp, f'{name}.html')
+                cards = write_listing(path, megabytes)
+                listings[name] = (path, os.path.getsize(path) / 1024 / 1024, cards)
+
+        print(f"{'extractor':<12} {'listing':>10} {'links':>8} {'time':>8} {'MB/s':>8} {'peak RSS':>10}")
+        for method in args.methods.split(','):
+            listing = 'legacy' if method == 'legacy' else 'large'
+            if listing not in listings:
+                continue
+            path, megabytes, cards = listings[listing]
+            result = measure(method, path)
+            print(
+                f"{method:<12} {megabytes:>8.0f}MB {result['links']:>8} {result['seconds']:>7.2f}s "
+                f"{megabytes / result['seconds']:>8.1f} {result['max_rss_mb']:>8.0f}MB"
+            )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Measure meu_scraper's browserless fast path against the local mock site.
+
+Compares the async keep-alive client (meu_scraper.scrape_static) with a
+serial fetch that opens a new connection per page. The mock site runs in
+its own process and delays each response by ``--latency`` seconds to
+stand in for the network round trip::
+
+    python -m benchmarks.bench_scraper --pages 2000 --concurrency 32 --latency 0.05
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from unittest import mock
+
+import meu_scraper
+from benchmarks import mock_site
+
+def serial_baseline(urls) -> None:
+    for url in urls:
+        with urllib.request.urlopen(url) as response:
+            meu_scraper.parse_button_code(response.read())
+
+def start_mock_site(pages: int, latency: float) -> subprocess.Popen:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.mock_site', '--port', str(port),
+         '--count', str(pages), '--latency', str(latency)],
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    process.base_url = f'http://127.0.0.1:{port}'
+    return process
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=meu_scraper.HTTP_CONCURRENCY)
+    parser.add_argument('--latency', type=float, default=0.05, help='simulated round trip in seconds')
+    parser.add_argument('--baseline-pages', type=int, default=50,
+                        help='pages fetched by the serial baseline')
+    args = parser.parse_args()
+
+    site = start_mock_site(args.pages, args.latency)
+    urls = [site.base_url + mock_site.button_path(index) for index in range(args.pages)]
+    try:
+        start = time.perf_counter()
+        serial_baseline(urls[:args.baseline_pages])
+        serial = args.baseline_pages / (time.perf_counter() - start)
+
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(meu_scraper, 'BOTOES_DIR', tmp):
+            stats = meu_scraper.ScrapeStats(len(urls), interval=float('inf'))
+            start = time.perf_counter()
+            meu_scraper.scrape_static(urls, stats, args.concurrency)
+            fast = len(urls) / (time.perf_counter() - start)
+            saved = len(os.listdir(tmp)) // 2
+    finally:
+        site.terminate()
+        site.wait()
+
+    print(f"serial, new connection per page: {serial:8.1f} pages/s")
+    print(f"async keep-alive fast path:      {fast:8.1f} pages/s ({saved}/{len(urls)} saved)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Measure /api/search latency on a large synthetic catalog.
+
+Builds a synthetic catalog (see benchmarks.catalog), whose common words
+match most presets and rare ones a handful, then times uncached searches
+through the Flask test client::
+
+    python -m benchmarks.bench_search --presets 50000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import List, Tuple
+from unittest import mock
+
+import app
+from benchmarks.catalog import build_catalog
+
+QUERIES = ('button', 'hover anim', 'border radius shadow', 'neonglow', 'pixelbloom div', 'retrowave glitchspark', 'nomatch')
+
+def time_query(client, query: str, repeat: int) -> Tuple[List[float], int]:
+    """Time `repeat` uncached searches for `query`, plus the total it reports."""
+    samples = []
+    for _ in range(repeat):
+        app.search_cache.clear()
+        start = time.perf_counter()
+        response = client.get('/api/search', query_string={'q': query})
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, response.get_json()['total']
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--presets', type=int, default=50000)
+    parser.add_argument('--file-size', type=int, default=1500, help='median characters per html/css/js file')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'presets.db')
+        start = time.perf_counter()
+        build_catalog(db_path, args.presets, args.file_size)
+        print(f"Built and indexed {args.presets} presets in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(db_path) / 1e6:.0f} MB)\n")
+
+        client = app.app.test_client()
+        print(f"{'query':<24} {'matches':>8} {'median':>9} {'p95':>9}")
+        with mock.patch.object(app, 'DATABASE_PATH', db_path):
+            for query in QUERIES:
+                samples, total = time_query(client, query, args.repeat)
+                samples.sort()
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+                print(f"{query:<24} {total:>8} {statistics.median(samples):>7.2f}ms {p95:>7.2f}ms")
+
+if __name__ == '__main__':
+    main()
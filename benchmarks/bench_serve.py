@@ -0,0 +1,140 @@
+"""Measure requests/s of the production server (serve.py) by worker count.
+
+Builds a synthetic catalog, then for each `--workers` value starts
+serve.py on it and drives it for `--duration` seconds from an asyncio
+client with `--concurrency` connections, over a mix of the app's routes::
+
+    python -m benchmarks.bench_serve --workers 1 2 4 8 --threads 4 --duration 15
+
+The client runs on the same machine and takes one core of its own, so
+scaling stops at cores - 1 workers.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import app
+from benchmarks.catalog import build_catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# (path template, weight); {id} is a random preset
+ROUTES = (
+    ('/', 4),
+    ('/?page={page}', 2),
+    ('/api/presets/{id}/files', 3),
+    ('/preview/{id}?variant=card', 6),
+    ('/api/search?q=preset', 1),
+)
+STARTUP_TIMEOUT = 60.0
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(db_path: str, port: int, workers: int, threads: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, 'serve.py', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+         '--threads', str(threads), '--database', db_path],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+async def wait_ready(session, base_url: str, server: subprocess.Popen, path: str = '/') -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{server.args[1]} exited with status {server.returncode}")
+        try:
+            async with session.get(base_url + path) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{server.args[1]} did not start in time")
+
+async def drive(base_url: str, server: subprocess.Popen, preset_count: int, pages: int,
+                concurrency: int, duration: float, seed: int = 1,
+                routes: Sequence[Tuple[str, int]] = ROUTES, ready_path: str = '/') -> Dict:
+    import aiohttp
+
+    rng = random.Random(seed)
+    paths = [path for path, weight in routes for _ in range(weight)]
+    latencies: List[float] = []
+    errors = 0
+
+    async def client(session, deadline: float) -> None:
+        nonlocal errors
+        while time.monotonic() < deadline:
+            path = rng.choice(paths).format(id=rng.randint(1, preset_count), page=rng.randint(1, pages))
+            started = time.perf_counter()
+            try:
+                async with session.get(base_url + path) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as session:
+        await wait_ready(session, base_url, server, ready_path)
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(client(session, deadline) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--presets', type=int, default=3000)
+    parser.add_argument('--file-size', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs; {args.presets} presets, {args.threads} threads per worker, "
+          f"{args.concurrency} connections, {args.duration:.0f}s per run\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'presets.db')
+        build_catalog(db_path, args.presets, args.file_size)
+        # One listing row per preset, as no category is empty
+        pages = max(1, -(-args.presets // app.PRESETS_PER_PAGE))
+
+        print(f"{'workers':>7} {'req/s':>9} {'p50':>9} {'p99':>9} {'errors':>7}")
+        for workers in args.workers:
+            port = free_port()
+            server = start_server(db_path, port, workers, args.threads)
+            try:
+                result = asyncio.run(drive(
+                    f'http://127.0.0.1:{port}', server, args.presets, pages, args.concurrency, args.duration
+                ))
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{workers:>7} {result['rps']:>9.0f} {result['p50_ms']:>7.1f}ms "
+                  f"{result['p99_ms']:>7.1f}ms {result['errors']:>7}")
+
+if __name__ == '__main__':
+    main()
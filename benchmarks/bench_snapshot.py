@@ -0,0 +1,112 @@
+"""Compare app startup and memory with and without a catalog snapshot.
+
+Builds a synthetic catalog and its snapshot, then, in a fresh process for
+each mode, times loading the catalog, the first `/` page and reading
+every preset's files once, as a worker warming up or an export would.
+The resident set (RSS) is read afterwards, with the part of it that is
+anonymous memory private to the process; the rest is file pages, such
+as the mapped snapshot, that every worker shares through the page cache::
+
+    python -m benchmarks.bench_snapshot --presets 50000
+
+``database`` ignores the snapshot and reads presets.db as before.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+import app
+import import_presets
+import snapshot
+from benchmarks.bench_links import ROOT
+from benchmarks.catalog import build_catalog
+
+MODES = ('database', 'snapshot')
+
+def memory_usage() -> Dict[str, Optional[float]]:
+    """RSS and its anonymous part for this process in MB, where the kernel reports them."""
+    usage: Dict[str, Optional[float]] = {'rss_mb': None, 'anonymous_mb': None}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('Rss', 'Anonymous'):
+                    usage[f'{name.lower()}_mb'] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return usage
+
+def run(mode: str, db_path: str) -> None:
+    """Measure one mode in this process and print the result as JSON."""
+    app.DATABASE_PATH = db_path
+    if mode == 'database':
+        app.load_catalog_snapshot = lambda generation, token: None
+    client = app.app.test_client()
+    result: Dict[str, object] = {}
+
+    started = time.perf_counter()
+    with app.app.app_context():
+        catalog = app.get_catalog()
+    result['catalog_ms'] = (time.perf_counter() - started) * 1000
+    result['from_snapshot'] = catalog.snapshot is not None
+
+    started = time.perf_counter()
+    client.get('/').get_data()
+    result['first_page_ms'] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    preset_ids = sorted(catalog.preset_ids)
+    with app.app.app_context():
+        for start in range(0, len(preset_ids), app.FILES_BATCH_SIZE):
+            app.get_files_for_presets(preset_ids[start:start + app.FILES_BATCH_SIZE])
+    result['all_files_ms'] = (time.perf_counter() - started) * 1000
+
+    result.update(memory_usage())
+    print(json.dumps(result))
+
+def measure(mode: str, db_path: str) -> Dict:
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_snapshot', '--run', mode, db_path],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--presets', type=int, default=50000)
+    parser.add_argument('--file-size', type=int, default=1500, help='median characters per html/css/js file')
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'presets.db')
+        build_catalog(db_path, args.presets, args.file_size)
+        conn = import_presets.init_database(db_path)
+        started = time.perf_counter()
+        snapshot.write_snapshot(conn, snapshot.snapshot_path(db_path))
+        conn.commit()
+        conn.close()
+        print(f"{args.presets} presets: presets.db {os.path.getsize(db_path) / 1e6:.0f} MB, snapshot "
+              f"{os.path.getsize(snapshot.snapshot_path(db_path)) / 1e6:.0f} MB "
+              f"compiled in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'mode':<10} {'catalog':>10} {'first /':>10} {'all files':>11} {'RSS':>8} {'private':>8}")
+        for mode in MODES:
+            result = measure(mode, db_path)
+            memory = ' '.join(
+                f"{result[key]:>6.0f}MB" if result[key] is not None else f"{'n/a':>8}" for key in ('rss_mb', 'anonymous_mb')
+            )
+            print(f"{mode:<10} {result['catalog_ms']:>8.0f}ms {result['first_page_ms']:>8.1f}ms "
+                  f"{result['all_files_ms']:>9.0f}ms {memory}")
+
+if __name__ == '__main__':
+    main()
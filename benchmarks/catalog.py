@@ -0,0 +1,123 @@
+"""Synthetic catalogs for the benchmarks.
+
+Generates presets whose names and files are drawn from a fixed vocabulary
+of HTML/CSS/JS words, so common words match most presets and rare ones a
+handful, with file sizes spread around `file_size` the way real presets
+vary. The same seed always gives the same catalog, either as an
+``examples/<category>/<preset>/dist/`` tree for import_presets or as a
+ready ``presets.db``::
+
+    python -m benchmarks.catalog --presets 10000 --examples /tmp/examples --database /tmp/presets.db
+"""
+import argparse
+import os
+import random
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import import_presets
+
+PRESETS_PER_CATEGORY = 50
+COMMON_WORDS = (
+    'div', 'span', 'button', 'class', 'color', 'background', 'border', 'radius', 'padding', 'margin',
+    'display', 'flex', 'grid', 'hover', 'transition', 'transform', 'animation', 'keyframes', 'shadow',
+    'width', 'height', 'position', 'absolute', 'relative', 'const', 'function', 'return', 'document',
+    'querySelector', 'addEventListener', 'click', 'style', 'opacity', 'rotate', 'scale', 'gradient',
+)
+RARE_WORDS = tuple(f'{prefix}{suffix}' for prefix in ('neon', 'pixel', 'glitch', 'aurora', 'retro')
+                   for suffix in ('wave', 'glow', 'spark', 'drift', 'bloom'))
+# Words of generated text files are cut from, at random offsets
+CORPUS_WORDS = 200000
+# Spread of file sizes around the median (sigma of a log-normal)
+FILE_SIZE_SIGMA = 0.75
+# File name of each file type in a dist directory
+DIST_FILES = {'html': 'index.html', 'css': 'style.css', 'js': 'script.js'}
+
+def text(rng: random.Random, words: int) -> str:
+    return ' '.join(
+        rng.choice(RARE_WORDS) if rng.random() < 0.002 else rng.choice(COMMON_WORDS)
+        for _ in range(words)
+    )
+
+def generate(preset_count: int, file_size: int, seed: int = 1) -> Iterator[Tuple[str, str, Dict[str, str]]]:
+    """Yield (category, preset, files) for `preset_count` presets.
+
+    Each file is cut from a shared corpus at a random offset, with a size
+    drawn around `file_size` characters, and carries its preset's index so
+    no two presets share a file.
+    """
+    rng = random.Random(seed)
+    corpus = text(rng, CORPUS_WORDS)
+    for index in range(preset_count):
+        category = f'category-{index // PRESETS_PER_CATEGORY:04d}'
+        preset = f'{text(rng, 2).replace(" ", "-")}-{index}'
+        files = {}
+        for file_type in DIST_FILES:
+            size = min(int(file_size * rng.lognormvariate(0, FILE_SIZE_SIGMA)), len(corpus) // 2)
+            start = rng.randrange(len(corpus) - size)
+            body = corpus[start:start + size]
+            if file_type == 'html':
+                files[file_type] = f'<div class="preset-{index}">{body}</div>'
+            elif file_type == 'css':
+                files[file_type] = f'.preset-{index} {{ /* {body} */ }}'
+            else:
+                files[file_type] = f'// preset {index}\n// {body}'
+        yield category, preset, files
+
+def write_examples(base_dir: str, preset_count: int, file_size: int, seed: int = 1) -> int:
+    """Write an examples tree for import_presets; returns the bytes written."""
+    written = 0
+    for category, preset, files in generate(preset_count, file_size, seed):
+        dist_dir = os.path.join(base_dir, category, preset, 'dist')
+        os.makedirs(dist_dir, exist_ok=True)
+        for file_type, content in files.items():
+            with open(os.path.join(dist_dir, DIST_FILES[file_type]), 'w', encoding='utf-8') as f:
+                written += f.write(content)
+    return written
+
+def build_catalog(db_path: str, preset_count: int, file_size: int, seed: int = 1) -> None:
+    """Create a presets.db with `preset_count` presets, search index included.
+
+    Writes straight through import_presets' upserts, which is much faster
+    than importing a written tree.
+    """
+    presets = list(generate(preset_count, file_size, seed))
+    conn = import_presets.init_database(db_path)
+    cursor = conn.cursor()
+    category_ids = import_presets.upsert_categories(cursor, {category for category, _, _ in presets})
+    preset_ids = import_presets.upsert_presets(
+        cursor, [(category_ids[category], preset) for category, preset, _ in presets]
+    )
+    rows: List[Tuple] = []
+    for category, preset, files in presets:
+        preset_id = preset_ids[(category_ids[category], preset)]
+        rows.extend((preset_id, file_type, content, None, len(content), None) for file_type, content in files.items())
+    import_presets.upsert_files(cursor, rows)
+    import_presets.sync_search_index(cursor)
+    conn.commit()
+    conn.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--presets', type=int, default=1000)
+    parser.add_argument('--file-size', type=int, default=1500, help='median characters per html/css/js file')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--examples', metavar='DIR', help='write an examples tree here')
+    parser.add_argument('--database', metavar='PATH', help='write a presets.db here')
+    args = parser.parse_args()
+    if not args.examples and not args.database:
+        parser.error('give --examples, --database or both')
+
+    if args.examples:
+        started = time.perf_counter()
+        written = write_examples(args.examples, args.presets, args.file_size, args.seed)
+        print(f"Wrote {args.presets} presets ({written / 1e6:.1f} MB) to {args.examples} "
+              f"in {time.perf_counter() - started:.1f}s")
+    if args.database:
+        started = time.perf_counter()
+        build_catalog(args.database, args.presets, args.file_size, args.seed)
+        print(f"Built {args.database} ({os.path.getsize(args.database) / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
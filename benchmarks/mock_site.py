@@ -0,0 +1,132 @@
+"""A local stand-in for the button site scraped by meu_scraper.
+
+Serves a listing page shaped like ``botoes.html`` (``article a.fake-link``
+cards) and one page per button with its code in
+``div[data-name='html'] code`` and ``div[data-name='css'] code`` blocks.
+With ``--dynamic-every N`` every Nth page only builds those blocks from
+JavaScript, like pages that need the browser fallback, and ``--latency``
+delays every response to stand in for the network round trip. Responses
+carry an ETag and honour If-None-Match::
+
+    python -m benchmarks.mock_site --port 8000 --count 500 --listing listing.html
+    python meu_scraper.py --listing listing.html --base-url http://127.0.0.1:8000
+"""
+import argparse
+import hashlib
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+LISTING_PATH = '/listing.html'
+
+def button_path(index: int) -> str:
+    return f'/mock_user/button-{index:06d}'
+
+def button_code(index: int) -> Tuple[str, str]:
+    """The HTML and CSS a button page shows for button `index`."""
+    return (
+        f'<button class="mock-button-{index}">Button {index}</button>',
+        f'.mock-button-{index} {{ color: #{index % 0xffffff:06x}; padding: 8px 16px; }}',
+    )
+
+def listing_html(count: int) -> str:
+    cards = ''.join(
+        f'<article class="card"><div class="clickable-wrapper">'
+        f'<a class="fake-link" data-discover="true" href="{button_path(index)}">Link to post</a>'
+        f'</div></article>'
+        for index in range(count)
+    )
+    return f'<!DOCTYPE html><html><body><section class="grid">{cards}</section></body></html>'
+
+def button_page(index: int, dynamic: bool = False) -> str:
+    button_html, button_css = button_code(index)
+    if dynamic:
+        return (
+            '<!DOCTYPE html><html><head><title>Button</title></head><body><div id="code"></div>'
+            '<script>document.getElementById("code").innerHTML = '
+            f'{json.dumps(button_page(index))};</script></body></html>'
+        )
+    return (
+        '<!DOCTYPE html><html><head><title>Button</title></head><body>'
+        f'<div data-name="html"><pre><code>{html.escape(button_html)}</code></pre></div>'
+        f'<div data-name="css"><pre><code>{html.escape(button_css)}</code></pre></div>'
+        '</body></html>'
+    )
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real site
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    count = 0
+    dynamic_every = 0
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.path == LISTING_PATH:
+            body = listing_html(self.count)
+        elif self.path.startswith('/mock_user/button-'):
+            try:
+                index = int(self.path.rsplit('-', 1)[1])
+            except ValueError:
+                index = -1
+            if not 0 <= index < self.count:
+                self.send_error(404)
+                return
+            body = button_page(index, self.dynamic_every > 0 and index % self.dynamic_every == 0)
+        else:
+            self.send_error(404)
+            return
+
+        data = body.encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(data).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start(count: int, port: int = 0, dynamic_every: int = 0, latency: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the mock site in a background thread; returns the server and its base URL."""
+    handler = type('Handler', (MockSiteHandler,), {
+        'count': count, 'dynamic_every': dynamic_every, 'latency': latency
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--count', type=int, default=500, help='number of button pages')
+    parser.add_argument('--dynamic-every', type=int, default=0,
+                        help='render every Nth page with JavaScript only (0 = never)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each response')
+    parser.add_argument('--listing', help='also write the listing page to this file')
+    args = parser.parse_args()
+
+    if args.listing:
+        with open(args.listing, 'w', encoding='utf-8') as f:
+            f.write(listing_html(args.count))
+    server, base_url = start(args.count, args.port, args.dynamic_every, args.latency)
+    print(f'Serving {args.count} buttons at {base_url} (listing at {base_url}{LISTING_PATH})')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""Run the repeatable benchmark suite and write the results as JSON.
+
+For each catalog size a synthetic examples tree (see benchmarks.catalog)
+is imported and then served, timing:
+
+    import.full         import_presets.process_directory into a new database
+    import.incremental  an incremental re-import with nothing changed
+    catalog.cold        app.get_categories_with_presets with every app cache empty
+    catalog.warm        the same with the caches filled
+    index.cold          GET / through the Flask test client, caches empty
+    index.warm          the same with the caches filled
+
+plus meu_scraper.get_button_urls_from_html_file on copies of botoes.html
+scaled up to each ``--listing-mb``. Each result keeps every run in
+milliseconds and their min, median, mean and standard deviation, next to
+the Python, SQLite, platform and git commit it was measured on::
+
+    python -m benchmarks.suite --sizes 100 1000 10000 --output baseline.json
+    python -m benchmarks.suite --sizes 100 1000 10000 --output new.json --compare baseline.json
+
+With ``--compare``, every benchmark whose median is more than
+``--threshold`` slower than in the baseline is reported, and the suite
+exits with status 1.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from unittest import mock
+
+import app
+import import_presets
+import meu_scraper
+from benchmarks.bench_links import ROOT, write_listing
+from benchmarks.catalog import write_examples
+
+# Median slowdown over the baseline, as a fraction, reported as a regression
+REGRESSION_THRESHOLD = 0.2
+APP_CACHES = (
+    app.preview_cache, app.blob_cache, app.file_hashes_cache,
+    app.search_cache, app.compressed_cache, app.thumbnail_cache,
+)
+
+def summarize(runs: List[float]) -> Dict:
+    return {
+        'runs': [round(run, 3) for run in runs],
+        'min': round(min(runs), 3),
+        'median': round(statistics.median(runs), 3),
+        'mean': round(statistics.mean(runs), 3),
+        'stdev': round(statistics.stdev(runs), 3) if len(runs) > 1 else 0.0,
+    }
+
+def measure(func: Callable[[], object], repeat: int, setup: Optional[Callable[[], object]] = None) -> List[float]:
+    """Wall time of `repeat` calls of `func` in milliseconds; `setup` runs untimed before each."""
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        runs.append((time.perf_counter() - started) * 1000)
+    return runs
+
+def clear_app_caches() -> None:
+    for cache in APP_CACHES:
+        cache.clear()
+    app.app.extensions.pop('catalog', None)
+
+def import_examples(examples_dir: str, db_path: str, incremental: bool = False) -> None:
+    # process_directory prints its errors, which are silenced here with the rest of its output
+    with mock.patch.object(import_presets, 'DATABASE_PATH', db_path), \
+            contextlib.redirect_stdout(open(os.devnull, 'w')) as devnull:
+        try:
+            ok = import_presets.process_directory(examples_dir, incremental=incremental)
+        finally:
+            devnull.close()
+    if not ok:
+        raise RuntimeError(f"import of {examples_dir} into {db_path} failed")
+
+def count_presets(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT count(*) FROM presets').fetchone()[0]
+    finally:
+        conn.close()
+
+def bench_catalog_size(tmp: str, size: int, file_size: int, repeat: int) -> Dict[str, Dict]:
+    examples_dir = os.path.join(tmp, f'examples-{size}')
+    write_examples(examples_dir, size, file_size)
+    db_path = os.path.join(tmp, f'presets-{size}.db')
+
+    def fresh_database() -> None:
+        for suffix in ('', '-wal', '-shm'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(db_path + suffix)
+
+    results = {}
+    results['import.full'] = measure(lambda: import_examples(examples_dir, db_path), repeat, setup=fresh_database)
+    imported = count_presets(db_path)
+    if imported != size:
+        raise RuntimeError(f"import of {size} presets left {imported} in the database")
+    results['import.incremental'] = measure(lambda: import_examples(examples_dir, db_path, incremental=True), repeat)
+
+    def load_catalog() -> None:
+        with app.app.app_context():
+            app.get_categories_with_presets()
+
+    client = app.app.test_client()
+
+    def get_index() -> None:
+        response = client.get('/')
+        response.get_data()
+        if response.status_code != 200:
+            raise RuntimeError(f"GET / returned {response.status_code}")
+
+    with mock.patch.object(app, 'DATABASE_PATH', db_path):
+        results['catalog.cold'] = measure(load_catalog, repeat, setup=clear_app_caches)
+        results['catalog.warm'] = measure(load_catalog, repeat)
+        results['index.cold'] = measure(get_index, repeat, setup=clear_app_caches)
+        results['index.warm'] = measure(get_index, repeat)
+    clear_app_caches()
+    return {f'{name}/presets={size}': summarize(runs) for name, runs in results.items()}
+
+def bench_listing(tmp: str, megabytes: float, repeat: int) -> Dict[str, Dict]:
+    path = os.path.join(tmp, f'listing-{megabytes:g}mb.html')
+    cards = write_listing(path, megabytes)
+
+    def extract() -> None:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')) as devnull:
+            try:
+                urls = meu_scraper.get_button_urls_from_html_file(path)
+            finally:
+                devnull.close()
+        if len(urls) != cards:
+            raise RuntimeError(f"extracted {len(urls)} links from a listing of {cards} cards")
+
+    result = summarize(measure(extract, repeat))
+    result['cards'] = cards
+    return {f'scraper.links/mb={megabytes:g}': result}
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment() -> Dict:
+    return {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'listing_parser': 'lxml' if meu_scraper.lxml_etree is not None else 'html.parser',
+    }
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Print each benchmark's median against the baseline's; returns the ones that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<36} {'baseline':>11} {'now':>11} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, now = baseline[name]['median'], result['median']
+        change = now / before - 1 if before else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<36} {before:>9.2f}ms {now:>9.2f}ms {change:>+7.0%}{flag}")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='presets per catalog')
+    parser.add_argument('--file-size', type=int, default=1500, help='median characters per html/css/js file')
+    parser.add_argument('--listing-mb', type=float, nargs='+', default=[1, 10], help='sizes of the scaled-up listings')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', metavar='BASELINE', help='results of an earlier run to check for regressions')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='median slowdown reported as a regression (default: %(default)s)')
+    args = parser.parse_args()
+
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            results.update(bench_catalog_size(tmp, size, args.file_size, args.repeat))
+        for megabytes in args.listing_mb:
+            results.update(bench_listing(tmp, megabytes, args.repeat))
+
+    print(f"{'benchmark':<36} {'min':>11} {'median':>11} {'stdev':>10}")
+    for name, result in results.items():
+        print(f"{name:<36} {result['min']:>9.2f}ms {result['median']:>9.2f}ms {result['stdev']:>8.2f}ms")
+
+    report = {
+        'environment': environment(),
+        'config': {
+            'sizes': args.sizes,
+            'file_size': args.file_size,
+            'listing_mb': args.listing_mb,
+            'repeat': args.repeat,
+        },
+        'unit': 'ms',
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != report['config']:
+            print("Warning: the baseline was run with a different configuration")
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
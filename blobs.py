@@ -0,0 +1,120 @@
+"""Content-addressed storage for preset file bodies.
+
+Every distinct body is stored once in the `blobs` table, keyed by the
+SHA-256 of its UTF-8 text, and `files` rows point at it through their
+`content_hash`. Presets that share a stylesheet or script share one row,
+and anything keyed on the hash (the app's caches, preview ETags) can
+never go stale.
+
+Bodies of at least COMPRESS_MIN_SIZE bytes are compressed with zstd when
+the zstandard package is installed and with zlib otherwise; a body that
+doesn't get smaller is stored as-is. The codec is recorded per blob, so
+databases written with different settings read the same way.
+"""
+import hashlib
+import sqlite3
+import zlib
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODECS: Sequence[str] = ('none', 'zlib', 'zstd')
+# Smaller bodies aren't worth compressing
+COMPRESS_MIN_SIZE = 512
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+# Hashes per `IN (...)` query, below SQLite's bound-parameter limit
+LOOKUP_BATCH_SIZE = 500
+
+Executor = Union[sqlite3.Connection, sqlite3.Cursor]
+
+def content_hash(content: str) -> str:
+    """The key of a body: the SHA-256 of its UTF-8 text."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def default_codec() -> str:
+    return 'zstd' if zstandard is not None else 'zlib'
+
+def _require_zstandard():
+    if zstandard is None:
+        raise RuntimeError("zstd-compressed blobs need the zstandard package (pip install zstandard)")
+    return zstandard
+
+def encode(content: str, codec: Optional[str] = None) -> Tuple[str, bytes]:
+    """Compress a body with `codec` (default_codec() if None); returns the codec used and the data."""
+    data = content.encode('utf-8')
+    codec = codec or default_codec()
+    if codec not in CODECS:
+        raise ValueError(f"unknown blob codec {codec!r}")
+    if codec == 'none' or len(data) < COMPRESS_MIN_SIZE:
+        return 'none', data
+    if codec == 'zstd':
+        compressed = _require_zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        compressed = zlib.compress(data, ZLIB_LEVEL)
+    if len(compressed) >= len(data):
+        return 'none', data
+    return codec, compressed
+
+def decompress(codec: str, data: bytes) -> bytes:
+    """The UTF-8 body of a stored blob."""
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        return _require_zstandard().ZstdDecompressor().decompress(data)
+    if codec != 'none':
+        raise ValueError(f"unknown blob codec {codec!r}")
+    return bytes(data)
+
+def decode(codec: str, data: bytes) -> str:
+    return decompress(codec, data).decode('utf-8')
+
+def _batches(hashes: Iterable[str]):
+    hashes = list(hashes)
+    for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+        chunk = hashes[start:start + LOOKUP_BATCH_SIZE]
+        yield chunk, ','.join('?' * len(chunk))
+
+def stored_hashes(db: Executor, hashes: Iterable[str]) -> Set[str]:
+    """The subset of `hashes` that already has a blob."""
+    stored = set()
+    for chunk, placeholders in _batches(hashes):
+        stored.update(row[0] for row in db.execute(
+            f'SELECT hash FROM blobs WHERE hash IN ({placeholders})', chunk
+        ))
+    return stored
+
+def store_blobs(db: Executor, contents: Dict[str, str], codec: Optional[str] = None) -> int:
+    """Store the bodies of `contents` (hash -> text) that aren't stored yet; returns how many were.
+
+    Only new bodies are compressed, so re-importing shared files is cheap.
+    """
+    missing = set(contents) - stored_hashes(db, contents)
+    rows = []
+    for digest in missing:
+        content = contents[digest]
+        blob_codec, data = encode(content, codec)
+        rows.append((digest, blob_codec, len(content.encode('utf-8')), data))
+    db.executemany('INSERT INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)', rows)
+    return len(rows)
+
+def iter_bodies(db: Executor, hashes: Iterable[str]) -> Iterator[Tuple[str, bytes]]:
+    """Yield (hash, UTF-8 body) for `hashes`, a batch at a time; unknown hashes are left out."""
+    for chunk, placeholders in _batches(hashes):
+        for digest, codec, data in db.execute(
+            f'SELECT hash, codec, data FROM blobs WHERE hash IN ({placeholders})', chunk
+        ).fetchall():
+            yield digest, decompress(codec, data)
+
+def load_blobs(db: Executor, hashes: Iterable[str]) -> Dict[str, str]:
+    """Get the decoded bodies of `hashes` (hash -> text); unknown hashes are left out."""
+    return {digest: body.decode('utf-8') for digest, body in iter_bodies(db, set(hashes))}
+
+def prune_blobs(db: Executor) -> int:
+    """Delete blobs no file refers to any more; returns how many were deleted."""
+    return db.execute(
+        'DELETE FROM blobs WHERE hash NOT IN (SELECT content_hash FROM files WHERE content_hash IS NOT NULL)'
+    ).rowcount
@@ -0,0 +1,53 @@
+"""In-process caches shared by the Flask app."""
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar('V')
+
+class LRUCache(Generic[V]):
+    """A thread-safe least-recently-used cache bounded by total size.
+
+    `sizeof` measures each value (``len`` by default); once the sum goes
+    over `max_size` the least recently used entries are dropped. A single
+    value larger than `max_size` is never stored.
+    """
+
+    def __init__(self, max_size: int, sizeof: Callable[[V], int] = len):
+        self.max_size = max_size
+        self.size = 0
+        self._sizeof = sizeof
+        self._entries: 'OrderedDict[Hashable, V]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        value_size = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= self._sizeof(old)
+            if value_size > self.max_size:
+                return
+            self._entries[key] = value
+            self.size += value_size
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= self._sizeof(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
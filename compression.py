@@ -0,0 +1,81 @@
+"""HTTP response compression for the Flask app.
+
+Bodies are compressed with brotli when the brotli package is installed and
+the client accepts it, with gzip otherwise. Streamed bodies are compressed
+chunk by chunk and flushed after each one, so the browser can still start
+rendering before the last chunk is out.
+"""
+import zlib
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from werkzeug.datastructures import Accept
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Mimetypes worth compressing; images and fonts are compressed already
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+))
+GZIP_LEVEL = 6
+# Brotli quality for bodies compressed once and cached; 11 is too slow per request
+BROTLI_QUALITY = 5
+# Streamed bodies are compressed as they are sent, so they use a faster setting
+BROTLI_STREAM_QUALITY = 4
+
+def available_encodings() -> Sequence[str]:
+    """The content codings this process can produce, best first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def choose_encoding(accept_encodings: Accept) -> Optional[str]:
+    """Pick the best coding the client accepts (honouring q-values), or None."""
+    return accept_encodings.best_match(available_encodings())
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    raise ValueError(f"unsupported content coding {encoding!r}")
+
+def compress_stream(chunks: Iterable[bytes], encoding: str,
+                    on_complete: Optional[Callable[[bytes], None]] = None) -> Iterator[bytes]:
+    """Compress a streamed body, flushing the compressor after every chunk.
+
+    If the stream runs to the end, `on_complete` gets the whole compressed
+    body, e.g. to cache it; a client that disconnects early skips it.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_STREAM_QUALITY)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    elif encoding == 'gzip':
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    else:
+        raise ValueError(f"unsupported content coding {encoding!r}")
+
+    sent = [] if on_complete is not None else None
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = process(chunk) + flush()
+            if data:
+                if sent is not None:
+                    sent.append(data)
+                yield data
+        data = finish()
+        if sent is not None:
+            sent.append(data)
+        yield data
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+    if on_complete is not None:
+        on_complete(b''.join(sent))
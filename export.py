@@ -0,0 +1,278 @@
+"""Export the catalog as a static site.
+
+Between imports the catalog is read-only, so it can be rendered once and
+served by any static file server or CDN, with no app server at all::
+
+    python export.py --database presets.db --output site --workers 4
+
+The output mirrors the app's routes as files, with relative links, so the
+site works from any directory:
+
+    index.html, page-2.html, ...     the paginated category pages
+    presets/<id>/card.html           card preview document
+    presets/<id>/full.html           full preview document
+    presets/<id>/files.json          what /api/presets/<id>/files returns
+    presets/<id>/source.{html,css,js}  the preset's own files
+    thumbnails/                      the card thumbnails (see thumbnails.py)
+    static/                          the CSS and JS bundles
+
+Pages and presets are rendered in chunks across a pool of worker
+processes. ``.export.json`` records the content hash of every preset
+exported, so a later run only re-renders the presets whose files changed
+(``--full`` re-renders all of them). Presets removed from the catalog are
+deleted, and files whose content is unchanged are not rewritten, so
+their modification times stay put for rsync or a CDN sync. The preview
+documents rely on the iframes' `sandbox` attribute alone, as a static
+host does not send the app's Content-Security-Policy header.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence
+
+import app
+import assets
+from previews import PREVIEW_VARIANTS
+
+MANIFEST_NAME = '.export.json'
+# Presets rendered per task handed to a worker process
+PRESETS_PER_TASK = 200
+# Category pages rendered per task
+PAGES_PER_TASK = 20
+
+_PAGE_NAME = re.compile(r'page-(\d+)\.html$')
+
+def page_name(page: int) -> str:
+    return 'index.html' if page == 1 else f'page-{page}.html'
+
+def export_url(endpoint: str, **values) -> str:
+    """Stand-in for `url_for` in exported pages: the relative path of the file a route was exported to."""
+    if endpoint == 'index':
+        return page_name(max(1, values.get('page', 1)))
+    if endpoint == 'preview':
+        return f"presets/{values['preset_id']}/{values.get('variant', 'full')}.html"
+    if endpoint == 'preset_files':
+        return f"presets/{values['preset_id']}/files.json"
+    if endpoint == 'thumbnail':
+        return f"thumbnails/{values['filename']}"
+    if endpoint == 'static':
+        return f"static/{values['filename']}"
+    raise ValueError(f"no static export for endpoint {endpoint!r}")
+
+def export_asset_url(name: str) -> str:
+    return export_url('static', filename=app.asset_manifest[name])
+
+def content_key(file_hashes: Dict[str, str]) -> str:
+    """Hash of a preset's files, from their blob hashes."""
+    digest = hashlib.sha256()
+    for file_type, file_hash in sorted(file_hashes.items()):
+        digest.update(b'%s\0%s\0' % (file_type.encode(), file_hash.encode()))
+    return digest.hexdigest()
+
+def renderer_hash() -> str:
+    """Hash of the code that renders preset files, so changing it invalidates earlier exports."""
+    digest = hashlib.sha256()
+    for module in ('previews.py', 'export.py'):
+        with open(os.path.join(assets.ROOT, module), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def write_file(path: str, data: bytes) -> bool:
+    """Write `data` to `path` atomically, unless it holds exactly that already.
+
+    Returns whether the file was written.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+def _check_generation(generation: int) -> None:
+    if app.get_catalog().generation != generation:
+        raise RuntimeError("The catalog changed during the export; run it again")
+
+def init_worker(database: str) -> None:
+    app.DATABASE_PATH = database
+
+def export_pages(output_dir: str, generation: int, pages: Sequence[int]) -> int:
+    """Render category pages; returns how many files were written."""
+    written = 0
+    with app.app.app_context():
+        _check_generation(generation)
+        template = app.app.jinja_env.get_template('index.html')
+        for page in pages:
+            categories, total_pages = app.get_catalog_page(page)
+            context = {'categories': categories, 'page': page, 'total_pages': total_pages}
+            app.app.update_template_context(context)
+            # Context variables shadow the template globals of the same name
+            context.update(url_for=export_url, asset_url=export_asset_url)
+            html = template.render(context)
+            written += write_file(os.path.join(output_dir, page_name(page)), html.encode('utf-8'))
+    return written
+
+def export_presets(output_dir: str, generation: int, preset_ids: Sequence[int]) -> int:
+    """Render the previews and files of presets; returns how many files were written."""
+    written = 0
+    with app.app.app_context():
+        _check_generation(generation)
+        hashes_by_preset = app.get_file_hashes(list(preset_ids))
+        files_by_preset = app.get_files_for_presets(list(preset_ids))
+        for preset_id in preset_ids:
+            preset_dir = os.path.join(output_dir, 'presets', str(preset_id))
+            file_hashes = hashes_by_preset[preset_id]
+            files = files_by_preset[preset_id]
+            for variant in PREVIEW_VARIANTS:
+                _, document = app.get_preview_document(file_hashes, variant)
+                written += write_file(os.path.join(preset_dir, f'{variant}.html'), document.encode('utf-8'))
+            for file_type in ('html', 'css', 'js'):
+                path = os.path.join(preset_dir, f'source.{file_type}')
+                if file_type in files:
+                    written += write_file(path, files[file_type].encode('utf-8'))
+                elif os.path.exists(path):
+                    os.remove(path)
+            # Relative to the page that fetches it, like every link in the export
+            data = {
+                'id': preset_id,
+                'html': files.get('html', ''),
+                'css': files.get('css', ''),
+                'js': files.get('js', ''),
+                'preview_url': export_url('preview', preset_id=preset_id, variant='full'),
+            }
+            written += write_file(os.path.join(preset_dir, 'files.json'), json.dumps(data).encode('utf-8'))
+    return written
+
+def load_export_manifest(output_dir: str) -> Dict:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def copy_static(output_dir: str) -> int:
+    """Copy the current bundles to `output_dir`/static and drop older ones."""
+    static_dir = os.path.join(output_dir, 'static')
+    os.makedirs(static_dir, exist_ok=True)
+    current = set(app.asset_manifest.values())
+    written = 0
+    for file_name in current:
+        with open(os.path.join(assets.STATIC_DIR, file_name), 'rb') as f:
+            written += write_file(os.path.join(static_dir, file_name), f.read())
+    for file_name in os.listdir(static_dir):
+        if file_name not in current:
+            os.remove(os.path.join(static_dir, file_name))
+    return written
+
+def export_thumbnails(output_dir: str, thumbnails: Dict[str, str]) -> int:
+    """Write the catalog's card thumbnails and drop older ones.
+
+    They are named by preview hash, so an existing file never needs rewriting.
+    """
+    thumbnails_dir = os.path.join(output_dir, 'thumbnails')
+    os.makedirs(thumbnails_dir, exist_ok=True)
+    current = {f'{digest}.{image_format}' for digest, image_format in thumbnails.items()}
+    existing = set(os.listdir(thumbnails_dir))
+    written = 0
+    with app.app.app_context():
+        conn = app.get_db_connection()
+        for file_name in current - existing:
+            row = conn.execute('SELECT data FROM thumbnails WHERE hash = ?', (file_name.partition('.')[0],)).fetchone()
+            if row is not None:
+                written += write_file(os.path.join(thumbnails_dir, file_name), bytes(row['data']))
+    for file_name in existing - current:
+        os.remove(os.path.join(thumbnails_dir, file_name))
+    return written
+
+def remove_stale(output_dir: str, preset_ids: Sequence[int], total_pages: int) -> int:
+    """Delete the pages and presets of earlier exports that no longer exist."""
+    removed = 0
+    for file_name in os.listdir(output_dir):
+        match = _PAGE_NAME.match(file_name)
+        if match and int(match.group(1)) > total_pages:
+            os.remove(os.path.join(output_dir, file_name))
+            removed += 1
+    presets_dir = os.path.join(output_dir, 'presets')
+    if os.path.isdir(presets_dir):
+        keep = {str(preset_id) for preset_id in preset_ids}
+        for name in os.listdir(presets_dir):
+            if name not in keep:
+                shutil.rmtree(os.path.join(presets_dir, name))
+                removed += 1
+    return removed
+
+def chunked(items: Sequence, size: int) -> List[Sequence]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+def export(database: str, output_dir: str, workers: int = os.cpu_count() or 1, full: bool = False) -> Dict:
+    """Export the catalog in `database` to `output_dir`; returns counts of what was done."""
+    app.DATABASE_PATH = database
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    with app.app.app_context():
+        catalog = app.get_catalog()
+        generation = catalog.generation
+        preset_ids = sorted(catalog.preset_ids)
+        total_pages = max(1, -(-len(catalog.rows) // app.PRESETS_PER_PAGE))
+        thumbnails = catalog.thumbnails
+        keys = {preset_id: content_key(hashes) for preset_id, hashes in app.get_file_hashes(preset_ids).items()}
+
+    previous = load_export_manifest(output_dir)
+    renderer = renderer_hash()
+    exported = previous.get('presets', {}) if previous.get('renderer') == renderer and not full else {}
+    changed = [preset_id for preset_id in preset_ids if exported.get(str(preset_id)) != keys[preset_id]]
+
+    # Spawned, not forked: a forked worker would inherit this process's open SQLite connections
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker, initargs=(database,)) as pool:
+        tasks = [pool.submit(export_pages, output_dir, generation, pages)
+                 for pages in chunked(range(1, total_pages + 1), PAGES_PER_TASK)]
+        tasks += [pool.submit(export_presets, output_dir, generation, chunk)
+                  for chunk in chunked(changed, PRESETS_PER_TASK)]
+        written = sum(task.result() for task in tasks)
+
+    written += copy_static(output_dir)
+    written += export_thumbnails(output_dir, thumbnails)
+    removed = remove_stale(output_dir, preset_ids, total_pages)
+    manifest = {
+        'generation': generation,
+        'renderer': renderer,
+        'presets': {str(preset_id): key for preset_id, key in keys.items()},
+    }
+    write_file(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, sort_keys=True).encode('utf-8'))
+    return {
+        'generation': generation,
+        'pages': total_pages,
+        'presets': len(preset_ids),
+        'rendered': len(changed),
+        'written': written,
+        'removed': removed,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=app.DATABASE_PATH)
+    parser.add_argument('--output', default='site', help='directory to write the site to')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='rendering processes')
+    parser.add_argument('--full', action='store_true', help='re-render every preset, not only changed ones')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = export(args.database, args.output, args.workers, args.full)
+    print(f"Exported generation {result['generation']} to {args.output} in {time.perf_counter() - started:.1f}s: "
+          f"{result['pages']} pages, {result['rendered']} of {result['presets']} presets rendered, "
+          f"{result['written']} files written, {result['removed']} removed")
+
+if __name__ == '__main__':
+    main()
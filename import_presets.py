@@ -1,15 +1,68 @@
+import argparse
+import codecs
 import os
+import queue
+import re
 import sqlite3
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+import blobs
+import snapshot
+import thumbnails
 
 # Configurações
 DATABASE_PATH = 'presets.db'
 EXAMPLES_DIR = 'examples'
+# Threads que leem arquivos enquanto a thread principal escreve no banco
+READ_WORKERS = 8
+# Leituras em andamento por thread (limita a memória usada pelo conteúdo lido)
+READ_AHEAD_PER_WORKER = 16
+# Arquivos gravados por transação
+COMMIT_CHUNK_SIZE = 500
+# Entradas de um .7z descomprimidas à frente da gravação (limita a memória usada)
+ARCHIVE_READ_AHEAD = 64
+# Versão mínima do py7zr: a partir dela cada destino é fechado assim que sua entrada termina
+PY7ZR_VERSION = (1, 1)
+# Intervalo mínimo, em segundos, entre dois relatórios de progresso
+PROGRESS_INTERVAL = 2.0
+FILE_TYPES = {'.html': 'html', '.css': 'css', '.js': 'js'}
+# Colunas de files; o conteúdo fica na tabela blobs, indexada por content_hash
+FILES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        preset_id INTEGER,
+        file_type TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        mtime REAL,
+        size INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(preset_id, file_type),
+        FOREIGN KEY (preset_id) REFERENCES presets (id),
+        FOREIGN KEY (content_hash) REFERENCES blobs (hash)
+    )
+'''
+
+class FileJob(NamedTuple):
+    """Um arquivo de um diretório dist a ser importado."""
+    preset_id: int
+    file_type: str
+    path: str
+    label: str
+    mtime: float
+    size: int
 
-def init_database() -> sqlite3.Connection:
-    """Inicializa o banco de dados e retorna a conexão."""
-    conn = sqlite3.connect(DATABASE_PATH)
+def init_database(database: Optional[str] = None) -> sqlite3.Connection:
+    """Inicializa o banco de dados (por padrão DATABASE_PATH) e retorna a conexão."""
+    conn = sqlite3.connect(database or DATABASE_PATH)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -32,152 +85,775 @@ def init_database() -> sqlite3.Connection:
     )
     ''')
     
+    # Conteúdo dos arquivos, uma vez por hash (ver blobs.py)
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS files (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        preset_id INTEGER,
-        file_type TEXT NOT NULL,
-        content TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(preset_id, file_type),
-        FOREIGN KEY (preset_id) REFERENCES presets (id)
+    CREATE TABLE IF NOT EXISTS blobs (
+        hash TEXT PRIMARY KEY,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        data BLOB NOT NULL
+    )
+    ''')
+    
+    cursor.execute(FILES_TABLE.format(name='files'))
+    
+    # Miniaturas dos cards do índice, pelo hash do preview (ver thumbnails.py)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS thumbnails (
+        hash TEXT PRIMARY KEY,
+        format TEXT NOT NULL,
+        data BLOB NOT NULL
     )
     ''')
     
+    # Bancos criados antes da importação incremental não têm estas colunas
+    cursor.execute('PRAGMA table_info(files)')
+    columns = {row[1] for row in cursor.fetchall()}
+    for column, column_type in (('mtime', 'REAL'), ('size', 'INTEGER'), ('content_hash', 'TEXT')):
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE files ADD COLUMN {column} {column_type}')
+    # ...e os anteriores aos blobs guardam o conteúdo na própria tabela files
+    if 'content' in columns:
+        migrate_files_to_blobs(cursor)
+    
     # Índices para melhorar a performance
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_presets_category ON presets(category_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_preset ON files(preset_id)')
     
+    init_search_index(cursor)
+    
     conn.commit()
     return conn
 
-def get_or_create_category(cursor: sqlite3.Cursor, name: str) -> int:
-    """Obtém ou cria uma categoria e retorna o ID."""
-    cursor.execute('SELECT id FROM categories WHERE name = ?', (name,))
-    result = cursor.fetchone()
-    
-    if result:
-        return result[0]
+def migrate_files_to_blobs(cursor: sqlite3.Cursor, batch_size: int = COMMIT_CHUNK_SIZE) -> None:
+    """Move o conteúdo da antiga coluna files.content para a tabela blobs.
+
+    A tabela files é recriada sem a coluna, pois o SQLite não remove uma
+    coluna usada por gatilhos; os gatilhos da busca são recriados depois
+    por init_search_index.
+    """
+    print("Migrando o conteúdo dos arquivos para a tabela blobs...")
+    reader = cursor.connection.cursor()
+    reader.execute('SELECT id, content FROM files')
+    while True:
+        rows = reader.fetchmany(batch_size)
+        if not rows:
+            break
+        contents = {}
+        hashes = []
+        for file_id, content in rows:
+            # Recalculado: o content_hash de bancos antigos pode faltar
+            digest = blobs.content_hash(content)
+            contents[digest] = content
+            hashes.append((digest, file_id))
+        blobs.store_blobs(cursor, contents)
+        cursor.executemany('UPDATE files SET content_hash = ? WHERE id = ?', hashes)
     
-    cursor.execute('INSERT INTO categories (name) VALUES (?)', (name,))
-    return cursor.lastrowid
+    cursor.execute(FILES_TABLE.format(name='files_blobs'))
+    cursor.execute('''
+        INSERT INTO files_blobs (id, preset_id, file_type, content_hash, mtime, size, created_at, updated_at)
+        SELECT id, preset_id, file_type, content_hash, mtime, size, created_at, updated_at FROM files
+    ''')
+    cursor.execute('DROP TABLE files')
+    cursor.execute('ALTER TABLE files_blobs RENAME TO files')
 
-def get_or_create_preset(cursor: sqlite3.Cursor, category_id: int, name: str) -> int:
-    """Obtém ou cria um preset e retorna o ID."""
-    cursor.execute(
-        'SELECT id FROM presets WHERE category_id = ? AND name = ?',
-        (category_id, name)
-    )
-    result = cursor.fetchone()
+def init_search_index(cursor: sqlite3.Cursor) -> None:
+    """Cria o índice de busca (FTS5), com rowid = ID do preset: presets_fts
+    cobre nome, descrição e arquivos; titles_fts só nome e descrição, para
+    ordenar primeiro os presets cujo título corresponde à busca.
+
+    Gatilhos anotam em search_pending os presets alterados por qualquer
+    escrita; sync_search_index os reindexa de uma vez, dentro da transação
+    de quem escreveu. Um índice recém-criado é preenchido com o que já
+    estiver no banco.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_pending'")
+    created = cursor.fetchone() is None
+    try:
+        for table, columns in (('presets_fts', 'name, description, html, css, js'),
+                               ('titles_fts', 'name, description')):
+            cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+                {columns},
+                tokenize = 'porter unicode61 remove_diacritics 2'
+            )
+            ''')
+    except sqlite3.OperationalError as e:
+        print(f"Aviso: índice de busca indisponível ({e}); a busca do app ficará desativada.")
+        return
+    
+    cursor.execute('CREATE TABLE IF NOT EXISTS search_pending (preset_id INTEGER PRIMARY KEY)')
+    for name, event, row in (
+        ('presets_insert', 'INSERT ON presets', 'NEW.id'),
+        ('presets_update', 'UPDATE OF name, description ON presets', 'NEW.id'),
+        ('files_insert', 'INSERT ON files', 'NEW.preset_id'),
+        ('files_update', 'UPDATE OF content_hash ON files', 'NEW.preset_id'),
+        ('files_delete', 'DELETE ON files', 'OLD.preset_id'),
+    ):
+        # Sem OR IGNORE: dentro de um gatilho ele cede à política de conflito do comando
+        # externo, e o upsert de upsert_files abortaria ao anotar o mesmo preset duas vezes
+        sql = (f'CREATE TRIGGER search_{name} AFTER {event}\n'
+               f'BEGIN\n'
+               f'    INSERT INTO search_pending (preset_id) SELECT {row}\n'
+               f'    WHERE NOT EXISTS (SELECT 1 FROM search_pending WHERE preset_id = {row});\n'
+               f'END')
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f'search_{name}',))
+        existing = cursor.fetchone()
+        if existing is None or existing[0] != sql:
+            # Bancos anteriores têm os gatilhos com OR IGNORE
+            cursor.execute(f'DROP TRIGGER IF EXISTS search_{name}')
+            cursor.execute(sql)
     
-    if result:
-        return result[0]
+    if created:
+        cursor.execute('INSERT OR IGNORE INTO search_pending (preset_id) SELECT id FROM presets')
+        sync_search_index(cursor)
+
+def sync_search_index(cursor: sqlite3.Cursor, batch_size: int = COMMIT_CHUNK_SIZE) -> int:
+    """Reindexa os presets anotados em search_pending e retorna quantos foram.
+
+    O conteúdo dos arquivos vem descomprimido da tabela blobs, em lotes de
+    `batch_size` presets.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_pending'")
+    if cursor.fetchone() is None:
+        return 0
+    cursor.execute('SELECT preset_id FROM search_pending')
+    pending = [row[0] for row in cursor.fetchall()]
+    for table in ('presets_fts', 'titles_fts'):
+        cursor.execute(f'DELETE FROM {table} WHERE rowid IN (SELECT preset_id FROM search_pending)')
     
-    cursor.execute(
-        'INSERT INTO presets (category_id, name) VALUES (?, ?)',
-        (category_id, name)
+    indexed = 0
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f"SELECT id, name, COALESCE(description, '') FROM presets WHERE id IN ({placeholders})", chunk)
+        presets = cursor.fetchall()
+        cursor.execute(f'SELECT preset_id, file_type, content_hash FROM files WHERE preset_id IN ({placeholders})', chunk)
+        file_hashes = cursor.fetchall()
+        contents = blobs.load_blobs(cursor, {digest for _, _, digest in file_hashes})
+        files: Dict[int, Dict[str, str]] = {}
+        for preset_id, file_type, digest in file_hashes:
+            files.setdefault(preset_id, {})[file_type] = contents.get(digest, '')
+        
+        cursor.executemany(
+            'INSERT INTO presets_fts (rowid, name, description, html, css, js) VALUES (?, ?, ?, ?, ?, ?)',
+            [
+                (preset_id, name, description,
+                 *(files.get(preset_id, {}).get(file_type, '') for file_type in ('html', 'css', 'js')))
+                for preset_id, name, description in presets
+            ]
+        )
+        cursor.executemany('INSERT INTO titles_fts (rowid, name, description) VALUES (?, ?, ?)', presets)
+        indexed += len(presets)
+    cursor.execute('DELETE FROM search_pending')
+    return indexed
+
+def bump_catalog_generation(cursor: sqlite3.Cursor) -> int:
+    """Incrementa a geração do catálogo (PRAGMA user_version) e retorna o novo valor.
+
+    O app mantém o catálogo em cache e só o recarrega quando este número muda.
+    """
+    cursor.execute('PRAGMA user_version')
+    generation = cursor.fetchone()[0] + 1
+    cursor.execute(f'PRAGMA user_version = {generation}')
+    return generation
+
+def upsert_categories(cursor: sqlite3.Cursor, names: Iterable[str]) -> Dict[str, int]:
+    """Cria as categorias que faltam e retorna o mapa nome -> ID de todas."""
+    cursor.executemany(
+        'INSERT INTO categories (name) VALUES (?) ON CONFLICT(name) DO NOTHING',
+        [(name,) for name in names]
     )
-    return cursor.lastrowid
+    cursor.execute('SELECT name, id FROM categories')
+    return dict(cursor.fetchall())
 
-def update_or_create_file(cursor: sqlite3.Cursor, preset_id: int, file_type: str, content: str) -> None:
-    """Atualiza ou cria um arquivo para o preset."""
-    cursor.execute(
-        'SELECT id FROM files WHERE preset_id = ? AND file_type = ?',
-        (preset_id, file_type)
+def upsert_presets(cursor: sqlite3.Cursor, keys: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], int]:
+    """Cria os presets que faltam e retorna o mapa (category_id, nome) -> ID de todos."""
+    cursor.executemany(
+        'INSERT INTO presets (category_id, name) VALUES (?, ?) ON CONFLICT(category_id, name) DO NOTHING',
+        list(keys)
     )
-    
-    if cursor.fetchone():
-        cursor.execute(
-            '''
-            UPDATE files 
-            SET content = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE preset_id = ? AND file_type = ?
-            ''',
-            (content, preset_id, file_type)
+    cursor.execute('SELECT category_id, name, id FROM presets')
+    return {(category_id, name): preset_id for category_id, name, preset_id in cursor.fetchall()}
+
+def upsert_files(cursor: sqlite3.Cursor, rows: List[Tuple[int, str, str, float, int, str]],
+                 codec: Optional[str] = None) -> None:
+    """Grava (preset_id, file_type, content, mtime, size, content_hash) em lote.
+
+    O conteúdo vai para a tabela blobs, comprimido com `codec`, e só se
+    ainda não houver um blob com o mesmo hash; um content_hash vazio é
+    calculado aqui.
+    """
+    contents = {}
+    file_rows = []
+    for preset_id, file_type, content, mtime, size, digest in rows:
+        digest = digest or blobs.content_hash(content)
+        contents[digest] = content
+        file_rows.append((preset_id, file_type, digest, mtime, size))
+    blobs.store_blobs(cursor, contents, codec)
+    cursor.executemany(
+        '''
+        INSERT INTO files (preset_id, file_type, content_hash, mtime, size)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(preset_id, file_type) DO UPDATE SET
+            content_hash = excluded.content_hash,
+            mtime = excluded.mtime,
+            size = excluded.size,
+            updated_at = CURRENT_TIMESTAMP
+        ''',
+        file_rows
+    )
+
+def touch_files(cursor: sqlite3.Cursor, rows: List[Tuple[float, int, int, str]]) -> None:
+    """Atualiza só (mtime, size) de arquivos cujo conteúdo não mudou, em lote."""
+    cursor.executemany(
+        'UPDATE files SET mtime = ?, size = ? WHERE preset_id = ? AND file_type = ?',
+        rows
+    )
+
+def load_file_index(cursor: sqlite3.Cursor) -> Dict[Tuple[int, str], Tuple[float, int, str]]:
+    """Retorna (mtime, size, content_hash) de cada arquivo já importado."""
+    cursor.execute('SELECT preset_id, file_type, mtime, size, content_hash FROM files')
+    return {(row[0], row[1]): (row[2], row[3], row[4]) for row in cursor.fetchall()}
+
+def read_file(file_path: str) -> Tuple[str, str]:
+    """Lê um arquivo e retorna o conteúdo e o hash SHA-256 dele."""
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    return content, blobs.content_hash(content)
+
+class ImportProgress:
+    """Contadores da importação com relatório periódico de vazão."""
+
+    def __init__(self, total: int, interval: float = PROGRESS_INTERVAL):
+        self.total = total
+        self.interval = interval
+        self.files = 0
+        self.bytes = 0
+        self.written = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def add(self, size: int) -> None:
+        self.files += 1
+        self.bytes += size
+
+    def line(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        done = self.files + self.skipped + self.errors
+        return (
+            f"{done}/{self.total} arquivos, {self.bytes / 1e6:.1f} MB lidos em {elapsed:.1f}s "
+            f"({self.files / elapsed:.0f} arquivos/s, {self.bytes / 1e6 / elapsed:.1f} MB/s)"
         )
-    else:
-        cursor.execute(
-            'INSERT INTO files (preset_id, file_type, content) VALUES (?, ?, ?)',
-            (preset_id, file_type, content)
+
+    def report(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        if force or now - self._last_report >= self.interval:
+            self._last_report = now
+            print(f"  {self.line()}")
+
+    def summary(self) -> str:
+        return (
+            f"{self.written} gravados, {self.unchanged} sem alteração, "
+            f"{self.skipped} ignorados, {self.errors} erros. {self.line()}"
         )
 
-def process_dist_directory(cursor: sqlite3.Cursor, preset_id: int, category_name: str, preset_name: str, dir_path: str) -> None:
-    """Processa os arquivos em um diretório dist."""
+def scan_dist_directory(preset_id: int, category_name: str, preset_name: str, dir_path: str) -> List[FileJob]:
+    """Lista os arquivos HTML, CSS e JS de um diretório dist, sem ler o conteúdo."""
+    jobs = []
     try:
-        for file_name in os.listdir(dir_path):
-            file_path = os.path.join(dir_path, file_name)
-            if not os.path.isfile(file_path):
-                continue
-            
-            # Determina o tipo do arquivo
-            if file_name.endswith('.html'):
-                file_type = 'html'
-            elif file_name.endswith('.css'):
-                file_type = 'css'
-            elif file_name.endswith('.js'):
-                file_type = 'js'
-            else:
-                continue  # Ignora outros tipos de arquivo
-            
-            # Lê o conteúdo do arquivo
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    content = f.read()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                file_type = FILE_TYPES.get(os.path.splitext(entry.name)[1])
+                if file_type is None or not entry.is_file():
+                    continue  # Ignora outros tipos de arquivo
                 
-                update_or_create_file(cursor, preset_id, file_type, content)
-                print(f"Processado: {category_name}/{preset_name}/{file_name}")
-            except Exception as e:
-                print(f"Erro ao processar {file_path}: {str(e)}")
+                stat = entry.stat()
+                jobs.append(FileJob(
+                    preset_id, file_type, entry.path,
+                    f"{category_name}/{preset_name}/{entry.name}",
+                    stat.st_mtime, stat.st_size
+                ))
     except Exception as e:
         print(f"Erro ao listar diretório {dir_path}: {str(e)}")
+    return jobs
+
+def scan_examples(base_dir: str) -> Tuple[Set[str], List[Tuple[str, str, str]]]:
+    """Percorre o diretório de exemplos.
+
+    Retorna os nomes das categorias e a lista (categoria, preset, caminho do dist)
+    dos presets válidos.
+    """
+    categories = set()
+    presets = []
+    # Percorre cada categoria (primeiro nível)
+    for category_name in os.listdir(base_dir):
+        category_path = os.path.join(base_dir, category_name)
+        if not os.path.isdir(category_path) or category_name.startswith('.'):
+            continue
+        categories.add(category_name)
+        
+        # Para cada item dentro da categoria
+        for item_name in os.listdir(category_path):
+            item_path = os.path.join(category_path, item_name)
+            
+            # Se for um diretório, trata como um preset
+            # (desde que não seja 'dist' nem 'src')
+            if not os.path.isdir(item_path) or item_name in ['dist', 'src']:
+                continue
+            
+            # Verifica se existe um diretório 'dist' dentro do preset
+            dist_path = os.path.join(item_path, 'dist')
+            if os.path.isdir(dist_path):
+                presets.append((category_name, item_name, dist_path))
+            else:
+                print(f"Aviso: Diretório 'dist' não encontrado em {item_path}")
+    return categories, presets
+
+class FileWriter:
+    """Grava em lotes os arquivos lidos, decidindo antes quais precisam ser lidos.
+
+    No modo incremental, arquivos com mesmo mtime e tamanho do que está no
+    banco nem são lidos; os lidos com o mesmo hash só têm mtime/tamanho
+    atualizados. Cada lote de `chunk_size` arquivos é gravado e confirmado
+    numa transação, com o conteúdo comprimido com `codec` (ver blobs.py).
+    """
+
+    def __init__(self, conn: sqlite3.Connection, total: int, incremental: bool, chunk_size: int,
+                 codec: Optional[str] = None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.incremental = incremental
+        self.chunk_size = chunk_size
+        self.codec = codec
+        self.known = load_file_index(self.cursor)
+        self.progress = ImportProgress(total)
+        self._file_rows = []
+        self._touch_rows = []
+
+    def needs_read(self, job: FileJob) -> bool:
+        stored = self.known.get((job.preset_id, job.file_type))
+        if self.incremental and stored and stored[0] == job.mtime and stored[1] == job.size:
+            self.progress.skipped += 1
+            return False
+        return True
 
-def process_directory(base_dir: str) -> None:
-    """Processa o diretório de exemplos e importa para o banco de dados."""
+    def add(self, job: FileJob, content: str, content_hash: str) -> None:
+        self.progress.add(job.size)
+        stored = self.known.get((job.preset_id, job.file_type))
+        if self.incremental and stored and stored[2] == content_hash:
+            self._touch_rows.append((job.mtime, job.size, job.preset_id, job.file_type))
+            self.progress.unchanged += 1
+        else:
+            self._file_rows.append((job.preset_id, job.file_type, content, job.mtime, job.size, content_hash))
+            self.progress.written += 1
+        if len(self._file_rows) + len(self._touch_rows) >= self.chunk_size:
+            self.flush()
+
+    def error(self, job: FileJob, error: Exception) -> None:
+        print(f"Erro ao processar {job.path}: {str(error)}")
+        self.progress.errors += 1
+
+    def flush(self) -> None:
+        upsert_files(self.cursor, self._file_rows, self.codec)
+        touch_files(self.cursor, self._touch_rows)
+        sync_search_index(self.cursor)
+        self.conn.commit()
+        self._file_rows.clear()
+        self._touch_rows.clear()
+        self.progress.report()
+
+def import_files(conn: sqlite3.Connection, jobs: List[FileJob], incremental: bool,
+                 workers: int, chunk_size: int, codec: Optional[str] = None) -> ImportProgress:
+    """Importa os arquivos: leitura em paralelo, escrita em lotes só na thread atual."""
+    writer = FileWriter(conn, len(jobs), incremental, chunk_size, codec)
+    to_read = [job for job in jobs if writer.needs_read(job)]
+    
+    def finish_read(job: FileJob, future) -> None:
+        try:
+            content, content_hash = future.result()
+        except Exception as e:
+            writer.error(job, e)
+            return
+        writer.add(job, content, content_hash)
+    
+    # Mantém uma janela limitada de leituras em andamento, consumidas em ordem
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for job in to_read:
+            pending.append((job, pool.submit(read_file, job.path)))
+            if len(pending) >= workers * READ_AHEAD_PER_WORKER:
+                finish_read(*pending.popleft())
+        while pending:
+            finish_read(*pending.popleft())
+    writer.flush()
+    
+    return writer.progress
+
+def update_thumbnails(conn: sqlite3.Connection) -> None:
+    """Gera as miniaturas que faltam; sem navegador, a importação segue sem elas."""
+    print("\nGerando miniaturas...")
+    try:
+        rendered, failed = thumbnails.render_thumbnails(conn)
+    except RuntimeError as e:
+        print(f"Miniaturas não geradas: {e}")
+        return
+    print(f"{rendered} miniaturas geradas, {failed} falhas")
+
+def update_snapshot(conn: sqlite3.Connection, changed: bool) -> None:
+    """Recompila o snapshot do catálogo (ver snapshot.py) se o catálogo mudou ou se ele não é o do banco.
+
+    Roda antes do commit da nova geração: quando o app a vê, o snapshot
+    dela já está no lugar, e é esse commit que o valida.
+    """
+    path = snapshot.snapshot_path(DATABASE_PATH)
+    generation = conn.execute('PRAGMA user_version').fetchone()[0]
+    if not changed:
+        try:
+            if snapshot.read_identity(path) == (generation, snapshot.read_token(conn)):
+                return
+        except (FileNotFoundError, snapshot.SnapshotError):
+            pass
+    started = time.perf_counter()
+    snapshot.write_snapshot(conn, path)
+    print(f"Snapshot da geração {generation} gravado em {path} ({time.perf_counter() - started:.1f}s)")
+
+def publish_import(conn: sqlite3.Connection, changes_before: int, with_snapshot: bool = False) -> None:
+    """Publica o que a importação gravou: apaga os blobs órfãos, incrementa a geração e confirma.
+
+    Com `with_snapshot`, ou se já existir um snapshot do banco, ele é
+    recompilado para a nova geração.
+    """
+    changed = conn.total_changes > changes_before
+    if changed:
+        cursor = conn.cursor()
+        blobs.prune_blobs(cursor)
+        bump_catalog_generation(cursor)
+    if with_snapshot or os.path.exists(snapshot.snapshot_path(DATABASE_PATH)):
+        update_snapshot(conn, changed)
+    conn.commit()
+
+def abort_import(conn: sqlite3.Connection, changes_before: int, error: Exception) -> None:
+    """Desfaz o lote em andamento de uma importação que falhou e publica os já confirmados.
+
+    Cada lote é confirmado ao ser gravado, então uma importação
+    interrompida deixa parte dos presets no banco; sem a nova geração, o
+    app nunca os veria. O snapshot não é recompilado: o app o ignora,
+    por ser de outra geração, e lê o banco.
+    """
+    conn.rollback()
+    print(f"Erro durante a importação: {str(error)}")
+    if conn.total_changes > changes_before:
+        try:
+            cursor = conn.cursor()
+            blobs.prune_blobs(cursor)
+            generation = bump_catalog_generation(cursor)
+            conn.commit()
+            print(f"Lotes já gravados publicados na geração {generation}")
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Erro ao publicar os lotes já gravados: {str(e)}")
+
+def process_directory(base_dir: str, incremental: bool = False, workers: int = READ_WORKERS,
+                      chunk_size: int = COMMIT_CHUNK_SIZE, codec: Optional[str] = None,
+                      with_thumbnails: bool = False, with_snapshot: bool = False) -> bool:
+    """Processa o diretório de exemplos e importa para o banco de dados; retorna se deu certo.
+
+    Com `with_snapshot`, ou se já existir um snapshot do banco, ele é
+    recompilado para a nova geração.
+    """
     conn = init_database()
     cursor = conn.cursor()
+    changes_before = conn.total_changes
     
     try:
-        # Percorre cada categoria (primeiro nível)
-        for category_name in os.listdir(base_dir):
-            category_path = os.path.join(base_dir, category_name)
-            if not os.path.isdir(category_path) or category_name.startswith('.'):
-                continue
-                
-            category_id = get_or_create_category(cursor, category_name)
-            
-            # Para cada item dentro da categoria
-            for item_name in os.listdir(category_path):
-                item_path = os.path.join(category_path, item_name)
-                
-                # Se for um diretório, trata como um preset
-                if os.path.isdir(item_path):
-                    # Verifica se é um diretório de preset válido (não é 'dist' nem 'src')
-                    if item_name not in ['dist', 'src']:
-                        process_preset(cursor, category_id, category_name, item_name, item_path)
-                    
+        category_names, presets = scan_examples(base_dir)
+        category_ids = upsert_categories(cursor, category_names)
+        preset_ids = upsert_presets(cursor, {(category_ids[c], p) for c, p, _ in presets})
         conn.commit()
-        print("\nImportação concluída com sucesso!")
+        
+        jobs: List[FileJob] = []
+        for category_name, preset_name, dist_path in presets:
+            preset_id = preset_ids[(category_ids[category_name], preset_name)]
+            jobs.extend(scan_dist_directory(preset_id, category_name, preset_name, dist_path))
+        
+        progress = import_files(conn, jobs, incremental, workers, chunk_size, codec)
+        if with_thumbnails:
+            update_thumbnails(conn)
+        
+        publish_import(conn, changes_before, with_snapshot)
+        print(f"\nImportação concluída com sucesso! {progress.summary()}")
+        return True
         
     except Exception as e:
-        conn.rollback()
-        print(f"Erro durante a importação: {str(e)}")
+        abort_import(conn, changes_before, e)
+        return False
     finally:
         conn.close()
 
-def process_preset(cursor: sqlite3.Cursor, category_id: int, category_name: str, preset_name: str, preset_path: str) -> None:
-    """Processa um único preset."""
-    # Verifica se existe um diretório 'dist' dentro do preset
-    dist_path = os.path.join(preset_path, 'dist')
-    if os.path.exists(dist_path) and os.path.isdir(dist_path):
-        preset_id = get_or_create_preset(cursor, category_id, preset_name)
-        process_dist_directory(cursor, preset_id, category_name, preset_name, dist_path)
+def normalize_archive_name(name: str) -> str:
+    name = name.replace('\\', '/')
+    return name[2:] if name.startswith('./') else name
+
+def archive_root(names: List[str]) -> str:
+    """Retorna o diretório que envolve todo o conteúdo do arquivo (ex.: 'examples/'), ou ''."""
+    names = [normalize_archive_name(name) for name in names]
+    roots = {name.split('/', 1)[0] for name in names}
+    if len(roots) == 1 and all('/' in name for name in names):
+        return roots.pop() + '/'
+    return ''
+
+def parse_archive_path(name: str, root: str = '') -> Optional[Tuple[str, str, str, str]]:
+    """Mapeia '<root>categoria/preset/dist/arquivo.ext' para (categoria, preset, arquivo, tipo).
+
+    Segue as mesmas regras da leitura do diretório de exemplos e retorna
+    None para entradas fora desse formato ou de tipos ignorados.
+    """
+    name = normalize_archive_name(name)
+    if not name.startswith(root):
+        return None
+    parts = name[len(root):].split('/')
+    if len(parts) != 4 or parts[2] != 'dist':
+        return None
+    category_name, preset_name, _, file_name = parts
+    if category_name.startswith('.') or preset_name in ['dist', 'src']:
+        return None
+    file_type = FILE_TYPES.get(os.path.splitext(file_name)[1])
+    if file_type is None:
+        return None
+    return category_name, preset_name, file_name, file_type
+
+def list_archive(archive_path: str) -> List[Tuple[str, float, int]]:
+    """Lista (nome, mtime, tamanho) dos arquivos de um .7z, .zip ou .tar[.gz|.bz2|.xz].
+
+    Para .zip e .7z só o índice do arquivo é lido; um .tar comprimido
+    precisa ser descomprimido uma vez, sem gravar nada em disco.
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            return [
+                (info.filename, time.mktime(info.date_time + (0, 0, -1)), info.file_size)
+                for info in archive.infolist() if not info.is_dir()
+            ]
+    if archive_path.endswith('.7z'):
+        with open_7z(archive_path) as archive:
+            return [
+                (info.filename, info.creationtime.timestamp() if info.creationtime else 0.0, info.uncompressed)
+                for info in archive.list() if info.is_file
+            ]
+    with tarfile.open(archive_path, 'r|*') as archive:
+        return [(member.name, float(member.mtime), member.size) for member in archive if member.isfile()]
+
+def read_archive(archive_path: str, names: Set[str]) -> Iterator[Tuple[str, str]]:
+    """Gera (nome, conteúdo) das entradas em `names`, na ordem do arquivo.
+
+    O conteúdo é descomprimido e decodificado em fluxo, direto da memória,
+    sem extrair nada para o disco.
+    """
+    if not names:
+        return
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.filename in names:
+                    with archive.open(info) as stream:
+                        yield info.filename, decode_stream(stream)
+    elif archive_path.endswith('.7z'):
+        yield from read_7z(archive_path, names)
     else:
-        print(f"Aviso: Diretório 'dist' não encontrado em {preset_path}")
+        with tarfile.open(archive_path, 'r|*') as archive:
+            for member in archive:
+                if member.isfile() and member.name in names:
+                    with archive.extractfile(member) as stream:
+                        yield member.name, decode_stream(stream)
+
+def read_7z(archive_path: str, names: Set[str], read_ahead: int = ARCHIVE_READ_AHEAD) -> Iterator[Tuple[str, str]]:
+    """Gera (nome, conteúdo) das entradas em `names` de um .7z à medida que são descomprimidas.
+
+    O py7zr só extrai numa chamada bloqueante, que entrega cada entrada ao
+    fechá-la; ela roda numa thread e passa as entradas por uma fila de
+    `read_ahead`, então no máximo isso fica decodificado na memória
+    enquanto quem consome grava no banco.
+    """
+    entries: "queue.Queue[Tuple[Optional[str], Optional[str], Optional[BaseException]]]" = queue.Queue(read_ahead)
+    stopped = threading.Event()
+    
+    def put(entry) -> None:
+        while not stopped.is_set():
+            try:
+                entries.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        # Quem consome desistiu: interrompe a extração
+        raise InterruptedError("leitura do arquivo interrompida")
+    
+    def extract() -> None:
+        try:
+            with open_7z(archive_path) as archive:
+                archive.extract(targets=list(names),
+                                factory=_DecodingWriterFactory(lambda name, content: put((name, content, None))))
+            put((None, None, None))
+        except BaseException as e:
+            if not stopped.is_set():
+                put((None, None, e))
+    
+    thread = threading.Thread(target=extract, daemon=True)
+    thread.start()
+    try:
+        while True:
+            name, content, error = entries.get()
+            if error is not None:
+                raise error
+            if name is None:
+                return
+            yield name, content
+    finally:
+        stopped.set()
+        thread.join()
+
+def decode_stream(stream, chunk_size: int = 64 * 1024) -> str:
+    """Lê e decodifica um fluxo UTF-8 em blocos."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    chunks = []
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        chunks.append(decoder.decode(data))
+    chunks.append(decoder.decode(b'', final=True))
+    return ''.join(chunks)
+
+def open_7z(archive_path: str):
+    try:
+        import py7zr
+    except ImportError:
+        py7zr = None
+    if py7zr is None or tuple(int(part) for part in re.findall(r'\d+', py7zr.__version__)[:2]) < PY7ZR_VERSION:
+        version = '.'.join(map(str, PY7ZR_VERSION))
+        raise RuntimeError(f"Importar arquivos .7z requer o pacote py7zr {version} ou mais novo "
+                           f"(pip install 'py7zr>={version}')")
+    return py7zr.SevenZipFile(archive_path, mode='r')
+
+class _DecodingWriter:
+    """Destino do py7zr que decodifica UTF-8 à medida que os blocos chegam."""
+
+    def __init__(self, name: str, on_close):
+        self.name = name
+        self.on_close = on_close
+        self.closed = False
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._chunks = []
+        self._size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(self._decoder.decode(bytes(data)))
+        self._size += len(data)
+        return len(data)
+
+    def read(self, size=None) -> bytes:
+        return b''
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._size
+
+    def flush(self) -> None:
+        pass
+
+    def size(self) -> int:
+        return self._size
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._chunks.append(self._decoder.decode(b'', final=True))
+            self.on_close(self.name, ''.join(self._chunks))
+            self._chunks = []
+
+class _DecodingWriterFactory:
+    def __init__(self, on_close):
+        self.on_close = on_close
+
+    def create(self, filename: str) -> _DecodingWriter:
+        return _DecodingWriter(filename, self.on_close)
+
+def process_archive(archive_path: str, incremental: bool = False, chunk_size: int = COMMIT_CHUNK_SIZE,
+                    codec: Optional[str] = None, with_thumbnails: bool = False,
+                    with_snapshot: bool = False) -> bool:
+    """Importa os presets direto de um arquivo .7z, .zip ou .tar, sem extraí-lo; retorna se deu certo."""
+    conn = init_database()
+    cursor = conn.cursor()
+    changes_before = conn.total_changes
+    
+    try:
+        members = list_archive(archive_path)
+        root = archive_root([name for name, _, _ in members])
+        entries = []
+        for name, mtime, size in members:
+            parsed = parse_archive_path(name, root)
+            if parsed:
+                entries.append((name, mtime, size) + parsed)
+        
+        category_ids = upsert_categories(cursor, {entry[3] for entry in entries})
+        preset_ids = upsert_presets(cursor, {(category_ids[entry[3]], entry[4]) for entry in entries})
+        conn.commit()
+        
+        jobs = {}
+        for name, mtime, size, category_name, preset_name, file_name, file_type in entries:
+            preset_id = preset_ids[(category_ids[category_name], preset_name)]
+            jobs[name] = FileJob(preset_id, file_type, name, f"{category_name}/{preset_name}/{file_name}", mtime, size)
+        
+        writer = FileWriter(conn, len(jobs), incremental, chunk_size, codec)
+        wanted = {name for name, job in jobs.items() if writer.needs_read(job)}
+        for name, content in read_archive(archive_path, wanted):
+            writer.add(jobs[name], content, blobs.content_hash(content))
+        writer.flush()
+        if with_thumbnails:
+            update_thumbnails(conn)
+        
+        publish_import(conn, changes_before, with_snapshot)
+        print(f"\nImportação concluída com sucesso! {writer.progress.summary()}")
+        return True
+        
+    except Exception as e:
+        abort_import(conn, changes_before, e)
+        return False
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
-    if not os.path.exists(EXAMPLES_DIR):
+    parser = argparse.ArgumentParser(description="Importa os presets de exemplo para o banco de dados.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="ignora arquivos cujo mtime e tamanho não mudaram desde a última importação")
+    parser.add_argument('--workers', type=int, default=READ_WORKERS,
+                        help="threads usadas para ler os arquivos")
+    parser.add_argument('--chunk-size', type=int, default=COMMIT_CHUNK_SIZE,
+                        help="arquivos gravados por transação")
+    parser.add_argument('--archive', metavar='ARQUIVO',
+                        help="importa direto de um .7z, .zip ou .tar em vez do diretório de exemplos")
+    parser.add_argument('--thumbnails', action='store_true',
+                        help="gera com o Chrome headless as miniaturas dos presets novos ou alterados")
+    parser.add_argument('--snapshot', action='store_true',
+                        help="compila o catálogo num snapshot somente leitura que o app mapeia "
+                             "na memória (mantido atualizado nas importações seguintes)")
+    parser.add_argument('--compression', choices=blobs.CODECS,
+                        help="compressão do conteúdo novo (padrão: zstd se o pacote zstandard "
+                             "estiver instalado, senão zlib)")
+    args = parser.parse_args()
+    
+    if args.archive:
+        print(f"Iniciando importação de presets de {args.archive}...\n")
+        ok = process_archive(args.archive, args.incremental, args.chunk_size, args.compression, args.thumbnails,
+                             args.snapshot)
+    elif not os.path.exists(EXAMPLES_DIR):
         print(f"Erro: Diretório '{EXAMPLES_DIR}' não encontrado.")
+        ok = False
     else:
         print("Iniciando importação de presets...\n")
-        process_directory(EXAMPLES_DIR)
+        ok = process_directory(EXAMPLES_DIR, args.incremental, args.workers, args.chunk_size, args.compression,
+                               args.thumbnails, args.snapshot)
+    if not ok:
+        sys.exit(1)
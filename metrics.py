@@ -0,0 +1,113 @@
+"""Per-request instrumentation for the Flask app.
+
+Each request gets a RequestStats that splits its time into phases (see
+PHASES) and counts the SQL statements it runs and the pooled connections
+it takes. The app feeds finished requests into Histograms, which `/metrics`
+exposes in Prometheus' text format. The metrics live in process memory,
+so under serve.py each worker reports only the requests it served.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Phases a request's time is split into; time outside all of them is framework, compression and I/O
+PHASES = ('db', 'assembly', 'render')
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the buckets for per-request query and connection counts
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+# Statements kept per request for the slow-request log, and characters kept of each
+MAX_RECORDED_QUERIES = 100
+MAX_QUERY_LENGTH = 300
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+class Histogram:
+    """A thread-safe Prometheus histogram with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Label values -> (count per bucket, sum, count)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def exposition(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = sorted((labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items())
+        for label_values, counts, total, count in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values))
+            prefix = f'{labels},' if labels else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+            yield f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}'
+            yield f'{self.name}_sum{{{labels}}} {total}'
+            yield f'{self.name}_count{{{labels}}} {count}'
+
+def exposition(histograms: Iterable[Histogram]) -> str:
+    """Render histograms in Prometheus' text exposition format."""
+    return '\n'.join(line for histogram in histograms for line in histogram.exposition()) + '\n'
+
+class RequestStats:
+    """Timings and counters of one request.
+
+    Phase times are exclusive: time spent in a phase opened inside another
+    (a query while assembling a page) counts only towards the inner one.
+    `statements` keeps the SQL run when `record_queries` is set.
+    """
+
+    def __init__(self, record_queries: bool = False):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.queries = 0
+        self.connections = 0
+        self.statements: Optional[List[str]] = [] if record_queries else None
+        # Time spent in nested phases, per open phase
+        self._open: List[float] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        self._open.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] += elapsed - self._open.pop()
+            if self._open:
+                self._open[-1] += elapsed
+
+    def on_query(self, statement: str) -> None:
+        """sqlite3 trace callback: count (and maybe keep) each statement run."""
+        # Statements SQLite runs internally, e.g. for FTS5 lookups, come prefixed with "--"
+        if statement.startswith('--'):
+            return
+        self.queries += 1
+        if self.statements is not None and len(self.statements) < MAX_RECORDED_QUERIES:
+            self.statements.append(' '.join(statement.split())[:MAX_QUERY_LENGTH])
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
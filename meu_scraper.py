@@ -1,5 +1,16 @@
+import argparse
+import asyncio
+import functools
+import glob
+import hashlib
 import os
+import queue
+import re
+import sqlite3
+import threading
 import time
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
@@ -7,16 +18,69 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+import blobs
+import db
+import import_presets
+import snapshot
+
+try:
+    import lxml.html as lxml_html
+    from lxml import etree as lxml_etree
+except ImportError:  # parse_button_code usa o BeautifulSoup, e as listagens, o HTMLParser
+    lxml_html = None
+    lxml_etree = None
 
 # --- Configurações ---
 BOTOES_DIR = "botoes"
+# Registro do estado de cada URL, para retomar execuções interrompidas
+LEDGER_PATH = "scraper_jobs.db"
+# Intervalo máximo, em segundos, entre dois commits do registro
+LEDGER_COMMIT_INTERVAL = 1.0
+BASE_URL = "https://uiverse.io"
+# Tempo máximo, em segundos, de espera pelos blocos de código de uma página
+PAGE_TIMEOUT = 20
+# Navegadores abertos em paralelo
+WORKERS = 4
+# Tentativas por URL antes de desistir
+MAX_ATTEMPTS = 3
+# Espera, em segundos, antes da segunda tentativa; dobra a cada nova tentativa
+RETRY_BACKOFF = 2.0
+# Intervalo mínimo, em segundos, entre dois relatórios de progresso
+PROGRESS_INTERVAL = 5.0
+# Requisições HTTP simultâneas no modo sem navegador
+HTTP_CONCURRENCY = 32
+# Categoria dos botões gravados direto no banco do app
+DB_CATEGORY = "botoes"
+# Intervalo máximo, em segundos, entre dois lotes gravados no banco do app
+DB_FLUSH_INTERVAL = 5.0
+# Bytes lidos por vez ao varrer um arquivo de listagem
+LISTING_CHUNK_SIZE = 1024 * 1024
+# Fim de um card da listagem: ponto seguro para cortar o arquivo em trechos
+ARTICLE_END = re.compile(rb'</article\s*>', re.IGNORECASE)
+# Equivalente em XPath do seletor 'article a.fake-link'
+FAKE_LINK_HREFS = "//a[contains(concat(' ', normalize-space(@class), ' '), ' fake-link ')][ancestor::article]/@href"
+# Só os blocos de código são montados na árvore ao analisar uma página
+CODE_BLOCKS = SoupStrainer('div', attrs={'data-name': ['html', 'css']})
+
+# Os navegadores do pool começam juntos: só o primeiro baixa o ChromeDriver, os outros esperam
+_chromedriver_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def _install_chromedriver():
+    return ChromeDriverManager().install()
+
+def get_chromedriver_path():
+    """Baixa (se preciso) o ChromeDriver uma única vez por execução, mesmo com várias threads."""
+    with _chromedriver_lock:
+        return _install_chromedriver()
 
 def setup_driver():
     """Configura e retorna uma instância do WebDriver do Selenium."""
     print("Configurando o WebDriver...")
     try:
-        service = ChromeService(ChromeDriverManager().install())
+        service = ChromeService(get_chromedriver_path())
         options = webdriver.ChromeOptions()
         options.add_argument("--headless")
         options.add_argument("--disable-gpu")
@@ -30,38 +94,109 @@ def setup_driver():
         print("Verifique sua conexão com a internet ou a configuração do Chrome/ChromeDriver.")
         return None
 
-def get_button_urls_from_html_file(file_path):
+class _FakeLinkParser(HTMLParser):
+    """Coleta, em fluxo, o href dos links 'article a.fake-link'."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.article_depth = 0
+        self.hrefs: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'article':
+            self.article_depth += 1
+        elif tag == 'a' and self.article_depth:
+            attrs = dict(attrs)
+            if 'fake-link' in (attrs.get('class') or '').split() and attrs.get('href'):
+                self.hrefs.append(attrs['href'])
+
+    def handle_endtag(self, tag):
+        if tag == 'article' and self.article_depth:
+            self.article_depth -= 1
+
+def iter_listing_hrefs(file_path: str, chunk_size: int = LISTING_CHUNK_SIZE) -> Iterator[str]:
     """
-    Lê um arquivo HTML local, extrai os links dos botões e os retorna.
+    Gera os href dos links 'article a.fake-link' de um arquivo de listagem.
+
+    O arquivo é lido em blocos de `chunk_size` e analisado aos poucos; os
+    cards já vistos são descartados, então a memória usada não cresce com o
+    tamanho do arquivo. Usa o lxml quando instalado (bem mais rápido);
+    senão, o HTMLParser da biblioteca padrão.
     """
-    print(f"Lendo o arquivo HTML local: {file_path}")
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        print(f"Erro: O arquivo '{file_path}' não foi encontrado.")
-        return []
+    if lxml_etree is not None:
+        # O analisador incremental do libxml2 guarda toda a entrada já lida.
+        # Em vez dele, o arquivo é cortado logo após o último '</article>' de
+        # cada bloco e cada trecho, só com cards completos, é analisado à parte.
+        parser = lxml_etree.HTMLParser(encoding='utf-8')
+        pending = b''
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                data = pending + chunk
+                if chunk:
+                    cut = None
+                    for cut in ARTICLE_END.finditer(data):
+                        pass
+                    if cut is None:
+                        pending = data
+                        continue
+                    segment, pending = data[:cut.end()], data[cut.end():]
+                else:
+                    segment, pending = data, b''
+                root = lxml_etree.fromstring(segment, parser) if segment.strip() else None
+                if root is not None:
+                    # str() solta a referência que o resultado do XPath mantém para a árvore
+                    yield from (str(href) for href in root.xpath(FAKE_LINK_HREFS) if href)
+                if not chunk:
+                    return
 
-    soup = BeautifulSoup(content, 'html.parser')
-    
-    # Este seletor é mais robusto, pois pega o link "fake" que existe em cada card.
-    # Ele tem o href correto para a página do botão.
-    link_elements = soup.select("article a.fake-link")
-    
-    base_url = "https://uiverse.io"
-    button_urls = []
+    parser = _FakeLinkParser()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+            yield from parser.hrefs
+            parser.hrefs.clear()
+            if not chunk:
+                return
+
+def expand_listing_paths(patterns: Iterable[str]) -> List[str]:
+    """Expande os padrões glob, mantendo a ordem e sem repetir arquivos.
+
+    Um padrão sem correspondência é mantido como está, para que o erro de
+    arquivo não encontrado apareça na leitura.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else []
+        for path in matches or [pattern]:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+def get_button_urls_from_html_file(file_path: Union[str, Iterable[str]], base_url=BASE_URL):
+    """
+    Lê um ou mais arquivos HTML locais (caminhos ou padrões glob), extrai os
+    links dos botões e os retorna.
+    """
+    patterns = [file_path] if isinstance(file_path, str) else list(file_path)
     
     # Usamos um set para garantir que as URLs sejam únicas
     unique_hrefs = set()
 
-    for elem in link_elements:
-        href = elem.get('href')
-        if href:
-            unique_hrefs.add(href)
+    for path in expand_listing_paths(patterns):
+        print(f"Lendo o arquivo HTML local: {path}")
+        try:
+            # O link "fake" existe em cada card e tem o href correto para a página do botão.
+            unique_hrefs.update(iter_listing_hrefs(path))
+        except FileNotFoundError:
+            print(f"Erro: O arquivo '{path}' não foi encontrado.")
 
-    for href in sorted(list(unique_hrefs)): # Ordena para um processamento consistente
-        full_url = base_url + href
-        button_urls.append(full_url)
+    # Ordena para um processamento consistente
+    button_urls = [base_url + href for href in sorted(unique_hrefs)]
             
     total_buttons = len(button_urls)
     if total_buttons == 0:
@@ -71,74 +206,643 @@ def get_button_urls_from_html_file(file_path):
         
     return button_urls
 
-def extract_button_data(driver, url, index, total):
+def fetch_button_code(driver, url, timeout=PAGE_TIMEOUT) -> Tuple[str, str]:
     """
-    Navega até a URL de um botão, extrai o código HTML e CSS e salva em arquivos.
+    Navega até a URL de um botão e retorna o código (HTML, CSS) dele.
+
+    Lança TimeoutException se os blocos de código não aparecerem a tempo.
     """
-    print(f"Processando botão {index}/{total}: {url}")
-    try:
-        driver.get(url)
-        wait = WebDriverWait(driver, 20)
+    driver.get(url)
+    wait = WebDriverWait(driver, timeout)
+
+    # O código está na página principal, não precisamos entrar no iframe.
+    # Esperamos os blocos de código ficarem visíveis e extraímos o texto.
+    html_code_element = wait.until(
+        EC.visibility_of_element_located((By.CSS_SELECTOR, "div[data-name='html'] code"))
+    )
+    css_code_element = wait.until(
+        EC.visibility_of_element_located((By.CSS_SELECTOR, "div[data-name='css'] code"))
+    )
+
+    return html_code_element.text, css_code_element.text
+
+def button_name(url: str) -> str:
+    """Nome do botão (e dos arquivos dele) a partir da URL."""
+    return url.rstrip('/').split('/')[-1]
+
+def save_button_files(url, button_html, button_css, directory=BOTOES_DIR):
+    """Salva o HTML e o CSS de um botão em `directory`."""
+    # Gera um nome de arquivo a partir da URL
+    file_name = button_name(url)
+    
+    with open(os.path.join(directory, f"{file_name}.html"), "w", encoding="utf-8") as f:
+        f.write(button_html)
+    with open(os.path.join(directory, f"{file_name}.css"), "w", encoding="utf-8") as f:
+        f.write(button_css)
+
+class FileSink:
+    """Destino que grava cada botão como <nome>.html e <nome>.css num diretório."""
+
+    def __init__(self, directory: str = BOTOES_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, url: str, button_html: str, button_css: str,
+             on_saved: Optional[Callable[[], None]] = None) -> None:
+        save_button_files(url, button_html, button_css, self.directory)
+        if on_saved is not None:
+            on_saved()
+
+    def close(self) -> None:
+        pass
+
+class DbSink:
+    """
+    Destino que grava os botões direto nas tabelas do banco do app.
+
+    Cada botão vira um preset da categoria `category`, com o mesmo nome que
+    o FileSink daria aos arquivos, e arquivos 'html' e 'css'. Os botões são
+    gravados em lotes de `batch_size`, ou a cada `flush_interval` segundos,
+    cada lote numa transação que também incrementa a geração do catálogo,
+    para o app mostrar os botões já gravados durante uma execução longa.
+    `on_saved` só é chamado depois do commit do lote, para o registro de
+    URLs nunca dar como salvo um botão que não chegou ao banco. Ao fechar,
+    se algo mudou, apaga os blobs que nenhum arquivo usa mais e, se o banco
+    tiver um snapshot (ver snapshot.py), o recompila numa nova geração;
+    até lá o app o ignora e lê o banco.
+    """
+
+    def __init__(self, database: str = import_presets.DATABASE_PATH, category: str = DB_CATEGORY,
+                 batch_size: int = import_presets.COMMIT_CHUNK_SIZE, flush_interval: float = DB_FLUSH_INTERVAL):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        import_presets.init_database(database).close()
+        # Conexão usada pelas threads dos navegadores e pelo laço assíncrono
+        self.conn = db.connect(database)
+        self.cursor = self.conn.cursor()
+        self.changes_before = self.conn.total_changes
+        self.category_id = import_presets.upsert_categories(self.cursor, [category])[category]
+        self.conn.commit()
+        self.preset_ids: Dict[str, int] = {}
+        self._pending: List[Tuple[str, str, str, Optional[Callable[[], None]]]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def save(self, url: str, button_html: str, button_css: str,
+             on_saved: Optional[Callable[[], None]] = None) -> None:
+        with self._lock:
+            self._pending.append((button_name(url), button_html, button_css, on_saved))
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def _flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+
+        missing = {(self.category_id, name) for name, _, _, _ in self._pending if name not in self.preset_ids}
+        if missing:
+            preset_ids = import_presets.upsert_presets(self.cursor, missing)
+            self.preset_ids.update(
+                (name, preset_id) for (category_id, name), preset_id in preset_ids.items()
+                if category_id == self.category_id
+            )
+
+        now = time.time()
+        rows = []
+        for name, button_html, button_css, _ in self._pending:
+            for file_type, content in (('html', button_html), ('css', button_css)):
+                data = content.encode('utf-8')
+                rows.append((self.preset_ids[name], file_type, content, now, len(data),
+                             hashlib.sha256(data).hexdigest()))
+        import_presets.upsert_files(self.cursor, rows)
+        import_presets.sync_search_index(self.cursor)
+        import_presets.bump_catalog_generation(self.cursor)
+        self.conn.commit()
+
+        callbacks = [on_saved for _, _, _, on_saved in self._pending if on_saved is not None]
+        self._pending.clear()
+        for on_saved in callbacks:
+            on_saved()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            if self.conn.total_changes > self.changes_before:
+                blobs.prune_blobs(self.cursor)
+                path = snapshot.snapshot_path(self.database)
+                if os.path.exists(path):
+                    # Com a geração nova o app troca o banco pelo snapshot atualizado
+                    generation = import_presets.bump_catalog_generation(self.cursor)
+                    snapshot.write_snapshot(self.conn, path)
+                    print(f"Snapshot da geração {generation} gravado em {path}")
+                self.conn.commit()
+            self.conn.close()
+
+def button_hash(button_html: str, button_css: str) -> str:
+    """SHA-256 do HTML e do CSS de um botão, para detectar mudanças."""
+    digest = hashlib.sha256()
+    for content in (button_html, button_css):
+        data = content.encode('utf-8')
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+class JobLedger:
+    """
+    Registro persistente, em SQLite, do estado de cada URL.
+
+    Guarda o status (pending, saved, empty ou failed), o total de tentativas,
+    o último erro, o hash do código salvo e os validadores HTTP (ETag e
+    Last-Modified) da última resposta. Os commits são agrupados a cada
+    `commit_interval` segundos: se o processo cair, só as URLs terminadas
+    depois do último commit são baixadas de novo.
+    """
+
+    def __init__(self, path: str = LEDGER_PATH, commit_interval: float = LEDGER_COMMIT_INTERVAL):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.conn = db.connect(path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                content_hash TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                checked_at REAL,
+                updated_at REAL
+            )
+        ''')
+        self.conn.commit()
+        self._last_commit = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, urls: Iterable[str]) -> None:
+        """Registra como pendentes as URLs ainda desconhecidas."""
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (url, updated_at) VALUES (?, ?)",
+                ((url, time.time()) for url in urls)
+            )
+            self.conn.commit()
+
+    def reset(self, urls: Iterable[str]) -> None:
+        """Volta as URLs para pendentes, descartando hash e validadores."""
+        with self._lock:
+            self.conn.executemany('''
+                UPDATE jobs
+                SET status = 'pending', attempts = 0, last_error = NULL, content_hash = NULL,
+                    etag = NULL, last_modified = NULL, checked_at = NULL, updated_at = ?
+                WHERE url = ?
+            ''', ((time.time(), url) for url in urls))
+            self.conn.commit()
+
+    def select(self, urls: List[str], refresh_after: Optional[float] = None) -> List[str]:
+        """
+        Retorna, na ordem de `urls`, as que precisam ser processadas: as
+        pendentes e as que falharam e, se `refresh_after` (segundos) for
+        dado, as concluídas verificadas há mais tempo que isso.
+        """
+        stale_before = time.time() - refresh_after if refresh_after is not None else None
+        with self._lock:
+            rows = self.conn.execute("SELECT url, status, checked_at FROM jobs").fetchall()
+        todo = set()
+        for row in rows:
+            if row['status'] in ('pending', 'failed'):
+                todo.add(row['url'])
+            elif stale_before is not None and (row['checked_at'] or 0) < stale_before:
+                todo.add(row['url'])
+        return [url for url in urls if url in todo]
+
+    def get(self, url: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute("SELECT * FROM jobs WHERE url = ?", (url,)).fetchone()
+
+    def record(self, url: str, status: str, attempts: int, error: Optional[Exception] = None,
+               content_hash: Optional[str] = None, etag: Optional[str] = None,
+               last_modified: Optional[str] = None) -> None:
+        """
+        Registra o resultado de uma URL. Hash e validadores só são
+        substituídos quando informados; um erro não apaga os da última
+        versão salva.
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute('''
+                UPDATE jobs
+                SET status = ?, attempts = attempts + ?, last_error = ?,
+                    content_hash = COALESCE(?, content_hash),
+                    etag = COALESCE(?, etag),
+                    last_modified = COALESCE(?, last_modified),
+                    checked_at = CASE WHEN ? = 'failed' THEN checked_at ELSE ? END,
+                    updated_at = ?
+                WHERE url = ?
+            ''', (status, attempts, str(error) if error is not None else None,
+                  content_hash, etag, last_modified, status, now, now, url))
+            if time.monotonic() - self._last_commit >= self.commit_interval:
+                self.conn.commit()
+                self._last_commit = time.monotonic()
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+def store_button(url: str, button_html: str, button_css: str, stats: "ScrapeStats", sink,
+                 ledger: Optional[JobLedger], attempts: int, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None) -> None:
+    """
+    Entrega o código extraído de uma página ao destino e registra o resultado.
+
+    Com o registro ativo, um código igual ao da última versão salva não é
+    gravado de novo e conta como sem alterações.
+    """
+    if not button_html:
+        print(f"  -> Código HTML não encontrado para a URL: {url}. Pulando.")
+        stats.record('empty')
+        if ledger is not None:
+            ledger.record(url, 'empty', attempts, etag=etag, last_modified=last_modified)
+        return
+
+    content_hash = button_hash(button_html, button_css)
+    previous = ledger.get(url) if ledger is not None else None
+    on_saved = None
+    if ledger is not None:
+        on_saved = functools.partial(ledger.record, url, 'saved', attempts, content_hash=content_hash,
+                                     etag=etag, last_modified=last_modified)
+    if previous is not None and previous['content_hash'] == content_hash:
+        stats.record('unchanged')
+        on_saved()
+    else:
+        sink.save(url, button_html, button_css, on_saved)
+        stats.record('saved')
+
+def parse_button_code(page_html) -> Optional[Tuple[str, str]]:
+    """
+    Extrai o código (HTML, CSS) do HTML estático de uma página de botão.
+
+    Retorna None quando a página não traz o bloco data-name='html', por
+    exemplo porque ele só é montado via JavaScript. Usa o lxml direto quando
+    instalado (bem mais rápido); senão, o BeautifulSoup com html.parser.
+    """
+    if not page_html:
+        return None
 
-        # O código está na página principal, não precisamos entrar no iframe.
-        # Esperamos os blocos de código ficarem visíveis e extraímos o texto.
-        html_code_element = wait.until(
-            EC.visibility_of_element_located((By.CSS_SELECTOR, "div[data-name='html'] code"))
+    if lxml_html is not None:
+        try:
+            root = lxml_html.fromstring(page_html)
+        except (lxml_etree.ParserError, ValueError):
+            # Corpo só com espaços ou comentários ("Document is empty"): fica para o navegador
+            return None
+        html_code_elements = root.xpath("//div[@data-name='html']//code")
+        if not html_code_elements:
+            return None
+        css_code_elements = root.xpath("//div[@data-name='css']//code")
+        return (
+            html_code_elements[0].text_content(),
+            css_code_elements[0].text_content() if css_code_elements else ''
         )
-        css_code_element = wait.until(
-            EC.visibility_of_element_located((By.CSS_SELECTOR, "div[data-name='css'] code"))
+
+    soup = BeautifulSoup(page_html, 'html.parser', parse_only=CODE_BLOCKS)
+    html_code_element = soup.select_one("div[data-name='html'] code")
+    if html_code_element is None:
+        return None
+    css_code_element = soup.select_one("div[data-name='css'] code")
+    return html_code_element.get_text(), css_code_element.get_text() if css_code_element else ''
+
+class ScrapeStats:
+    """Contadores compartilhados pelos workers, com relatório periódico."""
+
+    def __init__(self, total: int, interval: float = PROGRESS_INTERVAL):
+        self.total = total
+        self.interval = interval
+        self.saved = 0
+        self.unchanged = 0
+        self.empty = 0
+        self.failed = 0
+        self.retries = 0
+        self.deferred = 0
+        self.failures: List[Tuple[str, str]] = []
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> int:
+        return self.saved + self.unchanged + self.empty + self.failed
+
+    def record(self, outcome: str, url: Optional[str] = None, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            if error is not None:
+                self.failures.append((url, str(error)))
+            now = time.perf_counter()
+            if outcome not in ('retries', 'deferred') and now - self._last_report >= self.interval:
+                self._last_report = now
+                print(f"  {self.line()}")
+
+    def line(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"{self.done}/{self.total} páginas em {elapsed:.1f}s ({self.done / elapsed:.1f} páginas/s): "
+            f"{self.saved} salvas, {self.unchanged} sem alterações, {self.empty} sem código, {self.failed} falhas, {self.retries} novas tentativas, "
+            f"{self.deferred} enviadas ao navegador"
         )
 
-        button_html = html_code_element.text
-        button_css = css_code_element.text
+def scrape_worker(work: "queue.Queue[str]", stats: ScrapeStats, max_attempts: int, backoff: float,
+                  sink, ledger: Optional[JobLedger] = None) -> None:
+    """Abre um navegador próprio e processa URLs da fila até ela esvaziar."""
+    driver = setup_driver()
+    if not driver:
+        return
+
+    try:
+        while True:
+            try:
+                url = work.get_nowait()
+            except queue.Empty:
+                return
+
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    button_html, button_css = fetch_button_code(driver, url)
+                except Exception as e:
+                    if attempt == max_attempts:
+                        reason = "Timeout" if isinstance(e, TimeoutException) else "Erro"
+                        print(f"  -> {reason} ao processar '{url}' após {attempt} tentativas: {e}")
+                        stats.record('failed', url, e)
+                        if ledger is not None:
+                            ledger.record(url, 'failed', attempt, e)
+                    else:
+                        stats.record('retries')
+                        time.sleep(backoff * 2 ** (attempt - 1))
+                    continue
+
+                store_button(url, button_html, button_css, stats, sink, ledger, attempt)
+                break
+    finally:
+        driver.quit()
+
+async def scrape_static_worker(session, work: "asyncio.Queue[str]", stats: ScrapeStats, fallback: List[str],
+                               max_attempts: int, backoff: float, sink,
+                               ledger: Optional[JobLedger] = None) -> None:
+    """
+    Baixa e analisa páginas da fila sem navegador, até ela esvaziar.
 
-        if not button_html:
-            print(f"  -> Código HTML não encontrado para a URL: {url}. Pulando.")
+    Um erro inesperado numa página conta como falha dela, sem parar o
+    worker nem os outros.
+    """
+    while True:
+        try:
+            url = work.get_nowait()
+        except asyncio.QueueEmpty:
             return
 
-        # Gera um nome de arquivo a partir da URL
-        file_name = url.split('/')[-1]
-        
-        # Salva os arquivos
-        with open(os.path.join(BOTOES_DIR, f"{file_name}.html"), "w", encoding="utf-8") as f:
-            f.write(button_html)
-        with open(os.path.join(BOTOES_DIR, f"{file_name}.css"), "w", encoding="utf-8") as f:
-            f.write(button_css)
-
-    except TimeoutException:
-        print(f"  -> Erro de Timeout ao processar a URL: {url}. A página pode ter mudado ou demorou para carregar. Pulando.")
-    except Exception as e:
-        print(f"  -> Ocorreu um erro inesperado em '{url}': {e}")
+        try:
+            await scrape_static_url(session, url, stats, fallback, max_attempts, backoff, sink, ledger)
+        except Exception as e:
+            print(f"  -> Erro ao processar '{url}': {e!r}")
+            stats.record('failed', url, e)
+            if ledger is not None:
+                # A página chegou a ser baixada ao menos uma vez
+                ledger.record(url, 'failed', 1, e)
+
+async def scrape_static_url(session, url: str, stats: ScrapeStats, fallback: List[str], max_attempts: int,
+                            backoff: float, sink, ledger: Optional[JobLedger] = None) -> None:
+    """
+    Baixa e analisa uma página sem navegador; se o código não estiver no
+    HTML estático, a URL vai para `fallback`.
+
+    URLs já salvas antes são pedidas com os validadores da última resposta
+    (If-None-Match/If-Modified-Since); um 304 conta como sem alterações.
+    """
+    import aiohttp
+
+    headers = {}
+    previous = ledger.get(url) if ledger is not None else None
+    if previous is not None and previous['content_hash'] is not None:
+        if previous['etag']:
+            headers['If-None-Match'] = previous['etag']
+        if previous['last_modified']:
+            headers['If-Modified-Since'] = previous['last_modified']
+
+    body = None
+    error: Exception = RuntimeError("nenhuma tentativa feita")
+    for attempt in range(1, max_attempts + 1):
+        try:
+            async with session.get(url, headers=headers) as response:
+                status = response.status
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+        else:
+            # Só erros do servidor e 429 melhoram com uma nova tentativa
+            if status < 500 and status != 429:
+                break
+            error = RuntimeError(f"HTTP {status}")
+        body = None
+        if attempt < max_attempts:
+            stats.record('retries')
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+
+    if body is None:
+        print(f"  -> Erro ao baixar '{url}' após {max_attempts} tentativas: {error!r}")
+        stats.record('failed', url, error)
+        if ledger is not None:
+            ledger.record(url, 'failed', max_attempts, error)
+        return
+    if status == 304:
+        stats.record('unchanged')
+        if ledger is not None:
+            ledger.record(url, 'saved', attempt, etag=etag, last_modified=last_modified)
+        return
+    if status >= 400:
+        print(f"  -> Erro HTTP {status} em '{url}'. Pulando.")
+        error = RuntimeError(f"HTTP {status}")
+        stats.record('failed', url, error)
+        if ledger is not None:
+            ledger.record(url, 'failed', attempt, error)
+        return
+
+    code = parse_button_code(body)
+    if code is None:
+        fallback.append(url)
+        stats.record('deferred')
+    else:
+        store_button(url, *code, stats, sink, ledger, attempt, etag, last_modified)
+
+async def scrape_static_async(urls: List[str], stats: ScrapeStats, concurrency: int, max_attempts: int,
+                              backoff: float, sink, ledger: Optional[JobLedger] = None) -> List[str]:
+    import aiohttp
+
+    work: "asyncio.Queue[str]" = asyncio.Queue()
+    for url in urls:
+        work.put_nowait(url)
+
+    fallback: List[str] = []
+    # Um único pool de conexões keep-alive, limitado a `concurrency` conexões
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=PAGE_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await asyncio.gather(*(
+            scrape_static_worker(session, work, stats, fallback, max_attempts, backoff, sink, ledger)
+            for _ in range(min(concurrency, len(urls)))
+        ))
+    return fallback
+
+def scrape_static(urls: List[str], stats: ScrapeStats, concurrency: int = HTTP_CONCURRENCY,
+                  max_attempts: int = MAX_ATTEMPTS, backoff: float = RETRY_BACKOFF,
+                  ledger: Optional[JobLedger] = None, sink=None) -> List[str]:
+    """
+    Modo rápido: baixa as páginas com um cliente HTTP assíncrono (conexões
+    keep-alive reaproveitadas) e extrai o código do HTML estático.
+
+    Retorna as URLs cujas páginas não trazem o código no HTML estático e
+    por isso precisam do navegador. Sem o pacote aiohttp, todas precisam.
+    Sem `sink`, os botões vão para BOTOES_DIR.
+    """
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        print("Modo sem navegador indisponível: instale o pacote aiohttp (pip install aiohttp).")
+        stats.deferred += len(urls)
+        return list(urls)
+    if sink is None:
+        sink = FileSink()
+    return asyncio.run(scrape_static_async(urls, stats, concurrency, max_attempts, backoff, sink, ledger))
+
+def scrape_concurrently(urls: List[str], workers: int = WORKERS, max_attempts: int = MAX_ATTEMPTS,
+                        backoff: float = RETRY_BACKOFF, stats: Optional[ScrapeStats] = None,
+                        ledger: Optional[JobLedger] = None, sink=None) -> ScrapeStats:
+    """
+    Processa as URLs com `workers` navegadores em paralelo, lendo de uma fila comum.
+
+    Cada URL é tentada até `max_attempts` vezes, com espera exponencial entre
+    as tentativas. URLs que sobrarem na fila porque nenhum navegador pôde ser
+    aberto contam como falhas. Sem `sink`, os botões vão para BOTOES_DIR.
+    """
+    work: "queue.Queue[str]" = queue.Queue()
+    for url in urls:
+        work.put(url)
+
+    if stats is None:
+        stats = ScrapeStats(len(urls))
+    if sink is None:
+        sink = FileSink()
+    threads = [
+        threading.Thread(target=scrape_worker, args=(work, stats, max_attempts, backoff, sink, ledger), daemon=True)
+        for _ in range(min(workers, len(urls)))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    while not work.empty():
+        url = work.get_nowait()
+        error = RuntimeError("nenhum navegador disponível")
+        stats.record('failed', url, error)
+        if ledger is not None:
+            ledger.record(url, 'failed', 0, error)
+    return stats
 
 def main():
     """Função principal do scraper."""
-    if not os.path.exists(BOTOES_DIR):
-        os.makedirs(BOTOES_DIR)
+    parser = argparse.ArgumentParser(description="Extrai o HTML e o CSS dos botões listados num arquivo HTML.")
+    parser.add_argument('--listing', nargs='+', default=['botoes.html'],
+                        help="arquivos HTML (ou padrões glob, ex.: 'listagens/*.html') com a listagem de botões")
+    parser.add_argument('--base-url', default=BASE_URL, help="site de onde os botões são baixados")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="navegadores abertos em paralelo")
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS, help="tentativas por URL")
+    parser.add_argument('--backoff', type=float, default=RETRY_BACKOFF,
+                        help="espera inicial, em segundos, entre tentativas")
+    parser.add_argument('--concurrency', type=int, default=HTTP_CONCURRENCY,
+                        help="requisições HTTP simultâneas no modo sem navegador")
+    parser.add_argument('--browser-only', action='store_true',
+                        help="usa só o Selenium, sem tentar antes o HTML estático")
+    parser.add_argument('--sink', choices=('arquivos', 'banco'), default='arquivos',
+                        help="grava os botões em arquivos na pasta botoes ou direto no banco do app")
+    parser.add_argument('--database', default=import_presets.DATABASE_PATH,
+                        help="banco do app usado com --sink banco")
+    parser.add_argument('--category', default=DB_CATEGORY, help="categoria dos botões gravados com --sink banco")
+    parser.add_argument('--ledger',
+                        help="banco SQLite com o estado de cada URL, para retomar execuções "
+                             f"(padrão: {LEDGER_PATH}, ou <banco>_{LEDGER_PATH} com --sink banco)")
+    parser.add_argument('--refresh-after', type=float, metavar='HORAS',
+                        help="baixa de novo, com requisições condicionais, as URLs concluídas há mais de HORAS")
+    parser.add_argument('--restart', action='store_true',
+                        help="ignora o registro e processa todas as URLs de novo")
+    args = parser.parse_args()
 
     # Etapa 1: Extrair URLs do arquivo HTML local
-    button_urls = get_button_urls_from_html_file('botoes.html')
+    button_urls = get_button_urls_from_html_file(args.listing, args.base_url)
 
     if not button_urls:
         print("Nenhuma URL foi extraída. Encerrando o script.")
         return
 
-    # Etapa 2: Configurar o driver do Selenium (só é necessário agora)
-    driver = setup_driver()
-    if not driver:
-        return
-
+    # Etapa 2: Consultar o registro e separar o que ainda falta processar
+    # Com --sink banco o registro acompanha o banco (presets.db ->
+    # presets_scraper_jobs.db), para não confundir o que foi salvo em
+    # arquivos com o que foi gravado no banco
+    if args.ledger:
+        ledger_path = args.ledger
+    elif args.sink == 'banco':
+        ledger_path = f"{os.path.splitext(args.database)[0]}_{LEDGER_PATH}"
+    else:
+        ledger_path = LEDGER_PATH
+    ledger = JobLedger(ledger_path)
     try:
-        # Etapa 3: Iterar sobre as URLs e extrair os dados de cada botão
-        total_buttons = len(button_urls)
-        for i, url in enumerate(button_urls, 1):
-            extract_button_data(driver, url, i, total_buttons)
-            
-        print("\nPronto! A extração foi concluída. Verifique a pasta 'botoes' ")
-    
+        ledger.add(button_urls)
+        if args.restart:
+            ledger.reset(button_urls)
+        refresh_after = args.refresh_after * 3600 if args.refresh_after is not None else None
+        pending_urls = ledger.select(button_urls, refresh_after)
+        print(f"{len(button_urls) - len(pending_urls)} URLs já concluídas; {len(pending_urls)} a processar.")
+        if not pending_urls:
+            return
+
+        if args.sink == 'banco':
+            sink = DbSink(args.database, args.category)
+        else:
+            sink = FileSink()
+        try:
+            # Etapa 3: Extrair o código do HTML estático, sem navegador
+            stats = ScrapeStats(len(pending_urls))
+            if args.browser_only:
+                browser_urls = pending_urls
+            else:
+                browser_urls = scrape_static(pending_urls, stats, args.concurrency, args.max_attempts,
+                                             args.backoff, ledger, sink)
+
+            # Etapa 4: Só as páginas que dependem de JavaScript vão para os navegadores
+            if browser_urls:
+                print(f"{len(browser_urls)} páginas precisam do navegador.")
+                scrape_concurrently(browser_urls, args.workers, args.max_attempts, args.backoff, stats,
+                                    ledger, sink)
+        finally:
+            # Grava o último lote antes de o registro ser fechado
+            sink.close()
     finally:
-        # Fecha o navegador
-        print("Fechando o navegador...")
-        driver.quit()
+        ledger.close()
+    print(f"\nPronto! {stats.line()}")
+    if stats.failed:
+        print(f"{stats.failed} URLs falharam e serão tentadas de novo na próxima execução.")
+    if args.sink == 'banco':
+        print(f"Botões gravados na categoria '{args.category}' de {args.database}")
+    else:
+        print(f"Verifique a pasta '{BOTOES_DIR}'")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,83 @@
+"""Standalone preview documents for presets.
+
+A preview combines a preset's CSS, HTML and JS into one HTML page. The
+`card` variant is the scaled-down, script-free thumbnail shown on the
+index cards; `full` is the interactive version shown in the modal.
+"""
+import hashlib
+from typing import Dict
+
+PREVIEW_VARIANTS = ('card', 'full')
+
+def preview_hash(file_hashes: Dict[str, str], variant: str) -> str:
+    """Hash of a preview, derived from the blob hashes of its files.
+
+    It changes whenever any of the files change, without reading them.
+    """
+    digest = hashlib.sha256(variant.encode())
+    for file_type in ('html', 'css', 'js'):
+        digest.update(b'\0%s\0%s' % (file_type.encode(), file_hashes.get(file_type, '').encode()))
+    return digest.hexdigest()
+
+def build_preview_document(files: Dict[str, str], variant: str) -> str:
+    html = files.get('html', '')
+    css = files.get('css', '')
+    js = files.get('js', '')
+    
+    if variant == 'card':
+        return f"""<!DOCTYPE html>
+<html>
+<head>
+    <base target="_parent">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <style>
+        {css}
+        body {{
+            margin: 0;
+            padding: 0;
+            width: 100%;
+            height: 100%;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            overflow: hidden;
+        }}
+        .preview-content {{
+            transform: scale(0.7);
+            transform-origin: center;
+            width: 143%;
+            max-width: 100%;
+            text-align: center;
+        }}
+        * {{
+            max-width: 100% !important;
+        }}
+    </style>
+</head>
+<body>
+    {html}
+</body>
+</html>
+"""
+    
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <base target="_parent">
+    <style>
+        {css}
+        body {{ margin: 0; padding: 10px; }}
+    </style>
+</head>
+<body>
+    {html}
+    <script>
+        try {{
+            {js}
+        }} catch (e) {{
+            console.error('Error in preview script:', e);
+        }}
+    </script>
+</body>
+</html>
+"""
@@ -0,0 +1,100 @@
+"""Full-text search over the presets_fts/titles_fts indexes kept by import_presets.
+
+User input is never passed to FTS5 as query syntax: it is split into
+words and each one is quoted. The index stems words (porter), so `anim`
+also finds `animation` and `buttons` finds `button`.
+
+Up to RANK_ALL_LIMIT matches are ranked by bm25 over every column, with
+name and description weighted up. Beyond that, words common enough to
+appear in most files say little about relevance and ranking every match
+is what makes a query slow, so presets whose name or description match
+come first, ranked, and the rest follow in catalog order.
+"""
+import re
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from markupsafe import escape
+
+# bm25 weight of each indexed column: name, description, html, css, js
+COLUMN_WEIGHTS: Sequence[float] = (10.0, 5.0, 1.0, 1.0, 1.0)
+# Most matches that are all ranked by relevance
+RANK_ALL_LIMIT = 1000
+# Tokens of context around the matches in a snippet
+SNIPPET_TOKENS = 16
+# Control characters can't occur in the escaped text, so they mark the matches
+_MATCH_START, _MATCH_END = '\x02', '\x03'
+_WORD = re.compile(r'\w+')
+
+def build_match_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression, or None if it has no words."""
+    words = _WORD.findall(text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words)
+
+def format_snippet(snippet: str) -> str:
+    """HTML-escape a snippet and wrap its matches in <mark>."""
+    return str(escape(snippet)).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
+
+def _weights(weights: Sequence[float]) -> str:
+    return ', '.join(str(weight) for weight in weights)
+
+def _placeholders(values: Sequence) -> str:
+    return ','.join('?' * len(values))
+
+def search_presets(conn: sqlite3.Connection, match: str, page: int, per_page: int) -> Tuple[int, List[Dict]]:
+    """Get the total number of matching presets and one page of them, best first."""
+    total = conn.execute('SELECT count(*) FROM presets_fts WHERE presets_fts MATCH ?', (match,)).fetchone()[0]
+    offset = (page - 1) * per_page
+    if total <= offset:
+        return total, []
+
+    if total <= RANK_ALL_LIMIT:
+        page_ids = [row[0] for row in conn.execute(f'''
+            SELECT rowid FROM presets_fts WHERE presets_fts MATCH ?
+            ORDER BY bm25(presets_fts, {_weights(COLUMN_WEIGHTS)})
+            LIMIT ? OFFSET ?
+        ''', (match, per_page, offset))]
+    else:
+        title_ids = [row[0] for row in conn.execute(f'''
+            SELECT rowid FROM titles_fts WHERE titles_fts MATCH ?
+            ORDER BY bm25(titles_fts, {_weights(COLUMN_WEIGHTS[:2])})
+        ''', (match,))]
+        page_ids = title_ids[offset:offset + per_page]
+        if len(page_ids) < per_page:
+            in_title = set(title_ids)
+            skip = max(0, offset - len(title_ids))
+            cursor = conn.execute('SELECT rowid FROM presets_fts WHERE presets_fts MATCH ? ORDER BY rowid', (match,))
+            for (preset_id,) in cursor:
+                if preset_id in in_title:
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                page_ids.append(preset_id)
+                if len(page_ids) == per_page:
+                    break
+            cursor.close()
+    if not page_ids:
+        return total, []
+
+    snippets = dict(conn.execute(f'''
+        SELECT rowid, snippet(presets_fts, -1, ?, ?, '…', ?) FROM presets_fts
+        WHERE presets_fts MATCH ? AND rowid IN ({_placeholders(page_ids)})
+    ''', (_MATCH_START, _MATCH_END, SNIPPET_TOKENS, match, *page_ids)))
+    rows = {row['preset_id']: row for row in conn.execute(f'''
+        SELECT p.id AS preset_id, p.name AS preset_name, p.description AS preset_description,
+               c.name AS category_name
+        FROM presets p
+        LEFT JOIN categories c ON c.id = p.category_id
+        WHERE p.id IN ({_placeholders(page_ids)})
+    ''', page_ids)}
+
+    return total, [{
+        'id': preset_id,
+        'name': rows[preset_id]['preset_name'],
+        'category': rows[preset_id]['category_name'],
+        'description': rows[preset_id]['preset_description'] or 'No description available',
+        'snippet': format_snippet(snippets.get(preset_id, '')),
+    } for preset_id in page_ids if preset_id in rows]
@@ -0,0 +1,127 @@
+"""Production entry point: the app behind gunicorn, with several workers.
+
+``python app.py`` runs Werkzeug's single-process debug server; this runs
+the same app with `--workers` processes of `--threads` threads each::
+
+    python serve.py --bind 0.0.0.0:8000 --workers 4 --threads 8
+
+The app is imported once in the master and forked, so workers share its
+compiled templates and asset manifest. Each worker then keeps its own
+SQLite connections (one per thread, kept open between requests), warms
+the catalog, the first index pages and their previews before it takes
+requests, and polls the catalog generation in the background. When an
+import bumps it, the worker reloads and re-warms the catalog while it
+keeps serving, so no worker restarts and no request waits on the
+reload. A HUP to the master still restarts the workers gracefully, e.g.
+to pick up new code. With a catalog snapshot (see snapshot.py), the
+master maps it before forking, so workers start with the catalog loaded
+and share its pages.
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+import app
+import snapshot
+
+# Index pages rendered (and previews built) when a worker starts or the catalog changes
+WARM_PAGES = 1
+# Seconds between checks of the catalog generation
+CATALOG_POLL_INTERVAL = 2.0
+
+log = logging.getLogger('gunicorn.error')
+
+def read_generation() -> int:
+    with app.app.app_context():
+        return app.get_db_connection().execute('PRAGMA user_version').fetchone()[0]
+
+def open_connections(count: int) -> None:
+    """Open `count` pooled connections up front, one per worker thread."""
+    pool = app.get_db_pool()
+    connections = [pool.acquire() for _ in range(count)]
+    for conn in connections:
+        pool.release(conn)
+
+def watch_catalog(generation: int, pages: int, interval: float) -> None:
+    """Re-warm the caches whenever the catalog generation moves past `generation`."""
+    while True:
+        time.sleep(interval)
+        try:
+            if read_generation() != generation:
+                generation = app.warm_caches(pages)
+                log.info("Worker %s: catalog generation %s loaded", os.getpid(), generation)
+        except sqlite3.Error as e:
+            log.warning("Worker %s: catalog check failed: %s", os.getpid(), e)
+
+def start_worker(threads: int, pages: int, interval: float) -> None:
+    """Prepare a freshly forked worker before it accepts requests."""
+    open_connections(threads)
+    generation = app.warm_caches(pages)
+    log.info("Worker %s: warmed catalog generation %s", os.getpid(), generation)
+    threading.Thread(
+        target=watch_catalog, args=(generation, pages, interval), name='catalog-watcher', daemon=True
+    ).start()
+
+def run(options: Dict, threads: int, pages: int = WARM_PAGES, interval: float = CATALOG_POLL_INTERVAL) -> None:
+    """Serve the app with gunicorn; `options` are gunicorn settings (bind, workers, ...)."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError("The production server requires the gunicorn package (pip install gunicorn)") from None
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+            self.cfg.set('threads', threads)
+            # Import once in the master; connections are only opened after the fork
+            self.cfg.set('preload_app', True)
+            self.cfg.set('post_worker_init', lambda worker: start_worker(threads, pages, interval))
+
+        def load(self):
+            return app.app
+
+    Server().run()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='address to listen on (host:port)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='request threads per worker')
+    parser.add_argument('--database', default=app.DATABASE_PATH)
+    parser.add_argument('--warm-pages', type=int, default=WARM_PAGES,
+                        help='index pages rendered on startup and after each catalog change')
+    parser.add_argument('--poll-interval', type=float, default=CATALOG_POLL_INTERVAL,
+                        help='seconds between catalog generation checks')
+    parser.add_argument('--timeout', type=int, default=30, help='seconds before a stuck worker is restarted')
+    parser.add_argument('--access-log', action='store_true', help='log every request to stderr')
+    parser.add_argument('--slow-request-ms', type=float,
+                        help='log requests slower than this, with the SQL they ran')
+    args = parser.parse_args()
+
+    app.DATABASE_PATH = args.database
+    # Keep an idle connection for every thread instead of reopening under load
+    app.DB_POOL_SIZE = max(app.DB_POOL_SIZE, args.threads)
+    if args.slow_request_ms is not None:
+        app.SLOW_REQUEST_THRESHOLD = args.slow_request_ms / 1000
+    # Map the snapshot once here, so every forked worker starts with the catalog loaded
+    generation = app.preload_catalog()
+    if generation is not None:
+        print(f"Catalog generation {generation} loaded from {snapshot.snapshot_path(app.DATABASE_PATH)}")
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'timeout': args.timeout,
+        'graceful_timeout': args.timeout,
+    }
+    if args.access_log:
+        options['accesslog'] = '-'
+    run(options, args.threads, args.warm_pages, args.poll_interval)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,438 @@
+"""Read-only catalog snapshots, memory-mapped by the app.
+
+A snapshot packs one catalog generation into a single immutable file next
+to the database (``presets.db.snapshot``)::
+
+    header      format, generation, token, and where the sections below start
+    bodies      every distinct file body, uncompressed, back to back in
+                the order the presets are listed, then the card thumbnails
+    metadata    the last-modified time and thumbnail formats, as JSON
+    rows        the category/preset rows, one JSON array each
+    tables      fixed-width records, binary-searched in place: where each
+                row starts, preset id -> blob numbers of its files, and
+                blob and thumbnail digests -> offset and length in the bodies
+
+Compile one with ``python snapshot.py --database presets.db``.
+
+The app maps the file read-only, so loading a catalog only reads the
+header: rows, file hashes, bodies and thumbnails are looked up in the
+mapping when a request needs them, bodies come out as memoryview slices
+with no query or decompression, and the pages are shared through the OS
+page cache by every worker process instead of being copied into each
+one's catalog and blob cache. The tables use the byte order of the machine that compiled
+them, so a snapshot is not portable between architectures.
+
+import_presets (with ``--snapshot``, or whenever a snapshot already
+exists), thumbnails.py and meu_scraper's database sink compile the new
+snapshot before they commit the generation bump, and swap it in with an
+atomic rename. Each compile also stores a random token in the database,
+in the transaction the writer then commits, and the app only uses a
+snapshot whose generation and token both match the database's, reading
+the database otherwise. So it never mixes a snapshot with a database it
+was not compiled from: not while the writer has yet to commit, nor when
+that commit failed and a later writer, such as a scrape that does not
+recompile, reaches the same generation. Requests still holding an older
+snapshot keep its mapping, which stays valid after the rename until
+they let go of it.
+"""
+import argparse
+import bisect
+import json
+import mmap
+import os
+import secrets
+import sqlite3
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence, Set
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import blobs
+
+MAGIC = b'PRESNAP\n'
+FORMAT_VERSION = 2
+# Magic, format version, byte order of the tables, generation, token, metadata offset and
+# length, rows offset, tables offset, and the number of rows, presets, blobs and thumbnails
+HEADER = struct.Struct('<8sIcxxxQ16sQQQQQQQQ')
+SNAPSHOT_SUFFIX = '.snapshot'
+# Bytes of the random token that ties a snapshot to the database commit it was compiled for
+TOKEN_SIZE = 16
+# File types of a preset, in the order of its blob numbers in the preset table
+FILE_TYPES = ('html', 'css', 'js')
+# Bytes of a SHA-256 digest, as blob and thumbnail keys are stored
+DIGEST_SIZE = 32
+# Keys of the category/preset rows, as the app's catalog query names its columns
+ROW_KEYS = ('category_id', 'category_name', 'preset_id', 'preset_name', 'preset_description')
+# Rows decoded at a time when iterating over all of them
+ROWS_PER_DECODE = 1000
+_BYTE_ORDER = b'l' if sys.byteorder == 'little' else b'b'
+
+CATALOG_ROWS_QUERY = '''
+    SELECT c.id, c.name, p.id, p.name, p.description
+    FROM categories c
+    LEFT JOIN presets p ON c.id = p.category_id
+    ORDER BY c.name, p.name
+'''
+# Token of the last snapshot compiled from the database, in a single row
+TOKEN_TABLE = 'CREATE TABLE IF NOT EXISTS catalog_snapshot (token TEXT NOT NULL)'
+LAST_MODIFIED_QUERY = '''
+    SELECT max(modified) FROM (
+        SELECT max(created_at) AS modified FROM categories
+        UNION ALL SELECT max(created_at) FROM presets
+        UNION ALL SELECT max(updated_at) FROM files
+    )
+'''
+
+class SnapshotError(ValueError):
+    """A snapshot file that is truncated, corrupt or of another format version."""
+
+def snapshot_path(database: str) -> str:
+    return database + SNAPSHOT_SUFFIX
+
+def read_token(db: sqlite3.Connection) -> Optional[str]:
+    """The token of the last snapshot compiled from `db`, or None if none ever was."""
+    try:
+        row = db.execute('SELECT token FROM catalog_snapshot').fetchone()
+    except sqlite3.OperationalError:
+        # No snapshot has been compiled from this database yet
+        return None
+    return row[0] if row else None
+
+def _table_sizes(rows: int, presets: int, blobs_count: int, thumbnails: int) -> List[int]:
+    """Byte sizes of the tables, in file order, each padded to 8 bytes."""
+    sizes = [
+        (rows + 1) * 8,                    # offset of each row in the rows section, and its end (Q)
+        presets * 8,                       # preset ids, ascending (Q)
+        presets * len(FILE_TYPES) * 4,     # blob number of each file type, or -1 (i)
+        blobs_count * 8,                   # first 8 bytes of each blob digest, as big-endian numbers (Q)
+        blobs_count * DIGEST_SIZE,         # blob digests, ascending
+        blobs_count * 16,                  # offset and length of each blob (Q)
+        thumbnails * 8,                    # thumbnail digest prefixes (Q)
+        thumbnails * DIGEST_SIZE,          # thumbnail digests, ascending
+        thumbnails * 16,                   # offset and length of each thumbnail (Q)
+        thumbnails,                        # index of each thumbnail's format in the metadata (B)
+    ]
+    return [-(-size // 8) * 8 for size in sizes]
+
+def _read_header(data: bytes, size: int) -> Tuple[int, str, int, int, int, int, Tuple[int, int, int, int]]:
+    if size < HEADER.size:
+        raise SnapshotError("truncated snapshot header")
+    (magic, version, byte_order, generation, token, meta_offset, meta_length, rows_offset, tables_offset,
+     rows, presets, blobs_count, thumbnails) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("not a catalog snapshot")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"snapshot format {version} is not supported (expected {FORMAT_VERSION})")
+    if byte_order != _BYTE_ORDER:
+        raise SnapshotError("snapshot compiled on a machine of the other byte order")
+    counts = (rows, presets, blobs_count, thumbnails)
+    if meta_offset + meta_length > size or tables_offset + sum(_table_sizes(*counts)) > size:
+        raise SnapshotError("truncated snapshot")
+    return generation, token.hex(), meta_offset, meta_length, rows_offset, tables_offset, counts
+
+def read_identity(path: str) -> Tuple[int, str]:
+    """The generation and token a snapshot was compiled with, reading only its header."""
+    with open(path, 'rb') as f:
+        return _read_header(f.read(HEADER.size), os.fstat(f.fileno()).st_size)[:2]
+
+def _prefix(digest: bytes) -> int:
+    return int.from_bytes(digest[:8], 'big')
+
+class _DigestTable:
+    """Ascending digests, each with the (offset, length) of its data in the snapshot.
+
+    Lookups bisect the digests' numeric prefixes, which sort like the
+    digests themselves, so the search runs in C and only the match is
+    compared in full.
+    """
+
+    def __init__(self, prefixes: memoryview, digests: memoryview, spans: memoryview):
+        self._count = len(digests) // DIGEST_SIZE
+        self._prefixes = prefixes.cast('Q')[:self._count]
+        self._digests = digests
+        self._spans = spans.cast('Q')
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _key(self, index: int) -> bytes:
+        return bytes(self._digests[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE])
+
+    def find(self, digest: str) -> int:
+        """Index of a hex digest in the table, or -1."""
+        try:
+            key = bytes.fromhex(digest)
+        except ValueError:
+            return -1
+        prefix = _prefix(key)
+        index = bisect.bisect_left(self._prefixes, prefix)
+        while index < self._count and self._prefixes[index] == prefix:
+            if self._key(index) == key:
+                return index
+            index += 1
+        return -1
+
+    def digest(self, index: int) -> str:
+        return self._key(index).hex()
+
+    def span(self, index: int) -> Tuple[int, int]:
+        return self._spans[2 * index], self._spans[2 * index + 1]
+
+class _Rows(Sequence):
+    """The category/preset rows, decoded from the mapping as they are read, as Catalog.rows."""
+
+    def __init__(self, data: memoryview, offsets: memoryview):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _decode(self, start: int, stop: int) -> List[Dict]:
+        if start >= stop:
+            return []
+        # Each row is stored as a JSON array followed by a comma
+        rows = json.loads(b'[' + bytes(self._data[self._offsets[start]:self._offsets[stop] - 1]) + b']')
+        return [dict(zip(ROW_KEYS, row)) for row in rows]
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self._decode(start, stop)
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('row index out of range')
+        return self._decode(index, index + 1)[0]
+
+    def __iter__(self) -> Iterator[Dict]:
+        for start in range(0, len(self), ROWS_PER_DECODE):
+            yield from self._decode(start, min(start + ROWS_PER_DECODE, len(self)))
+
+class _PresetIds(Set):
+    """The ascending preset ids of the snapshot, as Catalog.preset_ids."""
+
+    def __init__(self, ids: memoryview):
+        self._ids = ids
+
+    def index(self, preset_id: int) -> int:
+        """Position of a preset id in the table, or -1."""
+        index = bisect.bisect_left(self._ids, preset_id)
+        return index if index < len(self._ids) and self._ids[index] == preset_id else -1
+
+    def __contains__(self, preset_id) -> bool:
+        return isinstance(preset_id, int) and self.index(preset_id) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+class _Thumbnails(Mapping):
+    """Card preview hash -> image format of the snapshot's thumbnails, as Catalog.thumbnails."""
+
+    def __init__(self, table: _DigestTable, formats: memoryview, names: List[str]):
+        self._table = table
+        self._formats = formats
+        self._names = names
+
+    def format(self, index: int) -> str:
+        return self._names[self._formats[index]]
+
+    def __getitem__(self, digest: str) -> str:
+        index = self._table.find(digest)
+        if index < 0:
+            raise KeyError(digest)
+        return self.format(index)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._table.digest(index) for index in range(len(self._table)))
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+class Snapshot:
+    """A snapshot file mapped read-only.
+
+    `generation` and `token` identify the database commit it was compiled
+    for (see read_token). `rows` are the category/preset rows in the shape of the app's catalog
+    query, `preset_ids` the set of preset ids and `thumbnails` maps card
+    preview hashes to their image format; all three are views of the
+    mapping. It is never closed explicitly, as slices handed out may
+    outlive their request; it goes away with the last reference to it.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise SnapshotError("truncated snapshot header")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        (self.generation, self.token, meta_offset, meta_length, rows_offset, offset,
+         counts) = _read_header(self._map, size)
+        try:
+            meta = json.loads(self._map[meta_offset:meta_offset + meta_length])
+        except ValueError as e:
+            raise SnapshotError(f"corrupt snapshot metadata: {e}") from None
+        self.last_modified: Optional[str] = meta['last_modified']
+
+        self._view = memoryview(self._map)
+        tables = []
+        for table_size in _table_sizes(*counts):
+            tables.append(self._view[offset:offset + table_size])
+            offset += table_size
+        rows, presets, blobs_count, thumbnails = counts
+        row_offsets = tables[0].cast('Q')[:rows + 1]
+        if rows_offset + row_offsets[rows] > size:
+            raise SnapshotError("truncated snapshot rows")
+        self.rows = _Rows(self._view[rows_offset:rows_offset + row_offsets[rows]], row_offsets)
+        self.preset_ids = _PresetIds(tables[1].cast('Q')[:presets])
+        self._preset_files = tables[2].cast('i')[:presets * len(FILE_TYPES)]
+        self._blobs = _DigestTable(tables[3], tables[4][:blobs_count * DIGEST_SIZE], tables[5])
+        self._thumbnails = _DigestTable(tables[6], tables[7][:thumbnails * DIGEST_SIZE], tables[8])
+        self.thumbnails = _Thumbnails(self._thumbnails, tables[9], meta['formats'])
+
+    def file_hashes(self, preset_id: int) -> Dict[str, str]:
+        """The blob hash of each file of a preset, like app.get_file_hashes; empty if it has none."""
+        index = self.preset_ids.index(preset_id)
+        if index < 0:
+            return {}
+        numbers = self._preset_files[index * len(FILE_TYPES):(index + 1) * len(FILE_TYPES)]
+        return {file_type: self._blobs.digest(number) for file_type, number in zip(FILE_TYPES, numbers) if number >= 0}
+
+    def blob(self, digest: str) -> Optional[memoryview]:
+        """The UTF-8 body of a blob, as a slice of the mapping; None if it is not in the snapshot."""
+        index = self._blobs.find(digest)
+        if index < 0:
+            return None
+        offset, length = self._blobs.span(index)
+        return self._view[offset:offset + length]
+
+    def thumbnail(self, digest: str) -> Optional[Tuple[str, memoryview]]:
+        """The (format, image) of a card thumbnail, or None if it has none."""
+        index = self._thumbnails.find(digest)
+        if index < 0:
+            return None
+        offset, length = self._thumbnails.span(index)
+        return self.thumbnails.format(index), self._view[offset:offset + length]
+
+def _preset_order(rows: Iterable[Tuple], files: Dict[int, Dict[str, str]]) -> List[str]:
+    """Blob hashes in the order their presets are listed, each once, so a page's files sit together."""
+    ordered: Dict[str, None] = {}
+    for row in rows:
+        for file_type in FILE_TYPES:
+            digest = files.get(row[2], {}).get(file_type)
+            if digest is not None:
+                ordered[digest] = None
+    return list(ordered)
+
+def _pad(f, written: int) -> int:
+    """Pad a table to 8 bytes; returns its padded size."""
+    padding = -written % 8
+    f.write(bytes(padding))
+    return written + padding
+
+def _write_digest_table(f, spans: Dict[str, Tuple[int, int]], digests: List[str]) -> None:
+    keys = [bytes.fromhex(digest) for digest in digests]
+    f.write(array('Q', [_prefix(key) for key in keys]).tobytes())
+    _pad(f, f.write(b''.join(keys)))
+    f.write(array('Q', [value for digest in digests for value in spans[digest]]).tobytes())
+
+def write_snapshot(db: sqlite3.Connection, path: str) -> int:
+    """Compile the catalog in `db` into a snapshot at `path`; returns its generation.
+
+    Reads through `db`, so an importer can compile the catalog it is about
+    to commit. The file is written beside `path` and renamed over it, so
+    readers see either the old snapshot or the complete new one. Its token
+    is stored in `db` without committing: the snapshot only becomes valid
+    when the caller commits, and stays ignored if that never happens.
+    """
+    generation = db.execute('PRAGMA user_version').fetchone()[0]
+    token = secrets.token_bytes(TOKEN_SIZE)
+    rows = [tuple(row) for row in db.execute(CATALOG_ROWS_QUERY)]
+    last_modified = db.execute(LAST_MODIFIED_QUERY).fetchone()[0]
+    files: Dict[int, Dict[str, str]] = {}
+    for preset_id, file_type, digest in db.execute(
+        'SELECT preset_id, file_type, content_hash FROM files WHERE content_hash IS NOT NULL'
+    ):
+        files.setdefault(preset_id, {})[file_type] = digest
+    preset_ids = sorted({row[2] for row in rows if row[2] is not None})
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(bytes(HEADER.size))
+            offset = HEADER.size
+            blob_spans: Dict[str, Tuple[int, int]] = {}
+            for digest, body in blobs.iter_bodies(db, _preset_order(rows, files)):
+                blob_spans[digest] = (offset, len(body))
+                offset += f.write(body)
+            thumbnail_spans: Dict[str, Tuple[int, int]] = {}
+            thumbnail_formats: Dict[str, str] = {}
+            for digest, image_format, data in db.execute('SELECT hash, format, data FROM thumbnails'):
+                thumbnail_spans[digest] = (offset, len(data))
+                thumbnail_formats[digest] = image_format
+                offset += f.write(data)
+
+            formats = sorted(set(thumbnail_formats.values()))
+            meta = json.dumps({'last_modified': last_modified, 'formats': formats}).encode('utf-8')
+            meta_offset = offset
+            rows_offset = meta_offset + f.write(meta)
+            row_offsets = [0]
+            for row in rows:
+                row_offsets.append(row_offsets[-1] + f.write(json.dumps(row, separators=(',', ':')).encode('utf-8') + b','))
+            tables_offset = rows_offset + _pad(f, row_offsets[-1])
+
+            _pad(f, f.write(array('Q', row_offsets).tobytes()))
+            blob_digests = sorted(blob_spans)
+            blob_numbers = {digest: number for number, digest in enumerate(blob_digests)}
+            _pad(f, f.write(array('Q', preset_ids).tobytes()))
+            _pad(f, f.write(array('i', [
+                blob_numbers.get(files.get(preset_id, {}).get(file_type), -1)
+                for preset_id in preset_ids for file_type in FILE_TYPES
+            ]).tobytes()))
+            _write_digest_table(f, blob_spans, blob_digests)
+            thumbnail_digests = sorted(thumbnail_spans)
+            _write_digest_table(f, thumbnail_spans, thumbnail_digests)
+            _pad(f, f.write(bytes(formats.index(thumbnail_formats[digest]) for digest in thumbnail_digests)))
+
+            f.seek(0)
+            f.write(HEADER.pack(
+                MAGIC, FORMAT_VERSION, _BYTE_ORDER, generation, token, meta_offset, len(meta), rows_offset,
+                tables_offset, len(rows), len(preset_ids), len(blob_digests), len(thumbnail_digests)
+            ))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    db.execute(TOKEN_TABLE)
+    db.execute('DELETE FROM catalog_snapshot')
+    db.execute('INSERT INTO catalog_snapshot (token) VALUES (?)', (token.hex(),))
+    return generation
+
+def main() -> None:
+    import import_presets
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=import_presets.DATABASE_PATH)
+    args = parser.parse_args()
+
+    path = snapshot_path(args.database)
+    conn = import_presets.init_database(args.database)
+    try:
+        generation = write_snapshot(conn, path)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"Wrote generation {generation} to {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
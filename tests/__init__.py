@@ -0,0 +1,5 @@
+"""Tests for the BBS presets app and its tools.
+
+Run them from the repository root with ``python -m unittest`` (or
+``python -m pytest``).
+"""
@@ -0,0 +1,95 @@
+"""Re-imports over an existing database: full, incremental and with search triggers of older databases."""
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import import_presets
+from benchmarks.catalog import DIST_FILES, write_examples
+
+PRESETS = 60
+# Trigger body of databases created before the triggers were made duplicate-safe
+OLD_TRIGGER = '''
+    CREATE TRIGGER search_files_update AFTER UPDATE OF content_hash ON files
+    BEGIN
+        INSERT OR IGNORE INTO search_pending (preset_id) VALUES (NEW.preset_id);
+    END
+'''
+
+class ReimportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.examples = os.path.join(self.tmp, 'examples')
+        write_examples(self.examples, PRESETS, file_size=200)
+        self.db_path = os.path.join(self.tmp, 'presets.db')
+        patcher = mock.patch.object(import_presets, 'DATABASE_PATH', self.db_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def import_examples(self, incremental: bool = False) -> None:
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            ok = import_presets.process_directory(self.examples, incremental=incremental, chunk_size=50)
+        self.assertTrue(ok, output.getvalue())
+
+    def query(self, sql: str, *params):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def edit_preset(self) -> str:
+        """Change the html and css of the first preset; returns the word now in both."""
+        category = sorted(os.listdir(self.examples))[0]
+        preset = sorted(os.listdir(os.path.join(self.examples, category)))[0]
+        dist = os.path.join(self.examples, category, preset, 'dist')
+        for file_type in ('html', 'css'):
+            path = os.path.join(dist, DIST_FILES[file_type])
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(' zanzibarword')
+            stat = os.stat(path)
+            os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        return 'zanzibarword'
+
+    def search(self, word: str):
+        return self.query('SELECT rowid FROM presets_fts WHERE presets_fts MATCH ?', word)
+
+    def test_full_reimport(self):
+        self.import_examples()
+        self.import_examples()
+        self.assertEqual(self.query('SELECT count(*) FROM presets'), [(PRESETS,)])
+        self.assertEqual(self.query('SELECT count(*) FROM files'), [(PRESETS * len(DIST_FILES),)])
+        self.assertEqual(self.query('SELECT count(*) FROM search_pending'), [(0,)])
+
+    def test_incremental_after_editing_two_files(self):
+        self.import_examples()
+        generation = self.query('PRAGMA user_version')[0][0]
+        word = self.edit_preset()
+        self.import_examples(incremental=True)
+        self.assertEqual(len(self.search(word)), 1)
+        self.assertEqual(self.query('PRAGMA user_version'), [(generation + 1,)])
+        self.assertEqual(self.query('SELECT count(*) FROM search_pending'), [(0,)])
+
+    def test_old_triggers_are_replaced(self):
+        self.import_examples()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('DROP TRIGGER search_files_update')
+        conn.execute(OLD_TRIGGER)
+        conn.commit()
+        conn.close()
+        word = self.edit_preset()
+        self.import_examples(incremental=True)
+        self.assertEqual(len(self.search(word)), 1)
+        (sql,), = self.query("SELECT sql FROM sqlite_master WHERE name = 'search_files_update'")
+        self.assertNotIn('OR IGNORE', sql)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""Round trip of a catalog snapshot against the database it was compiled from."""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import blobs
+import import_presets
+import snapshot
+from benchmarks.catalog import build_catalog
+
+# Presets in the test catalog; enough for several categories and the row decode chunks
+PRESETS = 120
+THUMBNAILS = {
+    'a1' * 32: ('png', b'\x89PNG fake image'),
+    '0f' * 32: ('webp', b'RIFF fake image'),
+    'a1' * 31 + 'ff': ('png', b''),
+}
+
+class SnapshotRoundTripTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp, 'presets.db')
+        build_catalog(cls.db_path, PRESETS, file_size=200)
+        cls.conn = import_presets.init_database(cls.db_path)
+        # A category without presets gives a row with no preset
+        import_presets.upsert_categories(cls.conn.cursor(), ['empty-category'])
+        cls.conn.executemany('INSERT INTO thumbnails (hash, format, data) VALUES (?, ?, ?)',
+                             [(digest, image_format, data) for digest, (image_format, data) in THUMBNAILS.items()])
+        import_presets.bump_catalog_generation(cls.conn.cursor())
+        cls.path = snapshot.snapshot_path(cls.db_path)
+        cls.generation = snapshot.write_snapshot(cls.conn, cls.path)
+        cls.conn.commit()
+        cls.snapshot = snapshot.Snapshot(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.snapshot = None
+        cls.conn.close()
+        shutil.rmtree(cls.tmp)
+
+    def test_identity(self):
+        token = snapshot.read_token(self.conn)
+        self.assertEqual(self.generation, 1)
+        self.assertIsNotNone(token)
+        self.assertEqual(snapshot.read_identity(self.path), (self.generation, token))
+        self.assertEqual((self.snapshot.generation, self.snapshot.token), (self.generation, token))
+
+    def test_rows(self):
+        expected = [dict(zip(snapshot.ROW_KEYS, row)) for row in self.conn.execute(snapshot.CATALOG_ROWS_QUERY)]
+        self.assertEqual(len(expected), PRESETS + 1)
+        rows = self.snapshot.rows
+        self.assertEqual(list(rows), expected)
+        self.assertEqual(len(rows), len(expected))
+        self.assertEqual(rows[0], expected[0])
+        self.assertEqual(rows[-1], expected[-1])
+        self.assertEqual(rows[10:25], expected[10:25])
+        self.assertEqual(rows[::7], expected[::7])
+        with self.assertRaises(IndexError):
+            rows[len(expected)]
+
+    def test_last_modified(self):
+        self.assertEqual(self.snapshot.last_modified, self.conn.execute(snapshot.LAST_MODIFIED_QUERY).fetchone()[0])
+
+    def test_preset_ids(self):
+        expected = {preset_id for preset_id, in self.conn.execute('SELECT id FROM presets')}
+        self.assertEqual(set(self.snapshot.preset_ids), expected)
+        self.assertEqual(len(self.snapshot.preset_ids), len(expected))
+        self.assertIn(min(expected), self.snapshot.preset_ids)
+        self.assertNotIn(max(expected) + 1, self.snapshot.preset_ids)
+        self.assertNotIn(str(min(expected)), self.snapshot.preset_ids)
+
+    def test_file_hashes_and_blobs(self):
+        expected = {}
+        for preset_id, file_type, digest in self.conn.execute('SELECT preset_id, file_type, content_hash FROM files'):
+            expected.setdefault(preset_id, {})[file_type] = digest
+        self.assertEqual(len(expected), PRESETS)
+        digests = set()
+        for preset_id, hashes in expected.items():
+            self.assertEqual(self.snapshot.file_hashes(preset_id), hashes)
+            digests.update(hashes.values())
+        self.assertEqual(self.snapshot.file_hashes(max(expected) + 1), {})
+
+        bodies = blobs.load_blobs(self.conn, digests)
+        for digest in digests:
+            self.assertEqual(str(self.snapshot.blob(digest), 'utf-8'), bodies[digest])
+        self.assertIsNone(self.snapshot.blob('00' * 32))
+        self.assertIsNone(self.snapshot.blob('not a digest'))
+
+    def test_thumbnails(self):
+        self.assertEqual(dict(self.snapshot.thumbnails), {digest: entry[0] for digest, entry in THUMBNAILS.items()})
+        for digest, (image_format, data) in THUMBNAILS.items():
+            stored_format, stored = self.snapshot.thumbnail(digest)
+            self.assertEqual((stored_format, bytes(stored)), (image_format, data))
+        self.assertIsNone(self.snapshot.thumbnail('ff' * 32))
+        self.assertNotIn('ff' * 32, self.snapshot.thumbnails)
+
+    def test_token_needs_commit(self):
+        conn = import_presets.init_database(self.db_path)
+        path = os.path.join(self.tmp, 'uncommitted.snapshot')
+        try:
+            token = snapshot.read_token(conn)
+            snapshot.write_snapshot(conn, path)
+            conn.rollback()
+            self.assertEqual(snapshot.read_token(conn), token)
+            self.assertNotEqual(snapshot.read_identity(path)[1], token)
+        finally:
+            conn.close()
+            os.remove(path)
+
+class SnapshotRejectionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        db_path = os.path.join(cls.tmp, 'presets.db')
+        build_catalog(db_path, 20, file_size=200)
+        conn = sqlite3.connect(db_path)
+        try:
+            cls.path = snapshot.snapshot_path(db_path)
+            snapshot.write_snapshot(conn, cls.path)
+            conn.commit()
+        finally:
+            conn.close()
+        with open(cls.path, 'rb') as f:
+            cls.data = f.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def assertRejected(self, data: bytes) -> None:
+        path = os.path.join(self.tmp, 'broken.snapshot')
+        with open(path, 'wb') as f:
+            f.write(data)
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.Snapshot(path)
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.read_identity(path)
+
+    def test_valid(self):
+        self.assertEqual(len(snapshot.Snapshot(self.path).rows), 20)
+
+    def test_truncated(self):
+        self.assertRejected(self.data[:len(self.data) // 2])
+        self.assertRejected(self.data[:-1])
+
+    def test_truncated_header(self):
+        self.assertRejected(self.data[:snapshot.HEADER.size - 1])
+        self.assertRejected(b'')
+
+    def test_other_format(self):
+        self.assertRejected(b'SQLite format 3\x00' + self.data[16:])
+        self.assertRejected(bytes(len(self.data)))
+
+    def test_other_version(self):
+        version = (snapshot.FORMAT_VERSION + 1).to_bytes(4, 'little')
+        self.assertRejected(self.data[:8] + version + self.data[12:])
+
+    def test_other_byte_order(self):
+        byte_order = b'b' if self.data[12:13] == b'l' else b'l'
+        self.assertRejected(self.data[:12] + byte_order + self.data[13:])
+
+if __name__ == '__main__':
+    unittest.main()
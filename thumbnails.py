@@ -0,0 +1,209 @@
+"""Pre-rendered card thumbnails for the index.
+
+Each preset's card preview is rendered once by headless Chrome (started
+with meu_scraper.setup_driver) and stored in the `thumbnails` table as a
+WebP image, or PNG when Pillow is not installed. Rows are keyed by the
+card preview hash, which changes with any of the preset's files, so an
+unchanged preset is never rendered twice and an edited one gets a new
+image. The index shows them as lazy `<img>` tags, and a preset runs in a
+live iframe only once it is opened::
+
+    python thumbnails.py --database presets.db --workers 4
+
+import_presets renders them after an import with ``--thumbnails``.
+"""
+import argparse
+import base64
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import blobs
+import snapshot
+from previews import build_preview_document, preview_hash
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+FORMATS = ('webp', 'png')
+# Browser viewport a card is rendered in, in CSS pixels; about one index card
+THUMBNAIL_WIDTH = 360
+THUMBNAIL_HEIGHT = 200
+# Browsers running in parallel
+RENDER_WORKERS = 4
+# Presets rendered (and committed) per batch
+RENDER_BATCH_SIZE = 100
+WEBP_QUALITY = 80
+# Seconds a card may take to load before its screenshot is taken anyway
+PAGE_LOAD_TIMEOUT = 10
+
+def default_format() -> str:
+    return 'webp' if Image is not None else 'png'
+
+def encode_image(png: bytes, image_format: Optional[str] = None) -> Tuple[str, bytes]:
+    """Convert a PNG screenshot to `image_format`; returns (format, data).
+
+    Without Pillow the screenshot is stored as it is.
+    """
+    image_format = image_format or default_format()
+    if Image is None:
+        return 'png', png
+    buffer = io.BytesIO()
+    with Image.open(io.BytesIO(png)) as image:
+        if image_format == 'webp':
+            image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+        else:
+            image.save(buffer, 'PNG', optimize=True)
+    return image_format, buffer.getvalue()
+
+def start_browser():
+    try:
+        from meu_scraper import setup_driver
+    except ImportError:
+        raise RuntimeError("Thumbnails require selenium and webdriver-manager "
+                           "(pip install selenium webdriver-manager)") from None
+    driver = setup_driver()
+    if driver is None:
+        raise RuntimeError("Could not start headless Chrome")
+    driver.set_window_size(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    return driver
+
+class BrowserPool:
+    """Headless browsers shared by the rendering threads.
+
+    Browsers are started on first use, at most `size` of them, and kept
+    open until `close`, as starting Chrome costs far more than a render.
+    """
+
+    def __init__(self, size: int = RENDER_WORKERS):
+        self.size = size
+        self._idle: queue.Queue = queue.Queue()
+        self._started: List = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._started) < self.size:
+                driver = start_browser()
+                self._started.append(driver)
+                return driver
+        return self._idle.get()
+
+    def release(self, driver) -> None:
+        self._idle.put(driver)
+
+    def render(self, document: str) -> bytes:
+        """Screenshot an HTML document as PNG."""
+        driver = self.acquire()
+        try:
+            driver.get('data:text/html;base64,' + base64.b64encode(document.encode('utf-8')).decode('ascii'))
+            return driver.get_screenshot_as_png()
+        finally:
+            self.release(driver)
+
+    def close(self) -> None:
+        with self._lock:
+            for driver in self._started:
+                driver.quit()
+            self._started.clear()
+
+def card_hashes(db: sqlite3.Connection) -> Dict[str, Dict[str, str]]:
+    """The card preview hash of every preset, mapped to its file hashes."""
+    hashes_by_preset: Dict[int, Dict[str, str]] = {}
+    for preset_id, file_type, content_hash in db.execute('SELECT preset_id, file_type, content_hash FROM files'):
+        hashes_by_preset.setdefault(preset_id, {})[file_type] = content_hash
+    return {preview_hash(file_hashes, 'card'): file_hashes for file_hashes in hashes_by_preset.values()}
+
+def prune_thumbnails(db: sqlite3.Connection, keep: Dict[str, Dict[str, str]]) -> int:
+    """Delete thumbnails of previews no preset has any more; returns how many."""
+    stale = [(digest,) for (digest,) in db.execute('SELECT hash FROM thumbnails') if digest not in keep]
+    db.executemany('DELETE FROM thumbnails WHERE hash = ?', stale)
+    return len(stale)
+
+def render_thumbnails(db: sqlite3.Connection, workers: int = RENDER_WORKERS,
+                      image_format: Optional[str] = None, batch_size: int = RENDER_BATCH_SIZE) -> Tuple[int, int]:
+    """Render the thumbnails that are missing, and drop those no longer used.
+
+    Each batch is committed, so an interrupted run keeps what it rendered.
+    Returns (rendered, failed).
+    """
+    wanted = card_hashes(db)
+    prune_thumbnails(db, wanted)
+    db.commit()
+    stored = {digest for (digest,) in db.execute('SELECT hash FROM thumbnails')}
+    missing = [digest for digest in wanted if digest not in stored]
+    if not missing:
+        return 0, 0
+
+    rendered = failed = 0
+    started = time.perf_counter()
+    pool = BrowserPool(min(workers, len(missing)))
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            for start in range(0, len(missing), batch_size):
+                batch = missing[start:start + batch_size]
+                contents = blobs.load_blobs(db, {h for digest in batch for h in wanted[digest].values()})
+                documents = [
+                    build_preview_document(
+                        {file_type: contents.get(h, '') for file_type, h in wanted[digest].items()}, 'card'
+                    )
+                    for digest in batch
+                ]
+                rows = []
+                for digest, future in zip(batch, [executor.submit(pool.render, document) for document in documents]):
+                    try:
+                        rows.append((digest,) + encode_image(future.result(), image_format))
+                    except RuntimeError:
+                        # No browser could be started; nothing else will render either
+                        raise
+                    except Exception as e:
+                        print(f"Thumbnail {digest[:12]} failed: {e}")
+                        failed += 1
+                db.executemany('INSERT OR REPLACE INTO thumbnails (hash, format, data) VALUES (?, ?, ?)', rows)
+                db.commit()
+                rendered += len(rows)
+                elapsed = time.perf_counter() - started
+                print(f"  {rendered + failed}/{len(missing)} thumbnails in {elapsed:.1f}s")
+    finally:
+        pool.close()
+    return rendered, failed
+
+def main() -> None:
+    import import_presets
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=import_presets.DATABASE_PATH)
+    parser.add_argument('--workers', type=int, default=RENDER_WORKERS, help='browsers running in parallel')
+    parser.add_argument('--format', choices=FORMATS, help='image format (default: webp if Pillow is installed)')
+    args = parser.parse_args()
+
+    conn = import_presets.init_database(args.database)
+    try:
+        try:
+            rendered, failed = render_thumbnails(conn, args.workers, args.format)
+        except RuntimeError as e:
+            parser.exit(1, f"{e}\n")
+        if rendered:
+            # Let running app workers pick the new images up
+            import_presets.bump_catalog_generation(conn.cursor())
+            if os.path.exists(snapshot.snapshot_path(args.database)):
+                snapshot.write_snapshot(conn, snapshot.snapshot_path(args.database))
+            conn.commit()
+        print(f"{rendered} thumbnails rendered, {failed} failed")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()